@@ -1,9 +1,10 @@
-import psutil
 import json
 import os
 from datetime import datetime
 from typing import List, Dict
 
+from app.system.process_snapshot import current_snapshot
+
 AUTOMATION_CONFIG_FILE = "automation_config.json"
 RESTART_HISTORY_FILE = "restart_history.json"
 
@@ -13,6 +14,8 @@ class ProcessAutomation:
     def __init__(self):
         self.config = self.load_config()
         self.restart_history = self.load_history()
+        # Epoch ms of each process's last restart by this instance
+        self._restarted_at: Dict[str, int] = {}
     
     def load_config(self) -> Dict:
         """Load automation configuration."""
@@ -88,14 +91,17 @@ class ProcessAutomation:
         
         restarted = []
         
+        snapshot = current_snapshot()
+        
         for proc_config in self.config.get('monitored_processes', []):
             process_name = proc_config['name']
             
-            # Check if process is running
-            is_running = any(
-                p.name().lower() == process_name.lower()
-                for p in psutil.process_iter(['name'])
-            )
+            # A snapshot taken before our last restart cannot show it running yet
+            if snapshot.ts <= self._restarted_at.get(process_name, 0):
+                continue
+            
+            # Check if process is running (name index lookup)
+            is_running = bool(snapshot.pids_named(process_name))
             
             if not is_running:
                 # Check restart attempts
@@ -107,6 +113,7 @@ class ProcessAutomation:
                 success = self.restart_process(proc_config)
                 
                 if success:
+                    self._restarted_at[process_name] = int(datetime.now().timestamp() * 1000)
                     restarted.append(process_name)
                     proc_config['restart_count'] = proc_config.get('restart_count', 0) + 1
                     
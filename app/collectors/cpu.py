@@ -1,12 +1,47 @@
 # app/collectors/cpu.py
 
 import psutil
-from typing import Dict
+from typing import Dict, List, Optional
 
-def collect_cpu() -> Dict[str, float]:
+
+def _field(times, *names: str) -> Optional[float]:
+    """Sum of the named cpu_times fields this platform reports, else None."""
+    values = [getattr(times, n) for n in names if hasattr(times, n)]
+    return sum(values) if values else None
+
+
+def collect_cpu() -> Dict[str, object]:
     """
-    Collect CPU usage percentage.
+    Collect CPU utilization overall, per core and by CPU-time category.
+
+    One cpu_times_percent(percpu=True) call per tick; the aggregate and
+    the user/system/iowait/steal/irq split are averaged over cores.
+    A core's utilization excludes idle and iowait, as cpu_percent does.
+    cpu_cores holds every core's utilization in core order.
     """
+    per_core = psutil.cpu_times_percent(interval=None, percpu=True)
+    if not per_core:
+        return {"cpu_percent": psutil.cpu_percent(interval=None), "cpu_cores": []}
+
+    cores: List[float] = []
+    for t in per_core:
+        idle = t.idle + (_field(t, "iowait") or 0.0)
+        cores.append(max(0.0, min(100.0, 100.0 - idle)))
+
+    def mean(*names: str) -> Optional[float]:
+        values = [_field(t, *names) for t in per_core]
+        if values[0] is None:
+            return None
+        return sum(values) / len(values)
+
     return {
-        "cpu_percent": psutil.cpu_percent(interval=None)
+        "cpu_percent": sum(cores) / len(cores),
+        "cpu_user": mean("user", "nice"),
+        "cpu_system": mean("system"),
+        "cpu_iowait": mean("iowait"),
+        "cpu_steal": mean("steal"),
+        # Linux irq + softirq, Windows interrupt + DPC time
+        "cpu_irq": mean("irq", "softirq", "interrupt", "dpc"),
+        "cpu_max_core": max(cores),
+        "cpu_cores": cores,
     }
@@ -1,17 +1,51 @@
 # app/collectors/disk.py
 
 import psutil
-from typing import Dict
+from typing import Dict, Optional
 
-def collect_disk() -> Dict[str, float]:
+from app.collectors.rates import RateTracker, total_rate, whole_disks
+
+_MB = 1024 * 1024
+
+# (disk, "read" | "write") -> previous byte counter
+_io_rates = RateTracker()
+
+# Virtual block devices whose I/O is also counted against the disks
+# backing them: loop files, RAM disks, device-mapper (LVM, LUKS) and md RAID
+_VIRTUAL_PREFIXES = ("loop", "ram", "zram", "dm-", "md")
+
+
+def collect_disk() -> Dict[str, object]:
     """
-    Collect disk usage and IO stats.
+    Collect disk usage and I/O rates.
+
+    read_mb / write_mb are MB/s summed over whole physical disks, so
+    neither partitions nor virtual devices layered on a disk are counted
+    twice; per_disk maps each of those disks to its own
+    {"read_mb_s", "write_mb_s"}. Rates are None on the first call.
     """
     usage = psutil.disk_usage("/")
-    io = psutil.disk_io_counters()
+    # One call per tick for every disk
+    io = psutil.disk_io_counters(perdisk=True) or {}
+
+    counters = {}
+    for name, c in io.items():
+        counters[(name, "read")] = c.read_bytes
+        counters[(name, "write")] = c.write_bytes
+    rates = _io_rates.update(counters)
+
+    per_disk: Dict[str, Dict[str, Optional[float]]] = {}
+    for name in io:
+        read, write = rates[(name, "read")], rates[(name, "write")]
+        per_disk[name] = {
+            "read_mb_s": None if read is None else read / _MB,
+            "write_mb_s": None if write is None else write / _MB,
+        }
 
+    disks = [d for d in whole_disks(io) if not d.startswith(_VIRTUAL_PREFIXES)]
     return {
-        "percent_used": usage.percent,
-        "read_mb_s": io.read_bytes / (1024 * 1024),
-        "write_mb_s": io.write_bytes / (1024 * 1024),
+        "disk_percent": usage.percent,
+        "read_mb": total_rate(per_disk[d]["read_mb_s"] for d in disks),
+        "write_mb": total_rate(per_disk[d]["write_mb_s"] for d in disks),
+        "per_disk": {d: per_disk[d] for d in disks},
     }
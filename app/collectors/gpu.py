@@ -1,71 +1,222 @@
 # app/collectors/gpu.py
 
-from typing import Dict
+import atexit
+import os
+import subprocess
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
 
-def collect_gpu() -> Dict[str, float]:
+# nvidia-smi executable; SENTINEL_NVIDIA_SMI overrides it (e.g. a stub that prints canned CSV)
+NVIDIA_SMI = os.environ.get("SENTINEL_NVIDIA_SMI", "nvidia-smi")
+
+# Columns requested from nvidia-smi, one CSV line per GPU per interval
+QUERY_FIELDS = ("index", "utilization.gpu", "memory.used", "memory.total")
+SAMPLE_INTERVAL_MS = 1000
+
+# Readings older than this are treated as missing (e.g. a hung child)
+STALE_AFTER_S = 10.0
+
+# Wait before retrying when nvidia-smi is missing or exits without output;
+# doubles on every failure up to the maximum
+RETRY_BACKOFF_S = 5.0
+MAX_RETRY_BACKOFF_S = 300.0
+
+
+class GpuSampler:
     """
-    Collect NVIDIA GPU stats if available.
+    Long-lived NVIDIA GPU sampler.
+
+    Keeps one `nvidia-smi --query-gpu ... -lms` child running and parses
+    its CSV stream on a daemon thread into a per-GPU latest-value cache,
+    so a collection tick is a dict read instead of a process spawn and an
+    XML parse. When nvidia-smi is missing or fails the sampler reports
+    "no GPU" and retries with exponential backoff.
     """
-    try:
-        import subprocess
-        import os
-        import xml.etree.ElementTree as ET
-
-        # Determine safe subprocess flags
-        startupinfo = None
-        creationflags = 0
-        if os.name == 'nt':
-            startupinfo = subprocess.STARTUPINFO()
-            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-            creationflags = subprocess.CREATE_NO_WINDOW
-
-        # Query nvidia-smi for XML output
-        # Drivers must be installed
-        cmd = ["nvidia-smi", "-q", "-x"]
-        
-        output = subprocess.check_output(
-            cmd, 
-            startupinfo=startupinfo, 
-            creationflags=creationflags,
-            text=True
-        )
-
-        root = ET.fromstring(output)
-        gpu = root.find("gpu")
-        if gpu is None:
-             return _empty_gpu_stats()
-
-        # Parse memory
-        fb_memory = gpu.find("fb_memory_usage")
-        total_str = fb_memory.find("total").text  # e.g. "8192 MiB"
-        used_str = fb_memory.find("used").text    # e.g. "450 MiB"
-        
-        # Parse utilization
-        util = gpu.find("utilization")
-        gpu_util_str = util.find("gpu_util").text # e.g. "5 %"
-
-        def parse_val(s):
-             return float(s.split()[0])
 
+    def __init__(
+        self,
+        command: Optional[Sequence[str]] = None,
+        interval_ms: int = SAMPLE_INTERVAL_MS
+    ):
+        """
+        Args:
+            command: nvidia-smi invocation prefix, defaults to NVIDIA_SMI
+            interval_ms: Sampling interval passed to -lms
+        """
+        self.command = list(command) if command else [NVIDIA_SMI]
+        self.interval_ms = interval_ms
+        self._latest: Dict[int, Dict[str, Optional[float]]] = {}
+        self._updated: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._proc: Optional[subprocess.Popen] = None
+        self._thread: Optional[threading.Thread] = None
+        self.backoff = RETRY_BACKOFF_S
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sentinel-gpu", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def gpus(self) -> List[Dict[str, Optional[float]]]:
+        """Fresh per-GPU readings, ordered by GPU index."""
+        cutoff = time.monotonic() - max(STALE_AFTER_S, 5 * self.interval_ms / 1000)
+        with self._lock:
+            return [
+                dict(self._latest[i]) for i in sorted(self._latest)
+                if self._updated[i] >= cutoff
+            ]
+
+    def latest(self) -> Dict[str, Optional[float]]:
+        """
+        Current GPU readings in MetricSample terms.
+
+        gpu_percent is the busiest GPU's utilization; memory figures are
+        summed over all GPUs.
+        """
+        gpus = self.gpus()
+        if not gpus:
+            return _empty_gpu_stats()
+        util = [g["utilization"] for g in gpus if g["utilization"] is not None]
+        used = [g["memory_used_mb"] for g in gpus if g["memory_used_mb"] is not None]
+        total = [g["memory_total_mb"] for g in gpus if g["memory_total_mb"] is not None]
         return {
-            "available": True,
-            "usage_percent": parse_val(gpu_util_str),
-            "memory_used_mb": parse_val(used_str),
-            "memory_total_mb": parse_val(total_str)
+            "gpu_available": True,
+            "gpu_count": len(gpus),
+            "gpu_percent": max(util) if util else None,
+            "gpu_memory_used_mb": sum(used) if used else None,
+            "gpu_memory_total_mb": sum(total) if total else None,
         }
-            
-    except FileNotFoundError:
-        # nvidia-smi not found
-        return _empty_gpu_stats()
-    except Exception:
-        # Parsing error or other failure
-        return _empty_gpu_stats()
+
+    # --------------------------------------------------
+    # Sampling thread
+    # --------------------------------------------------
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            got_lines = False
+            try:
+                self._proc = subprocess.Popen(
+                    self.command + [
+                        "--query-gpu=" + ",".join(QUERY_FIELDS),
+                        "--format=csv,noheader,nounits",
+                        f"-lms={self.interval_ms}",
+                    ],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    text=True,
+                    bufsize=1,
+                    **_hidden_window()
+                )
+                for line in self._proc.stdout:
+                    if self._parse_line(line):
+                        got_lines = True
+                        self.backoff = RETRY_BACKOFF_S
+                    if self._stop.is_set():
+                        break
+            except (FileNotFoundError, PermissionError):
+                pass  # No NVIDIA driver tools on this machine
+            except Exception as e:
+                print(f"GPU sampler error: {e}")
+            finally:
+                self._reap()
+
+            with self._lock:
+                self._latest.clear()
+                self._updated.clear()
+            if got_lines:
+                # Child died after working: restart promptly
+                self._stop.wait(1.0)
+            else:
+                # Treated as "no GPU" until the next attempt
+                self._stop.wait(self.backoff)
+                self.backoff = min(self.backoff * 2, MAX_RETRY_BACKOFF_S)
+
+    def _parse_line(self, line: str) -> bool:
+        parts = [p.strip() for p in line.split(",")]
+        if len(parts) != len(QUERY_FIELDS):
+            return False
+        try:
+            index = int(parts[0])
+        except ValueError:
+            return False
+        reading = {
+            "utilization": _parse_number(parts[1]),
+            "memory_used_mb": _parse_number(parts[2]),
+            "memory_total_mb": _parse_number(parts[3]),
+        }
+        with self._lock:
+            self._latest[index] = reading
+            self._updated[index] = time.monotonic()
+        return True
+
+    def _reap(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        if proc.poll() is None:
+            proc.terminate()
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        if proc.stdout:
+            proc.stdout.close()
+
+
+def _parse_number(text: str) -> Optional[float]:
+    """nvidia-smi prints "[N/A]" or "[Not Supported]" for unavailable fields."""
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _hidden_window() -> Dict:
+    """Popen arguments that keep a console window from flashing up on Windows."""
+    if os.name != 'nt':
+        return {}
+    startupinfo = subprocess.STARTUPINFO()
+    startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    return {"startupinfo": startupinfo, "creationflags": subprocess.CREATE_NO_WINDOW}
+
+
+# Shared sampler, started on the first collect_gpu() call; the child
+# process must not outlive the app
+gpu_sampler = GpuSampler()
+atexit.register(gpu_sampler.stop)
+
+
+def collect_gpu() -> Dict[str, Optional[float]]:
+    """
+    Collect NVIDIA GPU stats if available.
+    Reads the background sampler's cache; never spawns a process.
+    """
+    if not gpu_sampler.running:
+        gpu_sampler.start()
+    return gpu_sampler.latest()
+
 
 def _empty_gpu_stats():
     return {
-        "available": False, 
-        "usage_percent": 0.0,
-        "memory_used_mb": 0.0,
-        "memory_total_mb": 0.0
+        "gpu_available": False,
+        "gpu_count": 0,
+        "gpu_percent": None,  # Stored as missing, shown as N/A
+        "gpu_memory_used_mb": None,
+        "gpu_memory_total_mb": None
     }
-
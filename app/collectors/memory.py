@@ -9,7 +9,7 @@ def collect_memory() -> Dict[str, float]:
     """
     mem = psutil.virtual_memory()
     return {
-        "used_mb": mem.used / (1024 * 1024),
-        "total_mb": mem.total / (1024 * 1024),
-        "percent": mem.percent
+        "memory_used_mb": mem.used / (1024 * 1024),
+        "memory_total_mb": mem.total / (1024 * 1024),
+        "memory_percent": mem.percent
     }
@@ -1,14 +1,48 @@
 # app/collectors/network.py
 
 import psutil
-from typing import Dict
+from typing import Dict, Optional
 
-def collect_network() -> Dict[str, float]:
+from app.collectors.rates import RateTracker, total_rate
+
+_KB = 1024
+
+# (nic, "sent" | "recv") -> previous byte counter
+_io_rates = RateTracker()
+
+
+def _is_loopback(nic: str) -> bool:
+    return nic == "lo" or nic.lower().startswith("loopback")
+
+
+def collect_network() -> Dict[str, object]:
     """
-    Collect network IO stats.
+    Collect network I/O rates.
+
+    upload_kb / download_kb are KB/s summed over all interfaces except
+    loopback; per_nic maps each of those interfaces to its own
+    {"upload_kb_s", "download_kb_s"}. Rates are None on the first call.
     """
-    net = psutil.net_io_counters()
+    # One call per tick for every interface
+    net = psutil.net_io_counters(pernic=True) or {}
+
+    counters = {}
+    for nic, c in net.items():
+        counters[(nic, "sent")] = c.bytes_sent
+        counters[(nic, "recv")] = c.bytes_recv
+    rates = _io_rates.update(counters)
+
+    per_nic: Dict[str, Dict[str, Optional[float]]] = {}
+    for nic in net:
+        sent, recv = rates[(nic, "sent")], rates[(nic, "recv")]
+        per_nic[nic] = {
+            "upload_kb_s": None if sent is None else sent / _KB,
+            "download_kb_s": None if recv is None else recv / _KB,
+        }
+
+    external = {nic: per_nic[nic] for nic in net if not _is_loopback(nic)}
     return {
-        "upload_kb": net.bytes_sent / 1024,
-        "download_kb": net.bytes_recv / 1024,
+        "upload_kb": total_rate(r["upload_kb_s"] for r in external.values()),
+        "download_kb": total_rate(r["download_kb_s"] for r in external.values()),
+        "per_nic": external,
     }
@@ -1,24 +1,20 @@
 # app/collectors/process.py
 
-import psutil
 from typing import Dict, List
 
+from app.system.process_snapshot import current_snapshot
+
 def collect_processes() -> List[Dict[str, float]]:
     """
     Collect per-process resource usage.
+    Read from the shared process snapshot; no per-call enumeration.
     """
-    processes = []
-
-    for proc in psutil.process_iter(attrs=["pid", "name", "cpu_percent", "memory_info"]):
-        try:
-            info = proc.info
-            processes.append({
-                "pid": info["pid"],
-                "name": info["name"],
-                "cpu_percent": info["cpu_percent"],
-                "memory_mb": info["memory_info"].rss / (1024 * 1024)
-            })
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            continue
-
-    return processes
+    return [
+        {
+            "pid": p.pid,
+            "name": p.name,
+            "cpu_percent": p.cpu_percent,
+            "memory_mb": p.memory_mb
+        }
+        for p in current_snapshot().processes
+    ]
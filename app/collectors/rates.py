@@ -0,0 +1,110 @@
+# app/collectors/rates.py
+
+import re
+import threading
+import time
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+# Counters below this are assumed to be 32-bit and may wrap around
+_WRAP_32 = 2 ** 32
+
+# Linux partition names: sda1 (of sda), nvme0n1p1 / mmcblk0p1 (of nvme0n1 / mmcblk0)
+_PARTITION_RE = re.compile(r"^(?P<disk>.*?\d)p\d+$|^(?P<plain>.*?\D)\d+$")
+
+
+class RateTracker:
+    """
+    Per-second rates from cumulative counters.
+
+    Remembers the previous value of every counter with a monotonic
+    timestamp, so wall-clock jumps never distort a rate. A counter that
+    goes backwards is treated as a 32-bit wrap when that explains a
+    plausible step, otherwise as a reset (device re-attached, driver
+    reload); a reset yields no rate for that tick rather than a bogus
+    spike. Counters that disappear are forgotten.
+    """
+
+    def __init__(self):
+        self._prev: Dict[Hashable, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def update(
+        self,
+        counters: Dict[Hashable, float],
+        now: Optional[float] = None
+    ) -> Dict[Hashable, Optional[float]]:
+        """
+        Record `counters` and return {key: units per second}.
+
+        A key's first reading, or the reading after a reset, maps to None.
+        """
+        if now is None:
+            now = time.monotonic()
+        rates: Dict[Hashable, Optional[float]] = {}
+        with self._lock:
+            for key, value in counters.items():
+                prev = self._prev.get(key)
+                self._prev[key] = (now, value)
+                if prev is None or now <= prev[0]:
+                    rates[key] = None
+                    continue
+                delta = value - prev[1]
+                if delta < 0:
+                    delta = _unwrap(prev[1], value)
+                rates[key] = None if delta is None else delta / (now - prev[0])
+            for key in set(self._prev) - set(counters):
+                del self._prev[key]
+        return rates
+
+
+def _unwrap(prev: float, value: float) -> Optional[float]:
+    """Delta across a 32-bit wrap, or None if the counter was reset."""
+    if prev < _WRAP_32:
+        delta = value + _WRAP_32 - prev
+        if delta < _WRAP_32 // 2:
+            return delta
+    return None
+
+
+def total_rate(rates: Iterable[Optional[float]]) -> Optional[float]:
+    """Sum of the known rates; None if none is known yet."""
+    known = [r for r in rates if r is not None]
+    return sum(known) if known else None
+
+
+def whole_disks(names: Iterable[str]) -> List[str]:
+    """
+    Drop partitions whose parent disk is also listed, so summing
+    per-disk counters does not count the same I/O twice.
+    """
+    names = list(names)
+    listed = set(names)
+    out = []
+    for name in names:
+        match = _PARTITION_RE.match(name)
+        parent = match and (match.group("disk") or match.group("plain"))
+        if parent and parent in listed:
+            continue
+        out.append(name)
+    return out
+
+
+def device_series_rows(
+    ts: int,
+    metric: str,
+    unit: str,
+    label: str,
+    rates: Dict[str, Optional[float]]
+) -> List[Tuple[int, int, float]]:
+    """
+    (series_id, ts, value) rows for one per-device rate metric, e.g.
+    metric "disk.read_mb_s" with label "device". Devices without a rate
+    this tick are skipped. Series ids are cached after the first tick.
+    """
+    from app.storage.series import series_id
+
+    return [
+        (series_id(metric, {label: name}, unit), ts, value)
+        for name, value in rates.items()
+        if value is not None
+    ]
@@ -0,0 +1,65 @@
+# app/collectors/schema.py
+
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from app.storage.database import METRIC_COLUMNS
+
+
+class MetricSample(NamedTuple):
+    """
+    One collection tick: the declared metric schema.
+
+    Fields after `ts` are exactly METRIC_COLUMNS, in storage order, so a
+    sample is already a fixed-layout row: `sample.values` goes straight
+    into the writer's parameter tuple and the hot store's packed row.
+    Collectors return readings keyed by these field names (namespaced by
+    subsystem: cpu_*, memory_*, disk_*, gpu_*), so merging them cannot
+    silently overwrite one another.
+    """
+
+    ts: int                                  # Epoch milliseconds
+    cpu_percent: Optional[float] = None
+    memory_used_mb: Optional[float] = None
+    memory_percent: Optional[float] = None
+    disk_percent: Optional[float] = None
+    read_mb: Optional[float] = None
+    write_mb: Optional[float] = None
+    upload_kb: Optional[float] = None
+    download_kb: Optional[float] = None
+    gpu_percent: Optional[float] = None
+    cpu_user: Optional[float] = None
+    cpu_system: Optional[float] = None
+    cpu_iowait: Optional[float] = None
+    cpu_steal: Optional[float] = None
+    cpu_irq: Optional[float] = None
+    cpu_max_core: Optional[float] = None
+
+    @classmethod
+    def from_readings(cls, ts: int, *readings: Dict[str, Optional[float]]) -> "MetricSample":
+        """
+        Build a sample from collector readings.
+
+        Keys that are not sample fields (e.g. memory_total_mb) are
+        ignored; a key reported by two collectors is a schema bug and
+        raises ValueError instead of being silently overwritten.
+        """
+        values: Dict[str, Optional[float]] = {}
+        for reading in readings:
+            for key, value in reading.items():
+                if key not in _VALUE_FIELDS:
+                    continue
+                if key in values:
+                    raise ValueError(f"Metric {key!r} reported by more than one collector")
+                values[key] = value
+        return cls(ts, **values)
+
+    @property
+    def values(self) -> Tuple[Optional[float], ...]:
+        """Metric values in METRIC_COLUMNS order."""
+        return self[1:]
+
+
+_VALUE_FIELDS = frozenset(MetricSample._fields[1:])
+
+if MetricSample._fields[1:] != METRIC_COLUMNS:
+    raise ImportError("MetricSample fields are out of sync with METRIC_COLUMNS")
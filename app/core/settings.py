@@ -0,0 +1,190 @@
+# app/core/settings.py
+
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+CONFIG_FILE = "config.json"
+
+# Keys held in the OS keyring instead of config.json
+KEYRING_SERVICE = "SENTINEL"
+SECRET_KEYS = ("api_key",)
+
+# config.json is stat()ed at most this often to pick up external edits
+MTIME_CHECK_INTERVAL = 1.0
+
+# subscriber(changes): {key: new value} for every key that changed
+SettingsListener = Callable[[Dict[str, Any]], None]
+
+
+class Settings:
+    """
+    Shared, cached application settings.
+
+    config.json is parsed once and served from memory; reads re-check the
+    file's mtime at most every MTIME_CHECK_INTERVAL seconds, so edits made
+    outside the app are still picked up. Secrets are read from the keyring
+    on first use only. Subscribers are told about every change, whether it
+    came from save() or from the file.
+    """
+
+    def __init__(self, path: str = CONFIG_FILE):
+        self.path = path
+        self._data: Dict[str, Any] = {}
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+        self._secrets: Dict[str, Optional[str]] = {}
+        self._listeners: List[SettingsListener] = []
+        self._lock = threading.RLock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Current value of `key`, or `default` when unset."""
+        if key in SECRET_KEYS:
+            return self._secret(key) or self._file_values().get(key) or default
+        return self._file_values().get(key, default)
+
+    def as_dict(self, defaults: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Copy of all settings layered over `defaults`, secrets included.
+        Mutating it has no effect until passed to save().
+        """
+        cfg = dict(defaults or {})
+        cfg.update(self._file_values())
+        for key in SECRET_KEYS:
+            value = self._secret(key)
+            if value:
+                cfg[key] = value
+        return cfg
+
+    def save(self, config: Dict[str, Any]) -> None:
+        """
+        Replace the stored settings with `config`: secrets go to the
+        keyring, everything else to config.json.
+        """
+        to_save = dict(config)
+        changes: Dict[str, Any] = {}
+        with self._lock:
+            for key in SECRET_KEYS:
+                value = to_save.pop(key, None)
+                if value and value != self._secrets.get(key):
+                    self._store_secret(key, value)
+                    changes[key] = value
+            try:
+                with open(self.path, 'w') as f:
+                    json.dump(to_save, f, indent=2)
+            except Exception as e:
+                print(f"Error saving config: {e}")
+                return
+            changes.update(_diff(self._data, to_save))
+            self._data = to_save
+            self._mtime = self._stat()
+            self._checked = time.monotonic()
+        self._notify(changes)
+
+    def set(self, key: str, value: Any) -> None:
+        """Change a single setting."""
+        cfg = self.as_dict()
+        cfg[key] = value
+        self.save(cfg)
+
+    def subscribe(self, listener: SettingsListener) -> Callable[[], None]:
+        """Call `listener(changes)` after every change; returns an unsubscribe function."""
+        with self._lock:
+            self._listeners.append(listener)
+
+        def unsubscribe():
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+        return unsubscribe
+
+    def reload(self) -> None:
+        """Re-read config.json and the keyring now."""
+        with self._lock:
+            self._secrets.clear()
+            self._checked = 0.0
+            self._mtime = None
+        self._file_values()
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+    def _stat(self) -> Optional[float]:
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def _file_values(self) -> Dict[str, Any]:
+        """Cached config.json contents, reloaded when its mtime changes."""
+        changes = None
+        with self._lock:
+            now = time.monotonic()
+            if now - self._checked >= MTIME_CHECK_INTERVAL or self._checked == 0.0:
+                self._checked = now
+                mtime = self._stat()
+                if mtime != self._mtime:
+                    data = self._load()
+                    if data is not None:
+                        changes = _diff(self._data, data)
+                        self._data = data
+                        self._mtime = mtime
+            data = self._data
+        if changes:
+            self._notify(changes)
+        return data
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception as e:
+            # Possibly caught mid-write; keep the cached values and retry next check
+            print(f"Error loading config: {e}")
+            return None
+
+    def _secret(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key not in self._secrets:
+                try:
+                    import keyring
+                    self._secrets[key] = keyring.get_password(KEYRING_SERVICE, key)
+                except Exception as e:
+                    print(f"Keyring load error: {e}")
+                    self._secrets[key] = None
+            return self._secrets[key]
+
+    def _store_secret(self, key: str, value: str) -> None:
+        try:
+            import keyring
+            keyring.set_password(KEYRING_SERVICE, key, value)
+        except Exception as e:
+            print(f"Keyring save error: {e}")
+        self._secrets[key] = value
+
+    def _notify(self, changes: Dict[str, Any]) -> None:
+        if not changes:
+            return
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(changes)
+            except Exception as e:
+                print(f"Settings listener error: {e}")
+
+
+def _diff(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Keys whose value differs between `old` and `new` (removed keys map to None)."""
+    changes = {k: v for k, v in new.items() if old.get(k, object()) != v}
+    changes.update({k: None for k in old if k not in new})
+    return changes
+
+
+# Shared instance used across the app
+settings = Settings()
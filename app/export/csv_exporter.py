@@ -1,87 +1,188 @@
 import csv
-from datetime import datetime, timedelta
-from app.storage.reader import read_recent_metrics
-from typing import Optional
+import gzip
 import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from app.storage.database import epoch_ms, METRIC_COLUMNS
+from app.ml.forecast import rolling_linear_forecast
+from app.storage.reader import iter_metrics_chunks
+
+# Output formats accepted by export_metrics (Parquet/Arrow need pyarrow)
+EXPORT_FORMATS = ("csv", "csv.gz", "parquet", "arrow")
+
+# Prediction column -> (source metric, samples ahead), as on the analytics page
+PREDICTION_SOURCES = {
+    "predicted_cpu": ("cpu_percent", 10),
+    "predicted_memory": ("memory_percent", 10),
+    "predicted_disk": ("disk_percent", 60),
+}
+PREDICTION_FIELDS = tuple(PREDICTION_SOURCES)
+
+# Samples each rolling forecast is fitted on
+PREDICTION_WINDOW = 30
+
+# progress(fraction_done 0..1, rows_written)
+ProgressCallback = Callable[[float, int], None]
+
 
 class CSVExporter:
-    """Export system metrics to CSV format."""
-    
+    """Export system metrics to CSV (optionally gzip) or Parquet/Arrow."""
+
     @staticmethod
     def export_metrics(
-        hours: int = 24,
+        hours: Optional[int] = 24,
         include_predictions: bool = False,
-        output_dir: str = "exports"
+        output_dir: str = "exports",
+        fmt: str = "csv",
+        progress: Optional[ProgressCallback] = None,
+        chunk_rows: int = 10_000
     ) -> tuple[bool, str]:
         """
-        Export metrics to CSV file.
-        
+        Export metrics to a file, streaming the range in chunks.
+
         Args:
-            hours: Number of hours of historical data to export
-            include_predictions: Whether to include prediction columns
-            output_dir: Directory to save CSV file
-        
+            hours: Number of hours of historical data to export (None = everything retained)
+            include_predictions: Add rolling linear forecasts (PREDICTION_SOURCES) per row
+            output_dir: Directory to save the file
+            fmt: One of EXPORT_FORMATS
+            progress: Called after every chunk with (fraction_done, rows_written)
+            chunk_rows: Rows per chunk; bounds memory use whatever the range
+
         Returns:
             (success: bool, file_path_or_error: str)
         """
+        if fmt not in EXPORT_FORMATS:
+            return False, f"Unknown export format: {fmt}"
+        filepath = None
         try:
             # Create export directory if needed
             os.makedirs(output_dir, exist_ok=True)
-            
-            # Get metrics
-            metrics = read_recent_metrics(minutes=hours * 60)
-            
-            if not metrics:
-                return False, "No data available to export"
-            
+
+            end = epoch_ms() + 1
+            start = 0 if hours is None else end - hours * 3_600_000
+
             # Generate filename
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"syssentinel_metrics_{timestamp}.csv"
+            filename = f"syssentinel_metrics_{timestamp}.{fmt}"
             filepath = os.path.join(output_dir, filename)
-            
-            # Write CSV
-            with open(filepath, 'w', newline='', encoding='utf-8') as f:
-                fieldnames = [
-                    'timestamp',
-                    'cpu_percent',
-                    'memory_percent',
-                    'disk_percent',
-                    'upload_kb',
-                    'download_kb',
-                    'gpu_percent'
-                ]
-                
-                if include_predictions:
-                    fieldnames.extend([
-                        'predicted_cpu',
-                        'predicted_memory',
-                        'predicted_disk'
-                    ])
-                
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                
-                for m in metrics:
-                    row = {
-                        'timestamp': m.get('timestamp', ''),
-                        'cpu_percent': m.get('cpu_percent', 0),
-                        'memory_percent': m.get('memory_percent', 0),
-                        'disk_percent': m.get('disk_percent', 0),
-                        'upload_kb': m.get('upload_kb', 0),
-                        'download_kb': m.get('download_kb', 0),
-                        'gpu_percent': m.get('gpu_percent', 'N/A'),
-                    }
-                    
-                    if include_predictions:
-                        # Predictions would be calculated here
-                        # For now, just placeholder
-                        row['predicted_cpu'] = 0
-                        row['predicted_memory'] = 0
-                        row['predicted_disk'] = 0
-                    
-                    writer.writerow(row)
-            
+
+            chunks = CSVExporter._chunks(start, end, include_predictions, progress, chunk_rows)
+            if fmt in ("csv", "csv.gz"):
+                rows = CSVExporter._write_csv(filepath, chunks, include_predictions, fmt == "csv.gz")
+            else:
+                rows = CSVExporter._write_arrow(filepath, chunks, fmt)
+
+            if rows == 0:
+                os.remove(filepath)
+                return False, "No data available to export"
             return True, filepath
-            
+
+        except ImportError:
+            return False, f"{fmt} export requires the optional 'pyarrow' package"
         except Exception as e:
+            if filepath and os.path.exists(filepath):
+                os.remove(filepath)
             return False, f"Export failed: {str(e)}"
+
+    @staticmethod
+    def export_in_background(
+        on_done: Callable[[bool, str], None],
+        **kwargs
+    ) -> threading.Thread:
+        """
+        Run export_metrics on a worker thread (never on the UI thread).
+
+        `on_done(success, file_path_or_error)` is called from that thread
+        when the export finishes; other keyword arguments are passed to
+        export_metrics.
+        """
+        def run():
+            on_done(*CSVExporter.export_metrics(**kwargs))
+
+        thread = threading.Thread(target=run, name="sentinel-export", daemon=True)
+        thread.start()
+        return thread
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+    @staticmethod
+    def _chunks(
+        start: int,
+        end: int,
+        include_predictions: bool,
+        progress: Optional[ProgressCallback],
+        chunk_rows: int
+    ) -> Iterator[Dict[str, np.ndarray]]:
+        """Columnar chunks with prediction columns attached, reporting progress."""
+        written = 0
+        origin = None  # First exported ts; progress is measured from here to `end`
+        # Last PREDICTION_WINDOW - 1 samples per source, so windows span chunks
+        tails = {src: np.empty(0) for src, _ in PREDICTION_SOURCES.values()}
+        for chunk in iter_metrics_chunks(start, end, chunk_rows=chunk_rows):
+            if include_predictions:
+                for field, (src, horizon) in PREDICTION_SOURCES.items():
+                    history = np.concatenate((tails[src], chunk[src]))
+                    predicted = rolling_linear_forecast(history, PREDICTION_WINDOW, horizon)
+                    chunk[field] = predicted[len(tails[src]):]
+                for src in tails:
+                    tails[src] = np.concatenate((tails[src], chunk[src]))[-(PREDICTION_WINDOW - 1):]
+            if origin is None:
+                origin = max(start, int(chunk["ts"][0]))
+            last_ts = int(chunk["ts"][-1])
+            written += len(chunk["ts"])
+            yield chunk
+            if progress:
+                progress(min(1.0, (last_ts - origin) / max(1, end - origin)), written)
+
+    @staticmethod
+    def _fields(include_predictions: bool) -> List[str]:
+        return list(METRIC_COLUMNS) + (list(PREDICTION_FIELDS) if include_predictions else [])
+
+    @staticmethod
+    def _write_csv(filepath: str, chunks: Iterator[Dict[str, np.ndarray]], include_predictions: bool, compress: bool) -> int:
+        fields = CSVExporter._fields(include_predictions)
+        opener = gzip.open if compress else open
+        rows = 0
+        with opener(filepath, 'wt', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['timestamp'] + fields)
+            for chunk in chunks:
+                # UTC ISO-8601, formatted for the whole chunk at once
+                stamps = chunk["ts"].astype("datetime64[ms]").astype(str).tolist()
+                # Missing values become empty cells
+                values = [np.where(np.isnan(chunk[c]), None, chunk[c]).tolist() for c in fields]
+                writer.writerows(zip(stamps, *values))
+                rows += len(stamps)
+        return rows
+
+    @staticmethod
+    def _write_arrow(filepath: str, chunks: Iterator[Dict[str, np.ndarray]], fmt: str) -> int:
+        import pyarrow as pa
+
+        out = None
+        rows = 0
+        try:
+            for chunk in chunks:
+                arrays = {"timestamp": pa.array(chunk.pop("ts"), type=pa.timestamp("ms", tz="UTC"))}
+                # from_pandas=True stores NaN as null
+                arrays.update({k: pa.array(v, from_pandas=True) for k, v in chunk.items()})
+                batch = pa.RecordBatch.from_pydict(arrays)
+                if out is None:
+                    if fmt == "parquet":
+                        import pyarrow.parquet as pq
+                        out = pq.ParquetWriter(filepath, batch.schema, compression="zstd")
+                    else:
+                        out = pa.ipc.new_file(filepath, batch.schema)
+                out.write_table(pa.Table.from_batches([batch]))
+                rows += batch.num_rows
+        finally:
+            if out is not None:
+                out.close()
+        if out is None:
+            open(filepath, "wb").close()  # Nothing written; caller removes it
+        return rows
@@ -1,6 +1,8 @@
-from app.storage.reader import read_recent_metrics
-from typing import Dict, List, Optional
-import statistics
+from app.storage.hot_store import hot_store
+from app.storage.database import epoch_ms
+from app.storage.aggregate import aggregate_metrics, count_over
+from typing import Dict, Optional
+import numpy as np
 
 class ContextBuilder:
     """Build rich context for AI conversations."""
@@ -8,30 +10,31 @@ class ContextBuilder:
     @staticmethod
     def build_system_context() -> str:
         """Generate comprehensive system overview."""
-        metrics = read_recent_metrics(minutes=10)
+        metrics = hot_store.last_seconds(600, columns=("cpu_percent", "memory_percent", "disk_percent"))
+        sample_count = len(metrics["ts"])
         
-        if not metrics or len(metrics) < 2:
+        if sample_count < 2:
             return "System monitoring just started. Limited historical data available."
         
-        # Extract values
-        cpu_vals = [m["cpu_percent"] for m in metrics if m.get("cpu_percent") is not None]
-        mem_vals = [m["memory_percent"] for m in metrics if m.get("memory_percent") is not None]
-        disk_vals = [m["disk_percent"] for m in metrics if m.get("disk_percent") is not None]
+        # Extract values (NaN = missing sample)
+        cpu_vals = metrics["cpu_percent"][~np.isnan(metrics["cpu_percent"])]
+        mem_vals = metrics["memory_percent"][~np.isnan(metrics["memory_percent"])]
+        disk_vals = metrics["disk_percent"][~np.isnan(metrics["disk_percent"])]
         
         # Compute statistics
-        cpu_avg = statistics.mean(cpu_vals) if cpu_vals else 0
-        cpu_peak = max(cpu_vals) if cpu_vals else 0
-        mem_avg = statistics.mean(mem_vals) if mem_vals else 0
-        mem_peak = max(mem_vals) if mem_vals else 0
-        disk_current = disk_vals[-1] if disk_vals else 0
+        cpu_avg = float(cpu_vals.mean()) if len(cpu_vals) else 0
+        cpu_peak = float(cpu_vals.max()) if len(cpu_vals) else 0
+        mem_avg = float(mem_vals.mean()) if len(mem_vals) else 0
+        mem_peak = float(mem_vals.max()) if len(mem_vals) else 0
+        disk_current = disk_vals[-1] if len(disk_vals) else 0
         
         # Determine trends
         cpu_trend = ContextBuilder._calculate_trend(cpu_vals)
         mem_trend = ContextBuilder._calculate_trend(mem_vals)
         
         # Detect anomalies
-        high_cpu_events = sum(1 for v in cpu_vals if v > 80)
-        high_mem_events = sum(1 for v in mem_vals if v > 85)
+        high_cpu_events = int(np.count_nonzero(cpu_vals > 80))
+        high_mem_events = int(np.count_nonzero(mem_vals > 85))
         
         # Get Top Processes
         from app.system.process_manager import ProcessManager
@@ -39,12 +42,13 @@ class ContextBuilder:
         
         cpu_procs = "\n".join([f"  - {p['name']} (PID {p['pid']}): {p['value']:.1f}%" for p in top_procs['cpu']])
         mem_procs = "\n".join([f"  - {p['name']} (PID {p['pid']}): {p['value']:.0f} MB" for p in top_procs['memory']])
+        io_procs = "\n".join([f"  - {p['name']} (PID {p['pid']}): {p['value'] / (1024 * 1024):.1f} MB/s" for p in top_procs['io']]) or "  - (not available)"
         
         context = f"""
 SYSTEM OVERVIEW (Last 10 minutes)
 ==================================
 CPU:
-  - Current: {cpu_vals[-1] if cpu_vals else 0:.1f}%
+  - Current: {cpu_vals[-1] if len(cpu_vals) else 0:.1f}%
   - Average: {cpu_avg:.1f}%
   - Peak: {cpu_peak:.1f}%
   - Trend: {cpu_trend}
@@ -54,7 +58,7 @@ TOP CPU CONSUMERS:
 {cpu_procs}
 
 Memory:
-  - Current: {mem_vals[-1] if mem_vals else 0:.1f}%
+  - Current: {mem_vals[-1] if len(mem_vals) else 0:.1f}%
   - Average: {mem_avg:.1f}%
   - Peak: {mem_peak:.1f}%
   - Trend: {mem_trend}
@@ -66,16 +70,52 @@ TOP MEMORY CONSUMERS:
 Disk:
   - Current: {disk_current:.1f}%
 
+TOP DISK I/O CONSUMERS:
+{io_procs}
+{ContextBuilder._daily_summary()}
 AVAILABLE OPERATIONS:
 - You can TERMINATE any process by name or PID
 - To terminate: Tell the user to go to Performance tab -> Click ⋮ menu -> Select "Terminate"
 - You do NOT need command line (taskkill/kill) instructions, use the UI
 - You CAN identify process PIDs from the list above
 
-Total Samples: {len(metrics)}
+Total Samples: {sample_count}
 """
         return context.strip()
     
+    @staticmethod
+    def _daily_summary() -> str:
+        """Last-24h section, aggregated in the storage layer (no raw rows loaded)."""
+        try:
+            day = aggregate_metrics(
+                epoch_ms() - 86_400_000,
+                funcs=("avg", "max", "p50", "p95", "p99", count_over(80), count_over(85)),
+                columns=("cpu_percent", "memory_percent", "read_mb", "write_mb")
+            )
+        except Exception:
+            return ""
+        if not len(day["ts"]):
+            return ""
+
+        def stat(key: str) -> float:
+            value = float(day[key][0])
+            return 0.0 if np.isnan(value) else value
+
+        def pct(col: str, unit: str) -> str:
+            return ", ".join(f"{p} {stat(f'{col}_{p}'):.1f}{unit}" for p in ("p50", "p95", "p99"))
+
+        return f"""
+LAST 24 HOURS
+=============
+CPU: avg {stat("cpu_percent_avg"):.1f}%, peak {stat("cpu_percent_max"):.1f}%, samples >80%: {stat("cpu_percent_count_over_80"):.0f}
+  - Percentiles: {pct("cpu_percent", "%")}
+Memory: avg {stat("memory_percent_avg"):.1f}%, peak {stat("memory_percent_max"):.1f}%, samples >85%: {stat("memory_percent_count_over_85"):.0f}
+  - Percentiles: {pct("memory_percent", "%")}
+Disk I/O:
+  - Read: {pct("read_mb", " MB/s")}
+  - Write: {pct("write_mb", " MB/s")}
+"""
+
     @staticmethod
     def build_process_context(pid: int, name: str, cpu: float, mem: float) -> str:
         """Generate detailed process context."""
@@ -126,13 +166,13 @@ Resource Classification:
         return "".join(parts)
     
     @staticmethod
-    def _calculate_trend(values: List[float]) -> str:
+    def _calculate_trend(values: np.ndarray) -> str:
         """Determine if values are increasing, decreasing, or stable."""
         if len(values) < 10:
             return "Stable (insufficient data)"
         
-        recent = statistics.mean(values[-5:])
-        older = statistics.mean(values[-10:-5])
+        recent = float(np.mean(values[-5:]))
+        older = float(np.mean(values[-10:-5]))
         
         diff = recent - older
         
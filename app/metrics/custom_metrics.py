@@ -1,16 +1,33 @@
 import json
 import os
+import signal
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 CUSTOM_METRICS_FILE = "custom_metrics.json"
+COMMAND_TIMEOUT_S = 5.0  # A command still running after this is killed, with its children
+MAX_PARALLEL = 8         # Due metrics collected at once, each against its own deadline
 
 class CustomMetricsManager:
     """Manage user-defined custom metrics."""
     
     def __init__(self):
         self.metrics = self.load_metrics()
+        self._mtime = None
+        self._last_run: Dict[str, int] = {}  # metric name -> last collection (epoch ms)
     
+    def refresh(self):
+        """Reload definitions if the file changed (e.g. edited in Settings)."""
+        try:
+            mtime = os.path.getmtime(CUSTOM_METRICS_FILE)
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            self._mtime = mtime
+            self.metrics = self.load_metrics()
+
     def load_metrics(self) -> List[Dict]:
         """Load custom metric definitions."""
         if os.path.exists(CUSTOM_METRICS_FILE):
@@ -69,6 +86,46 @@ class CustomMetricsManager:
         """Get all enabled metrics."""
         return [m for m in self.metrics if m.get("enabled", True)]
     
+    def collect_due(self, now_ms: int) -> List[Tuple[int, int, Optional[float]]]:
+        """
+        Collect every enabled metric whose interval has elapsed.
+        
+        Returns (series_id, ts, value) rows for the samples table; a metric
+        that fails to collect (including a command that times out) gets a
+        NULL value rather than 0, so the failure shows in its history.
+        """
+        from app.storage.series import series_id
+        
+        due = []
+        for metric in self.get_enabled_metrics():
+            name = metric.get("name")
+            interval_ms = max(1, int(metric.get("interval", 60))) * 1000
+            if now_ms - self._last_run.get(name, 0) < interval_ms:
+                continue
+            self._last_run[name] = now_ms
+            due.append(metric)
+        if not due:
+            return []
+
+        # Concurrently, so one slow command does not hold back the rest
+        with ThreadPoolExecutor(max_workers=min(len(due), MAX_PARALLEL)) as pool:
+            values = list(pool.map(self._collect_or_none, due))
+
+        rows = []
+        for metric, value in zip(due, values):
+            sid = series_id(f"custom.{metric.get('name')}", labels={"type": metric.get("type", "gauge")})
+            rows.append((sid, now_ms, value))
+        return rows
+
+    def _collect_or_none(self, metric: Dict) -> Optional[float]:
+        try:
+            return self._collect(metric)
+        except subprocess.TimeoutExpired:
+            print(f"Metric {metric.get('name')} timed out after {COMMAND_TIMEOUT_S}s")
+        except Exception as e:
+            print(f"Error collecting metric {metric.get('name')}: {e}")
+        return None
+    
     def collect_metric_value(self, metric: Dict) -> float:
         """
         Collect current value for a metric.
@@ -76,35 +133,85 @@ class CustomMetricsManager:
         Returns the metric value or 0 if collection fails.
         """
         try:
-            command = metric.get("command", "")
-            
-            # If it's a Python expression, evaluate it
-            if command.startswith("python:"):
-                code = command.replace("python:", "").strip()
-                # Safe evaluation context
-                import psutil
-                context = {"psutil": psutil}
-                result = eval(code, context)
-                return float(result)
-            
-            # Otherwise execute as shell command
-            import subprocess
-            startupinfo = None
-            creationflags = 0
-            if os.name == 'nt':
-                startupinfo = subprocess.STARTUPINFO()
-                startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
-                creationflags = subprocess.CREATE_NO_WINDOW
-
-            result = subprocess.check_output(
-                command, 
-                shell=True, 
-                text=True, 
-                startupinfo=startupinfo, 
-                creationflags=creationflags
-            )
-            return float(result.strip())
-            
+            return self._collect(metric)
         except Exception as e:
             print(f"Error collecting metric {metric.get('name')}: {e}")
             return 0.0
+    
+    def _collect(self, metric: Dict) -> float:
+        """Run the metric's command or expression; raises on failure."""
+        command = metric.get("command", "")
+        
+        # If it's a Python expression, evaluate it
+        if command.startswith("python:"):
+            code = command.replace("python:", "").strip()
+            # Safe evaluation context
+            import psutil
+            context = {"psutil": psutil}
+            result = eval(code, context)
+            return float(result)
+        
+        # Otherwise execute as shell command; TimeoutExpired if it hangs
+        return float(_run_command(command, COMMAND_TIMEOUT_S).strip())
+
+
+def _run_command(command: str, timeout: float) -> str:
+    """
+    Run a shell command and return its stdout.
+
+    The command gets its own process group (a new session on POSIX), so
+    on timeout the shell and everything it started are killed together;
+    a leftover child holding stdout open can then no longer block the
+    read. Raises TimeoutExpired or CalledProcessError.
+    """
+    kwargs = {}
+    if os.name == 'nt':
+        startupinfo = subprocess.STARTUPINFO()
+        startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        kwargs["startupinfo"] = startupinfo
+        kwargs["creationflags"] = subprocess.CREATE_NO_WINDOW | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+
+    proc = subprocess.Popen(
+        command,
+        shell=True,
+        text=True,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        **kwargs
+    )
+    try:
+        output, _ = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        _kill_tree(proc)
+        raise
+    finally:
+        if proc.stdout:
+            proc.stdout.close()
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, command, output)
+    return output
+
+
+def _kill_tree(proc: subprocess.Popen) -> None:
+    """Kill `proc` and its descendants, then reap it (never blocks on pipes)."""
+    try:
+        if os.name == 'nt':
+            subprocess.run(
+                ["taskkill", "/T", "/F", "/PID", str(proc.pid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=subprocess.CREATE_NO_WINDOW,
+                timeout=COMMAND_TIMEOUT_S
+            )
+        else:
+            os.killpg(proc.pid, signal.SIGKILL)
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"Could not kill metric command tree {proc.pid}: {e}")
+    try:
+        proc.kill()
+        proc.wait(timeout=COMMAND_TIMEOUT_S)
+    except (OSError, subprocess.SubprocessError):
+        pass
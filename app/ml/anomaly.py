@@ -3,9 +3,14 @@
 from typing import List, Dict, Optional
 import numpy as np
 from sklearn.ensemble import IsolationForest
-from datetime import datetime
 import json
 
+INSERT_ANOMALY_SQL = """
+    INSERT INTO anomaly_history
+    (ts, timestamp, anomaly_type, severity, score, description, resource_values)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
 class AnomalyDetector:
     """
     IsolationForest-based anomaly detector with history tracking.
@@ -69,29 +74,33 @@ class AnomalyDetector:
         
         return anomalies
 
+    @staticmethod
+    def anomaly_row(anomaly_type: str, severity: str, score: float, description: str, resource_values: Dict) -> tuple:
+        """Parameters for INSERT_ANOMALY_SQL, stamped with the current time."""
+        from app.storage.database import epoch_ms, ms_to_iso
+        ts = epoch_ms()
+        return (
+            ts,
+            ms_to_iso(ts),
+            anomaly_type,
+            severity,
+            score,
+            description,
+            json.dumps(resource_values)
+        )
+
     @staticmethod
     def save_anomaly(anomaly_type: str, severity: str, score: float, description: str, resource_values: Dict):
         """Save anomaly to database."""
         try:
-            from app.storage.database import get_connection
-            conn = get_connection()
-            try:
+            from app.storage.database import write_connection
+            with write_connection() as conn, conn:
                 conn.execute(
-                    """INSERT INTO anomaly_history 
-                       (timestamp, anomaly_type, severity, score, description, resource_values) 
-                       VALUES (?, ?, ?, ?, ?, ?)""",
-                    (
-                        datetime.now().isoformat(),
-                        anomaly_type,
-                        severity,
-                        score,
-                        description,
-                        json.dumps(resource_values)
+                    INSERT_ANOMALY_SQL,
+                    AnomalyDetector.anomaly_row(
+                        anomaly_type, severity, score, description, resource_values
                     )
                 )
-                conn.commit()
-            finally:
-                conn.close()
         except Exception as e:
             print(f"Error saving anomaly: {e}")
 
@@ -99,18 +108,14 @@ class AnomalyDetector:
     def get_recent_anomalies(limit: int = 20) -> List[Dict]:
         """Get recent anomalies from database."""
         try:
-            from app.storage.database import get_connection
-            conn = get_connection()
-            try:
+            from app.storage.database import read_connection
+            with read_connection() as conn:
                 cur = conn.execute(
                     """SELECT * FROM anomaly_history 
-                       ORDER BY timestamp DESC LIMIT ?""",
+                       ORDER BY ts DESC LIMIT ?""",
                     (limit,)
                 )
-                rows = cur.fetchall()
-                return [dict(row) for row in rows]
-            finally:
-                conn.close()
+                return [dict(row) for row in cur.fetchall()]
         except Exception as e:
             print(f"Error reading anomalies: {e}")
             return []
@@ -1,6 +1,6 @@
 # app/ml/enhanced_forecaster.py
 
-from typing import Dict, List, Optional
+from typing import Dict, Optional
 import numpy as np
 from app.ml.forecast import ResourceForecaster
 
@@ -17,12 +17,13 @@ class EnhancedResourceForecaster(ResourceForecaster):
         # or share the underlying model logic.
         # For simplicity and robustness, we reuse the base logic per resource.
     
-    def predict_all_resources(self, metrics_history: List[Dict]) -> Dict[str, Dict]:
+    def predict_all_resources(self, metrics_history: Dict[str, np.ndarray]) -> Dict[str, Dict]:
         """
         Predict future usage for all available resources.
         
         Args:
-            metrics_history: List of metric dictionaries from storage.
+            metrics_history: Columnar metric arrays ({"cpu_percent": array, ...})
+                             from the hot store; NaN marks missing samples.
             
         Returns:
             Dictionary mapping resource name to prediction details.
@@ -33,7 +34,7 @@ class EnhancedResourceForecaster(ResourceForecaster):
                 ...
             }
         """
-        if not metrics_history:
+        if not metrics_history or len(metrics_history.get("ts", ())) == 0:
             return {}
             
         predictions = {}
@@ -48,10 +49,11 @@ class EnhancedResourceForecaster(ResourceForecaster):
         
         for res_name, key in resources.items():
             # Extract series
-            series = [
-                m.get(key) for m in metrics_history 
-                if m.get(key) is not None
-            ]
+            values = metrics_history.get(key)
+            if values is None:
+                continue
+            values = np.asarray(values, dtype=float)
+            series = values[~np.isnan(values)]
             
             if len(series) < 5:
                 continue
@@ -5,6 +5,8 @@ import numpy as np
 
 FEATURE_ORDER = [
     "cpu_percent",
+    "cpu_max_core",   # one pegged core hides in the all-core average
+    "cpu_iowait",
     "memory_percent",
     "disk_percent",
     "read_mb",
@@ -26,5 +28,19 @@ def extract_features(metric: Dict[str, float]) -> np.ndarray:
 def batch_features(metrics: List[Dict[str, float]]) -> np.ndarray:
     """
     Convert a list of metric dicts into a feature matrix.
+    Prefer column_features with read_metrics_columns / the hot store.
     """
-    return np.vstack([extract_features(m) for m in metrics])
+    return np.array(
+        [[m.get(key, 0.0) for key in FEATURE_ORDER] for m in metrics],
+        dtype=float
+    ).reshape(len(metrics), len(FEATURE_ORDER))
+
+def column_features(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Build the feature matrix straight from columnar metric arrays
+    (as returned by the hot store). Missing values (NaN) default to 0.
+    """
+    return np.column_stack([
+        np.nan_to_num(np.asarray(columns[key], dtype=float), nan=0.0)
+        for key in FEATURE_ORDER
+    ])
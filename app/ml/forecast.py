@@ -1,6 +1,6 @@
 # app/ml/forecast.py
 
-from typing import Dict
+from typing import Dict, Optional, Tuple
 import numpy as np
 from sklearn.linear_model import LinearRegression
 
@@ -101,3 +101,66 @@ class ResourceForecaster:
             "confidence": float(confidence)
         }
 
+
+def rolling_linear_forecast(
+    values: np.ndarray,
+    window: int = 30,
+    horizon: int = 10,
+    clamp: Optional[Tuple[float, float]] = (0.0, 100.0)
+) -> np.ndarray:
+    """
+    Vectorized rolling version of ResourceForecaster._predict_resource.
+
+    For every sample i, fits a line over the last `window` samples (fewer
+    at the start) and evaluates it `horizon` steps past the window, in one
+    pass: windowed sums of x, x², y and xy come from cumulative sums, so
+    the cost is O(n) whatever the window. NaN samples are left out of the
+    fit; a window with a single valid sample predicts that sample, one
+    with none predicts NaN.
+
+    Cumulative sums lose precision on very long arrays; stream long
+    histories in chunks, carrying the last window - 1 values across.
+
+    Args:
+        values: Samples, oldest first
+        window: Samples per fit (30 matches the dashboard forecasts)
+        horizon: Steps ahead of the newest sample in each window
+        clamp: (low, high) bounds applied to predictions, or None
+
+    Returns:
+        float64 array of predictions, aligned with `values`
+    """
+    y = np.asarray(values, dtype=np.float64)
+    n = len(y)
+    if n == 0:
+        return np.empty(0)
+
+    valid = ~np.isnan(y)
+    w = valid.astype(np.float64)
+    yv = np.where(valid, y, 0.0)
+    x = np.arange(n, dtype=np.float64)
+    lo = np.maximum(np.arange(n) + 1 - window, 0)
+
+    def windowed(a: np.ndarray) -> np.ndarray:
+        c = np.concatenate(([0.0], np.cumsum(a)))
+        return c[1:] - c[lo]
+
+    s0 = windowed(w)
+    sx = windowed(x * w)
+    sxx = windowed(x * x * w)
+    sy = windowed(yv)
+    sxy = windowed(x * yv)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = sx / s0
+        mean_y = sy / s0
+        var_x = sxx - sx * mean_x
+        cov_xy = sxy - sx * mean_y
+        # Two distinct integer x's give var_x >= 0.5; anything less is rounding
+        slope = np.where((s0 >= 2) & (var_x > 0.25), cov_xy / var_x, 0.0)
+
+    # _predict_resource evaluates at len(window) + horizon in window coordinates
+    pred = mean_y + slope * (x + 1 + horizon - mean_x)
+    if clamp is not None:
+        pred = np.clip(pred, clamp[0], clamp[1])
+    return pred
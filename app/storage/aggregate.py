@@ -0,0 +1,251 @@
+# app/storage/aggregate.py
+
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from app.storage.database import read_connection, epoch_ms, ROLLUP_TIERS
+from app.storage.reader import _check_columns, read_metrics_columns
+from app.storage.retention import tier_retention_days
+from app.storage.partitions import metrics_source
+from app.storage.sketch import DDSketch
+
+_BASIC_FUNCS = {"avg", "min", "max", "count"}
+
+# Answered from a rollup tier's sketch column rather than count/sum/min/max
+_SKETCH_FUNCS = {"percentile", "count_over"}
+
+# Reported as 0, not NaN, for a bucket where a metric had no samples
+_COUNT_FUNCS = {"count", "count_over"}
+
+# Rollup buckets only stand in for raw rows once a range spans this many of them,
+# so the partially covered edge buckets are a small fraction of the result.
+_MIN_TIER_BUCKETS = 60
+
+
+class _Func(NamedTuple):
+    key: str              # Suffix used in the result, e.g. "p95", "count_over_80"
+    kind: str             # avg | min | max | count | percentile | count_over
+    arg: Optional[float]  # Percentile rank or threshold
+
+
+def count_over(threshold: float) -> str:
+    """Spelling of the "samples above `threshold`" function for aggregate_metrics."""
+    return f"count_over:{threshold:g}"
+
+
+def aggregate_metrics(
+    start: int,
+    end: Optional[int] = None,
+    bucket: Optional[int] = None,
+    funcs: Iterable[str] = ("avg", "min", "max"),
+    columns: Optional[Iterable[str]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Time-bucketed aggregates over [start, end) without materializing samples.
+
+    Args:
+        start: Inclusive range start (epoch ms)
+        end: Exclusive range end (epoch ms), defaults to now
+        bucket: Bucket width in ms; None aggregates the whole range as one bucket
+        funcs: Any of "avg", "min", "max", "count", "pNN" (e.g. "p95") and
+            count_over(threshold) ("count_over:80" = samples above 80)
+        columns: Metric columns, defaults to all of METRIC_COLUMNS
+
+    Returns:
+        {"ts": int64 bucket starts, "<column>_<func>": float64 array, ...}
+        for buckets holding at least one sample; NaN where a metric had none
+        (0 for count and count_over), whichever path answered the query.
+        count_over keys drop the colon, e.g. "cpu_percent_count_over_80".
+
+    Long ranges come from the coarsest rollup tier whose width divides
+    `bucket` (edge buckets snap to that width); percentiles and
+    count_over there merge the tier's quantile sketches, so they carry
+    the sketch's 1% relative error. Shorter ranges run as one GROUP BY
+    on the ts index, with percentiles, or ranges reaching into the
+    segment archive, computed in NumPy from columnar reads.
+    """
+    cols = _check_columns(columns)
+    specs = [_parse_func(f) for f in funcs]
+    if end is None:
+        end = epoch_ms() + 1
+    if end <= start:
+        return _empty(cols, specs)
+    width = int(bucket) if bucket else end - start
+
+    tier = _pick_tier(start, end, bucket)
+    if tier is not None:
+        return _aggregate_rollup(tier, start, end, width, cols, specs)
+
+    from app.storage.archive import ARCHIVE_ENABLED, sealed_through
+    archived = ARCHIVE_ENABLED and start < sealed_through()
+    if archived or any(s.kind == "percentile" for s in specs):
+        return _aggregate_numpy(start, end, width, cols, specs)
+    return _aggregate_sql(start, end, width, cols, specs)
+
+
+def _parse_func(name: str) -> _Func:
+    if name in _BASIC_FUNCS:
+        return _Func(name, name, None)
+    if name.startswith("count_over:"):
+        threshold = float(name.split(":", 1)[1])
+        return _Func(f"count_over_{threshold:g}", "count_over", threshold)
+    if name.startswith("p") and name[1:].replace(".", "", 1).isdigit():
+        rank = float(name[1:])
+        if 0 <= rank <= 100:
+            return _Func(name, "percentile", rank)
+    raise ValueError(f"Unknown aggregate function: {name}")
+
+
+def _pick_tier(start: int, end: int, bucket: Optional[int]) -> Optional[str]:
+    age_days = (epoch_ms() - start) / 86_400_000
+    for tier, tier_width in reversed(list(ROLLUP_TIERS.items())):
+        if ((not bucket or bucket % tier_width == 0)
+                and (end - start) >= _MIN_TIER_BUCKETS * tier_width
+                and age_days <= tier_retention_days(tier)):
+            return tier
+    return None
+
+
+def _empty(cols: tuple, specs: List[_Func]) -> Dict[str, np.ndarray]:
+    out = {"ts": np.empty(0, dtype=np.int64)}
+    out.update({f"{c}_{s.key}": np.empty(0) for c in cols for s in specs})
+    return out
+
+
+def _aggregate_sql(start: int, end: int, width: int, cols: tuple, specs: List[_Func]) -> Dict[str, np.ndarray]:
+    """One GROUP BY over the ts index range; a row per non-empty bucket."""
+    exprs: List[str] = []
+    params: List = [start, width]
+    for c in cols:
+        for s in specs:
+            if s.kind == "count_over":
+                exprs.append(f"COALESCE(SUM({c} > ?), 0)")
+                params.append(s.arg)
+            else:
+                exprs.append(f"{s.kind.upper()}({c})")
+    params += [start, end]
+
+    with read_connection() as conn:
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute(f"""
+            SELECT (ts - ?) / ? AS b, {", ".join(exprs)}
+            FROM {metrics_source(start, end)}
+            WHERE ts >= ? AND ts < ?
+            GROUP BY b
+            ORDER BY b
+        """, params)
+        rows = cur.fetchall()
+
+    if not rows:
+        return _empty(cols, specs)
+    data = np.array(rows, dtype=np.float64)  # NULL -> nan
+    out = {"ts": start + data[:, 0].astype(np.int64) * width}
+    i = 1
+    for c in cols:
+        for s in specs:
+            out[f"{c}_{s.key}"] = np.ascontiguousarray(data[:, i])
+            i += 1
+    return out
+
+
+def _aggregate_rollup(
+    tier: str,
+    start: int,
+    end: int,
+    width: int,
+    cols: tuple,
+    specs: List[_Func]
+) -> Dict[str, np.ndarray]:
+    """Re-bucket rollup rows in SQL: counts and sums add, extremes fold, sketches merge."""
+    need_sketch = any(s.kind in _SKETCH_FUNCS for s in specs)
+    with read_connection() as conn:
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute(f"""
+            SELECT (bucket_ts - ?) / ? AS b, metric,
+                   SUM(count), SUM(sum), MIN(min), MAX(max)
+                   {", sketch_union(sketch)" if need_sketch else ""}
+            FROM metrics_rollup_{tier}
+            WHERE bucket_ts >= ? AND bucket_ts < ?
+              AND metric IN ({", ".join("?" for _ in cols)})
+            GROUP BY b, metric
+            ORDER BY b
+        """, (start, width, start, end) + cols)
+        rows = cur.fetchall()
+
+    if not rows:
+        return _empty(cols, specs)
+    b = np.array([r[0] for r in rows], dtype=np.int64)
+    which = np.array([cols.index(r[1]) for r in rows])
+    data = np.array([r[2:6] for r in rows], dtype=np.float64)  # count, sum, min, max
+    buckets, pos = np.unique(b, return_inverse=True)
+
+    derived = {
+        "avg": data[:, 1] / data[:, 0],
+        "min": data[:, 2],
+        "max": data[:, 3],
+        "count": data[:, 0],
+    }
+    if need_sketch:
+        sketches = [DDSketch.from_bytes(r[6]) if r[6] is not None else None for r in rows]
+        for s in specs:
+            if s.kind == "percentile":
+                derived[s.key] = np.array([
+                    sk.quantile(s.arg / 100) if sk is not None else np.nan for sk in sketches
+                ])
+            elif s.kind == "count_over":
+                derived[s.key] = np.array([
+                    sk.count_above(s.arg) if sk is not None else 0 for sk in sketches
+                ], dtype=np.float64)
+
+    out = {"ts": start + buckets * width}
+    for i, c in enumerate(cols):
+        mask = which == i
+        for s in specs:
+            arr = np.full(len(buckets), 0.0 if s.kind in _COUNT_FUNCS else np.nan)
+            arr[pos[mask]] = derived[s.kind if s.kind in _BASIC_FUNCS else s.key][mask]
+            out[f"{c}_{s.key}"] = arr
+    return out
+
+
+def _aggregate_numpy(start: int, end: int, width: int, cols: tuple, specs: List[_Func]) -> Dict[str, np.ndarray]:
+    """Columnar read, then per-bucket reductions over contiguous runs."""
+    raw = read_metrics_columns(start, end, columns=cols)
+    ts = raw["ts"]
+    if len(ts) == 0:
+        return _empty(cols, specs)
+
+    b = (ts - start) // width
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(b)) + 1))
+    bounds = np.append(starts, len(ts))
+    out = {"ts": start + b[starts] * width}
+
+    for c in cols:
+        values = raw[c]
+        valid = ~np.isnan(values)
+        counts = np.add.reduceat(valid.astype(np.int64), starts).astype(np.float64)
+        empty = counts == 0
+        for s in specs:
+            if s.kind == "count":
+                arr = counts
+            elif s.kind == "avg":
+                sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+                arr = sums / np.where(empty, 1, counts)
+            elif s.kind == "min":
+                arr = np.minimum.reduceat(np.where(valid, values, np.inf), starts)
+            elif s.kind == "max":
+                arr = np.maximum.reduceat(np.where(valid, values, -np.inf), starts)
+            elif s.kind == "count_over":
+                arr = np.add.reduceat((values > s.arg).astype(np.int64), starts).astype(np.float64)
+            else:
+                arr = np.array([
+                    np.percentile(v[~np.isnan(v)], s.arg) if n else np.nan
+                    for v, n in zip(np.split(values, bounds[1:-1]), counts)
+                ])
+            arr = np.asarray(arr, dtype=np.float64).copy()
+            if s.kind not in _COUNT_FUNCS:
+                arr[empty] = np.nan
+            out[f"{c}_{s.key}"] = arr
+    return out
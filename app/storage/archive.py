@@ -0,0 +1,386 @@
+# app/storage/archive.py
+
+import os
+import struct
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from app.storage.database import DB_PATH, METRIC_COLUMNS, read_connection, epoch_ms
+from app.storage.partitions import metrics_source, delete_metrics_range
+
+# Sealed history lives next to the database, one segment file per UTC day.
+ARCHIVE_DIR = DB_PATH.parent / "archive"
+ARCHIVE_ENABLED = True
+ARCHIVE_RETENTION_DAYS = 180
+SEAL_AFTER_DAYS = 1   # A day is sealed once it is this many days in the past
+BLOCK_ROWS = 1024     # Rows per independently decodable block
+DAY_MS = 86_400_000
+
+# -------------------------------------------------
+# File layout (little endian)
+#
+#   header   magic "SNSG", version, n_columns, n_blocks, index_offset
+#   names    n_columns x (u8 length + utf-8 name)
+#   blocks   per block: ts stream, then one stream per column,
+#            each stream prefixed with its u32 byte length
+#   index    per block: offset, length, rows, ts_min, ts_max
+# -------------------------------------------------
+_MAGIC = b"SNSG"
+_VERSION = 2
+_FILE_HEADER = struct.Struct("<4sBHIQ")
+_BLOCK_ENTRY = struct.Struct("<QIIqq")
+_STREAM_LEN = struct.Struct("<I")
+
+
+# -------------------------------------------------
+# Sparse fixed-width bit packing
+#
+# Both codecs reduce a block to one uint64 per row that is mostly zero
+# (delta-of-delta, XOR with the previous value) and pack it whole-array
+# with NumPy: a bitmap of the non-zero rows, then every non-zero value
+# shifted right by the block's common trailing zeros and written in the
+# block's common width. No per-row Python work in either direction.
+# -------------------------------------------------
+_SPARSE_HEADER = struct.Struct("<BB")  # shift, width
+
+
+def _pack_sparse(values: np.ndarray) -> bytes:
+    nonzero = values != 0
+    nz = values[nonzero]
+    if len(nz) == 0:
+        return _SPARSE_HEADER.pack(0, 0) + np.packbits(nonzero).tobytes()
+    # Trailing zeros of each value from its lowest set bit (an exact power of two)
+    lowest = nz & (~nz + np.uint64(1))
+    shift = int(np.log2(lowest.astype(np.float64)).min())
+    nz = nz >> np.uint64(shift)
+    width = int(nz.max()).bit_length()
+    # Big-endian bytes -> 64 bits per row, keep the low `width` bits
+    bits = np.unpackbits(nz.astype(">u8").view(np.uint8).reshape(-1, 8), axis=1)[:, 64 - width:]
+    return (
+        _SPARSE_HEADER.pack(shift, width)
+        + np.packbits(nonzero).tobytes()
+        + np.packbits(bits).tobytes()
+    )
+
+
+def _unpack_sparse(data: bytes, n: int) -> np.ndarray:
+    shift, width = _SPARSE_HEADER.unpack_from(data)
+    buf = np.frombuffer(data, dtype=np.uint8, offset=_SPARSE_HEADER.size)
+    flag_bytes = (n + 7) // 8
+    nonzero = np.unpackbits(buf[:flag_bytes], count=n).astype(bool)
+    out = np.zeros(n, dtype=np.uint64)
+    k = int(nonzero.sum())
+    if k:
+        bits = np.zeros((k, 64), dtype=np.uint8)
+        bits[:, 64 - width:] = np.unpackbits(buf[flag_bytes:], count=k * width).reshape(k, width)
+        values = np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+        out[nonzero] = values << np.uint64(shift)
+    return out
+
+
+# -------------------------------------------------
+# Delta-of-delta timestamps
+# -------------------------------------------------
+_TS_HEADER = struct.Struct("<qq")  # first ts, first delta
+
+
+def _encode_timestamps(ts: np.ndarray) -> bytes:
+    ts = np.asarray(ts, dtype=np.int64)
+    first_delta = int(ts[1] - ts[0]) if len(ts) > 1 else 0
+    dod = np.diff(ts, n=2)
+    zigzag = ((dod << 1) ^ (dod >> 63)).view(np.uint64)
+    return _TS_HEADER.pack(int(ts[0]), first_delta) + _pack_sparse(zigzag)
+
+
+def _decode_timestamps(data: bytes, n: int) -> np.ndarray:
+    first, first_delta = _TS_HEADER.unpack_from(data)
+    zigzag = _unpack_sparse(data[_TS_HEADER.size:], max(n - 2, 0))
+    dod = (zigzag >> np.uint64(1)).view(np.int64) ^ -(zigzag & np.uint64(1)).view(np.int64)
+    deltas = np.concatenate(([first_delta], first_delta + np.cumsum(dod)))
+    return np.concatenate(([first], first + np.cumsum(deltas)))[:n].astype(np.int64)
+
+
+# -------------------------------------------------
+# XOR floats (Gorilla-style, one bit window per block)
+# -------------------------------------------------
+def _encode_floats(values: np.ndarray) -> bytes:
+    words = np.ascontiguousarray(values, dtype=np.float64).view(np.uint64)
+    return struct.pack("<Q", int(words[0])) + _pack_sparse(words[1:] ^ words[:-1])
+
+
+def _decode_floats(data: bytes, n: int) -> np.ndarray:
+    (first,) = struct.unpack_from("<Q", data)
+    xors = _unpack_sparse(data[8:], n - 1)
+    words = np.bitwise_xor.accumulate(np.concatenate(([np.uint64(first)], xors)))
+    return words.view(np.float64)
+
+
+# -------------------------------------------------
+# Segment files
+# -------------------------------------------------
+def write_segment(path: Path, columns: Dict[str, np.ndarray]) -> None:
+    """
+    Write columnar samples ({"ts": ..., <metric>: ...}, ascending ts) as a
+    compressed segment. The file is written to a temp name, fsynced and
+    renamed, so readers never see a partial segment.
+    """
+    ts = columns["ts"]
+    names = [c for c in columns if c != "ts"]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+
+    with open(tmp, "wb") as f:
+        f.write(_FILE_HEADER.pack(_MAGIC, _VERSION, len(names), 0, 0))
+        for name in names:
+            raw = name.encode("utf-8")
+            f.write(struct.pack("<B", len(raw)) + raw)
+
+        index = []
+        for start in range(0, len(ts), BLOCK_ROWS):
+            block = slice(start, start + BLOCK_ROWS)
+            block_ts = ts[block]
+            payload = bytearray()
+            for stream in [_encode_timestamps(block_ts)] + [
+                _encode_floats(columns[name][block]) for name in names
+            ]:
+                payload += _STREAM_LEN.pack(len(stream)) + stream
+            index.append(
+                _BLOCK_ENTRY.pack(f.tell(), len(payload), len(block_ts), int(block_ts[0]), int(block_ts[-1]))
+            )
+            f.write(payload)
+
+        index_offset = f.tell()
+        f.write(b"".join(index))
+        f.seek(0)
+        f.write(_FILE_HEADER.pack(_MAGIC, _VERSION, len(names), len(index), index_offset))
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp, path)
+
+
+class Segment:
+    """Read access to one sealed segment file via its block index."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, n_cols, n_blocks, index_offset = _FILE_HEADER.unpack(f.read(_FILE_HEADER.size))
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError(f"Not a metrics segment: {path}")
+            self.columns = []
+            for _ in range(n_cols):
+                (size,) = struct.unpack("<B", f.read(1))
+                self.columns.append(f.read(size).decode("utf-8"))
+            f.seek(index_offset)
+            self.blocks = []
+            for _ in range(n_blocks):
+                offset, length, rows, ts_min, ts_max = _BLOCK_ENTRY.unpack(f.read(_BLOCK_ENTRY.size))
+                self.blocks.append({
+                    "offset": offset,
+                    "length": length,
+                    "rows": rows,
+                    "ts_min": ts_min,
+                    "ts_max": ts_max,
+                })
+
+    def read(self, start: int, end: int, columns: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Decode only the blocks and columns overlapping [start, end)."""
+        cols = tuple(columns)
+        parts: Dict[str, List[np.ndarray]] = {"ts": []}
+        parts.update({c: [] for c in cols})
+        for chunk in self.iter_blocks(start, end, cols):
+            for key in parts:
+                parts[key].append(chunk[key])
+        return _concat_parts(parts)
+
+    def iter_blocks(self, start: int, end: int, columns: Iterable[str]) -> Iterator[Dict[str, np.ndarray]]:
+        """Yield the overlapping blocks one at a time (at most BLOCK_ROWS rows each)."""
+        cols = tuple(columns)
+        wanted = {self.columns.index(c): c for c in cols if c in self.columns}
+
+        with open(self.path, "rb") as f:
+            for block in self.blocks:
+                if block["ts_max"] < start or block["ts_min"] >= end:
+                    continue  # Skipped on the index alone
+                f.seek(block["offset"])
+                data = f.read(block["length"])
+                rows = block["rows"]
+
+                streams = []
+                pos = 0
+                while pos < len(data):
+                    (size,) = _STREAM_LEN.unpack_from(data, pos)
+                    pos += _STREAM_LEN.size
+                    streams.append(data[pos:pos + size])
+                    pos += size
+
+                ts = _decode_timestamps(streams[0], rows)
+                keep = (ts >= start) & (ts < end)
+                chunk = {"ts": ts[keep]}
+                for c in cols:
+                    chunk[c] = np.full(int(keep.sum()), np.nan)
+                for i, c in wanted.items():
+                    chunk[c] = _decode_floats(streams[i + 1], rows)[keep]
+                yield chunk
+
+
+def _concat_parts(parts: Dict[str, List[np.ndarray]]) -> Dict[str, np.ndarray]:
+    out = {}
+    for key, arrays in parts.items():
+        dtype = np.int64 if key == "ts" else np.float64
+        out[key] = np.concatenate(arrays).astype(dtype, copy=False) if arrays else np.empty(0, dtype=dtype)
+    return out
+
+
+# -------------------------------------------------
+# Segment catalogue
+# -------------------------------------------------
+_catalogue: Dict[str, object] = {"mtime": None, "segments": []}
+_segment_cache: Dict[Path, Tuple[float, Segment]] = {}
+
+
+def _day_start(ts: int) -> int:
+    return ts - ts % DAY_MS
+
+
+def segment_path(day_start: int) -> Path:
+    day = datetime.fromtimestamp(day_start / 1000, tz=timezone.utc)
+    return ARCHIVE_DIR / f"metrics-{day:%Y%m%d}.seg"
+
+
+def list_segments() -> List[Tuple[int, Path]]:
+    """(day_start_ms, path) for every sealed day, oldest first."""
+    try:
+        mtime = ARCHIVE_DIR.stat().st_mtime
+    except FileNotFoundError:
+        return []
+    if _catalogue["mtime"] != mtime:
+        segments = []
+        for entry in os.scandir(ARCHIVE_DIR):
+            name = entry.name
+            if not (name.startswith("metrics-") and name.endswith(".seg")):
+                continue
+            try:
+                day = datetime.strptime(name[8:16], "%Y%m%d").replace(tzinfo=timezone.utc)
+            except ValueError:
+                continue
+            segments.append((int(day.timestamp() * 1000), Path(entry.path)))
+        _catalogue["segments"] = sorted(segments)
+        _catalogue["mtime"] = mtime
+    return list(_catalogue["segments"])
+
+
+def sealed_through() -> int:
+    """End (epoch ms) of the newest sealed day, or 0 if nothing is archived."""
+    segments = list_segments()
+    return segments[-1][0] + DAY_MS if segments else 0
+
+
+def _open_segment(path: Path) -> Segment:
+    mtime = path.stat().st_mtime
+    cached = _segment_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, Segment(path))
+        _segment_cache[path] = cached
+    return cached[1]
+
+
+def read_archive_columns(start: int, end: int, columns: Iterable[str]) -> Dict[str, np.ndarray]:
+    """Columnar read of [start, end) across every overlapping segment."""
+    cols = tuple(columns)
+    parts: Dict[str, List[np.ndarray]] = {"ts": []}
+    parts.update({c: [] for c in cols})
+    for day_start, path in list_segments():
+        if day_start + DAY_MS <= start or day_start >= end:
+            continue
+        chunk = _open_segment(path).read(start, end, cols)
+        for key in parts:
+            parts[key].append(chunk[key])
+    return _concat_parts(parts)
+
+
+def iter_archive_columns(start: int, end: int, columns: Iterable[str]) -> Iterator[Dict[str, np.ndarray]]:
+    """Stream [start, end) from the archive block by block, oldest first."""
+    cols = tuple(columns)
+    for day_start, path in list_segments():
+        if day_start + DAY_MS <= start or day_start >= end:
+            continue
+        yield from _open_segment(path).iter_blocks(start, end, cols)
+
+
+# -------------------------------------------------
+# Sealing and archive retention
+# -------------------------------------------------
+def seal_closed_days(delete_batch: int = 2000) -> int:
+    """
+    Move closed days of raw metrics from SQLite into segment files.
+
+    Days are sealed oldest first and only once the scheduled rollup job
+    has folded them in; sealing never runs rollups itself, it only reads
+    the watermark. Rows are deleted from SQLite in small batches after
+    the segment is safely on disk. Returns the number of days sealed.
+    """
+    if not ARCHIVE_ENABLED:
+        return 0
+
+    from app.storage.reader import read_metrics_columns
+    from app.storage.rollup import rollup_watermark
+
+    watermark = rollup_watermark()
+    limit = _day_start(epoch_ms()) - (SEAL_AFTER_DAYS - 1) * DAY_MS
+
+    sealed = 0
+    with read_connection() as conn:
+        oldest = conn.execute(f"SELECT MIN(ts) FROM {metrics_source()}").fetchone()[0]
+    if oldest is None:
+        return 0
+    for day in range(_day_start(oldest), limit, DAY_MS):
+        with read_connection() as conn:
+            max_id = conn.execute(
+                f"SELECT MAX(id) FROM {metrics_source(day, day + DAY_MS)} WHERE ts >= ? AND ts < ?",
+                (day, day + DAY_MS)
+            ).fetchone()[0]
+        if max_id is None:
+            continue
+        if max_id > watermark:
+            break  # Not rolled up yet; keep raw rows until it is
+
+        columns = read_metrics_columns(day, day + DAY_MS, include_archive=False)
+        path = segment_path(day)
+        if path.exists():
+            # Late rows for an already sealed day: merge and rewrite. Rows
+            # the segment already holds (e.g. raw rows brought back by
+            # restoring a backup) are not added a second time.
+            existing = _open_segment(path).read(day, day + DAY_MS, METRIC_COLUMNS)
+            fresh = ~np.isin(columns["ts"], existing["ts"])
+            merged = {k: np.concatenate((existing[k], columns[k][fresh])) for k in columns}
+            order = np.argsort(merged["ts"], kind="stable")
+            columns = {k: v[order] for k, v in merged.items()}
+        write_segment(path, columns)
+
+        # Whole day partitions are dropped; the legacy table is batch-deleted
+        delete_metrics_range(day, day + DAY_MS, delete_batch)
+        sealed += 1
+    return sealed
+
+
+def prune_archive(days: int = ARCHIVE_RETENTION_DAYS) -> int:
+    """Drop whole segment files older than `days`. Returns files removed."""
+    cutoff = _day_start(epoch_ms()) - days * DAY_MS
+    removed = 0
+    for day_start, path in list_segments():
+        if day_start >= cutoff:
+            break
+        path.unlink(missing_ok=True)
+        _segment_cache.pop(path, None)
+        removed += 1
+    return removed
+
+
+def run_archive() -> Tuple[int, int]:
+    """Scheduled job: seal closed days, then apply archive retention."""
+    return seal_closed_days(), prune_archive()
@@ -0,0 +1,141 @@
+# app/storage/async_storage.py
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.collectors.schema import MetricSample
+from app.storage.writer import MetricsWriter
+from app.storage import reader
+
+
+class AsyncStorage:
+    """
+    Awaitable facade over the storage layer for code running on the event loop.
+
+    Writes are queued to the single MetricsWriter thread and never touch
+    disk on the caller's thread. Reads run on a small fixed pool of
+    threads borrowing pooled connections from database.connections, so
+    a read costs one query rather than a connect + query + close.
+    Concurrent reads beyond the pool size wait in the executor's queue.
+    """
+
+    def __init__(self, read_workers: int = 2, **writer_options):
+        """
+        Args:
+            read_workers: Threads (and connections) serving reads
+            writer_options: Passed through to MetricsWriter
+        """
+        self.read_workers = max(1, read_workers)
+        self.writer = MetricsWriter(**writer_options)
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    def start(self) -> None:
+        """Start the writer thread and the read pool (idempotent)."""
+        self.writer.start()
+        self._read_pool()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flush queued writes and release the read pool."""
+        self.writer.stop(timeout)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+    def _read_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.read_workers,
+                thread_name_prefix="sentinel-db-read"
+            )
+        return self._pool
+
+    async def run_read(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run any blocking read function on the read pool and await its result."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._read_pool(), functools.partial(fn, *args, **kwargs)
+        )
+
+    # -------------------------------------------------
+    # Writes (queued, never block the loop)
+    # -------------------------------------------------
+    def submit_metrics(self, sample: MetricSample) -> None:
+        self.writer.submit(sample)
+
+    def submit_samples(self, rows: Iterable[Tuple[int, int, float]]) -> None:
+        """Queue (series_id, ts, value) rows for the samples table."""
+        self.writer.submit_samples(rows)
+
+    def execute(self, sql: str, params: Tuple = ()) -> None:
+        """Queue a write; runs on the writer thread if it is up, else on the read pool."""
+        if self.writer.running:
+            self.writer.execute(sql, params)
+        else:
+            self._read_pool().submit(_execute_now, sql, params)
+
+    def submit_cpu_cores(self, ts: int, percents: Iterable[float]) -> None:
+        """Queue one tick of per-core utilization (packed float32 row)."""
+        from app.storage.cpu_cores import INSERT_CPU_CORES_SQL, cpu_cores_row
+        percents = list(percents)
+        if percents:
+            self.execute(INSERT_CPU_CORES_SQL, cpu_cores_row(ts, percents))
+
+    def save_anomaly(self, **anomaly) -> None:
+        """Queue an anomaly_history row (same arguments as AnomalyDetector.save_anomaly)."""
+        from app.ml.anomaly import AnomalyDetector, INSERT_ANOMALY_SQL
+        self.execute(INSERT_ANOMALY_SQL, AnomalyDetector.anomaly_row(**anomaly))
+
+    async def flush(self, timeout: float = 5.0) -> bool:
+        """Await until everything queued so far is committed."""
+        return await asyncio.to_thread(self.writer.flush, timeout)
+
+    # -------------------------------------------------
+    # Reads
+    # -------------------------------------------------
+    async def read_recent_metrics(self, minutes: int) -> List[Dict]:
+        return await self.run_read(reader.read_recent_metrics, minutes)
+
+    async def read_metrics_columns(
+        self,
+        start: int,
+        end: Optional[int] = None,
+        columns: Optional[Iterable[str]] = None
+    ) -> Dict[str, np.ndarray]:
+        return await self.run_read(reader.read_metrics_columns, start, end, columns)
+
+    async def read_metrics_since(
+        self,
+        last_id: int,
+        columns: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        return await self.run_read(reader.read_metrics_since, last_id, columns, limit)
+
+    async def read_rollup(self, tier: str, start: int, end: Optional[int] = None, **kwargs) -> Dict[str, np.ndarray]:
+        from app.storage.rollup import read_rollup
+        return await self.run_read(read_rollup, tier, start, end, **kwargs)
+
+    async def read_series(self, sid: int, start: int, end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        from app.storage.series import read_series
+        return await self.run_read(read_series, sid, start, end)
+
+    async def read_cpu_cores(self, start: int, end: Optional[int] = None) -> Dict[str, np.ndarray]:
+        from app.storage.cpu_cores import read_cpu_cores
+        return await self.run_read(read_cpu_cores, start, end)
+
+    async def read_latest_overload_prediction(self) -> Dict:
+        return await self.run_read(reader.read_latest_overload_prediction)
+
+
+def _execute_now(sql: str, params: Tuple) -> None:
+    from app.storage.database import write_connection
+    with write_connection() as conn, conn:
+        conn.execute(sql, params)
+
+
+# Process-wide facade shared by the backend loop and the UI
+storage = AsyncStorage(flush_interval=5.0, batch_size=50)
@@ -0,0 +1,253 @@
+# app/storage/backup.py
+
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from app.storage import partitions
+from app.storage.archive import ARCHIVE_DIR, list_segments
+from app.storage.database import DB_PATH, connections, get_connection, initialize_database
+
+# Snapshots live next to the database
+BACKUP_DIR = DB_PATH.parent / "backups"
+BACKUP_KEEP = 7              # Newest snapshots kept by rotation
+BACKUP_PAGES_PER_STEP = 256  # Pages copied per backup step (1 MB at 4 KB pages)
+BACKUP_STEP_SLEEP = 0.01     # Seconds yielded between steps
+
+_PREFIX = "sys_sentinel_"
+
+# progress(pages_copied, total_pages)
+BackupProgress = Callable[[int, int], None]
+
+_running = threading.Lock()
+
+
+def snapshot_database(
+    dest_dir: Optional[Path] = None,
+    compress: bool = True,
+    keep: Optional[int] = BACKUP_KEEP,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    sleep: float = BACKUP_STEP_SLEEP,
+    progress: Optional[BackupProgress] = None
+) -> Path:
+    """
+    Copy the live database with SQLite's online backup API, plus the
+    sealed archive segments, which hold every day already removed from it.
+
+    The copy runs in steps of `pages` pages from a dedicated connection
+    that holds one read transaction for the whole copy. Under WAL that
+    pins a consistent snapshot without blocking the writer, and commits
+    made meanwhile do not restart the backup. The result is checked with
+    PRAGMA quick_check before it replaces anything.
+
+    Segments go into a `<snapshot>.archive` directory beside the snapshot
+    file. They are listed after the database copy, so every day sealed
+    out of the copied database has its segment. Segments never change once
+    written, so they are hard-linked where possible and copied otherwise.
+
+    Args:
+        dest_dir: Output directory, defaults to BACKUP_DIR
+        compress: gzip the snapshot (.db.gz)
+        keep: Snapshots to keep in dest_dir after this one; None keeps all
+        pages: Pages per backup step
+        sleep: Seconds to sleep between steps
+        progress: Called after each step with (pages_copied, total_pages)
+
+    Returns:
+        Path of the new snapshot
+    """
+    dest_dir = Path(dest_dir or BACKUP_DIR)
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    final = dest_dir / f"{_PREFIX}{stamp}.db{'.gz' if compress else ''}"
+    tmp = dest_dir / f".{_PREFIX}{stamp}.db.tmp"
+
+    with _running:
+        try:
+            _backup_to(tmp, pages, sleep, progress)
+            if compress:
+                with open(tmp, "rb") as src, gzip.open(str(final) + ".tmp", "wb", compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+                os.replace(str(final) + ".tmp", final)
+                tmp.unlink()
+            else:
+                os.replace(tmp, final)
+            _copy_segments(archive_dir(final))
+        finally:
+            for leftover in (tmp, Path(str(final) + ".tmp")):
+                if leftover.exists():
+                    leftover.unlink()
+
+    if keep is not None:
+        rotate_backups(dest_dir, keep)
+    return final
+
+
+def snapshot_in_background(
+    on_done: Optional[Callable[[bool, str], None]] = None,
+    **kwargs
+) -> threading.Thread:
+    """
+    Run snapshot_database on a worker thread.
+
+    `on_done(success, path_or_error)` is called from that thread when the
+    snapshot finishes; other keyword arguments go to snapshot_database.
+    """
+    def run():
+        try:
+            path = snapshot_database(**kwargs)
+            result = (True, str(path))
+        except Exception as e:
+            print(f"Backup failed: {e}")
+            result = (False, f"Backup failed: {e}")
+        if on_done:
+            on_done(*result)
+
+    thread = threading.Thread(target=run, name="sentinel-backup", daemon=True)
+    thread.start()
+    return thread
+
+
+def list_backups(dest_dir: Optional[Path] = None) -> List[Path]:
+    """Snapshots in `dest_dir`, newest first."""
+    dest_dir = Path(dest_dir or BACKUP_DIR)
+    if not dest_dir.exists():
+        return []
+    files = [
+        p for p in dest_dir.iterdir()
+        if p.name.startswith(_PREFIX) and p.name.endswith((".db", ".db.gz"))
+    ]
+    return sorted(files, key=lambda p: p.name, reverse=True)
+
+
+def archive_dir(snapshot: Path) -> Path:
+    """Directory holding the archive segments saved with `snapshot`."""
+    name = snapshot.name
+    for suffix in (".gz", ".db"):
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    return snapshot.with_name(name + ".archive")
+
+
+def rotate_backups(dest_dir: Optional[Path] = None, keep: int = BACKUP_KEEP) -> int:
+    """Delete all but the newest `keep` snapshots. Returns snapshots removed."""
+    removed = 0
+    for path in list_backups(dest_dir)[max(0, keep):]:
+        try:
+            path.unlink()
+            shutil.rmtree(archive_dir(path), ignore_errors=True)
+            removed += 1
+        except OSError as e:
+            print(f"Could not remove old backup {path}: {e}")
+    return removed
+
+
+def restore_snapshot(snapshot: Path) -> None:
+    """
+    Replace the database with `snapshot` and put back any of its archive
+    segments that are missing. Meant to run while nothing else uses the
+    database (e.g. from the command line with the app closed): open
+    connections are closed first, but a concurrent write would still be
+    lost.
+
+    The snapshot is decompressed and checked with PRAGMA quick_check
+    before the live file is touched. Segments sealed after the snapshot
+    are kept, so their days are briefly back as raw rows too: the
+    restored database rolls them up again (its rollups predate them)
+    and the next seal merges them into the existing segment, skipping
+    rows it already holds.
+    """
+    snapshot = Path(snapshot)
+    tmp = DB_PATH.with_name(f".{DB_PATH.name}.restore")
+    try:
+        if snapshot.name.endswith(".gz"):
+            with gzip.open(snapshot, "rb") as src, open(tmp, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        else:
+            shutil.copyfile(snapshot, tmp)
+        check = sqlite3.connect(tmp)
+        try:
+            ok = check.execute("PRAGMA quick_check").fetchone()[0]
+        finally:
+            check.close()
+        if ok != "ok":
+            raise sqlite3.DatabaseError(f"Snapshot failed quick_check: {ok}")
+
+        connections.close_all()
+        for suffix in ("-wal", "-shm"):
+            Path(str(DB_PATH) + suffix).unlink(missing_ok=True)
+        os.replace(tmp, DB_PATH)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    saved = archive_dir(snapshot)
+    if saved.is_dir():
+        ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+        for segment in saved.iterdir():
+            target = ARCHIVE_DIR / segment.name
+            if not target.exists():
+                _link_or_copy(segment, target)
+    # Cached partition lists belong to the old file
+    partitions._schema_version = None
+    initialize_database()  # Brings an older snapshot up to the current schema
+
+
+def _copy_segments(dest: Path) -> None:
+    segments = list_segments()
+    if not segments:
+        return
+    dest.mkdir(parents=True, exist_ok=True)
+    for _, path in segments:
+        try:
+            _link_or_copy(path, dest / path.name)
+        except FileNotFoundError:
+            pass  # Pruned by archive retention meanwhile
+
+
+def _link_or_copy(src: Path, dst: Path) -> None:
+    try:
+        os.link(src, dst)
+    except OSError:
+        if not dst.exists():
+            shutil.copy2(src, dst)
+
+
+def _backup_to(path: Path, pages: int, sleep: float, progress: Optional[BackupProgress]) -> None:
+    source = get_connection()
+    target = sqlite3.connect(path)
+    try:
+        # One read transaction across every step: a fixed snapshot to copy
+        source.execute("BEGIN")
+        source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+        def on_step(status: int, remaining: int, total: int) -> None:
+            if progress:
+                progress(total - remaining, total)
+
+        source.backup(target, pages=pages, progress=on_step, sleep=sleep)
+        source.rollback()
+
+        ok = target.execute("PRAGMA quick_check").fetchone()[0]
+        if ok != "ok":
+            raise sqlite3.DatabaseError(f"Snapshot failed quick_check: {ok}")
+        # A self-contained file: no -wal/-shm needed to open it elsewhere
+        target.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        target.close()
+        source.close()
+
+
+if __name__ == "__main__":
+    # python -m app.storage.backup [--no-compress]
+    # python -m app.storage.backup --restore <snapshot>   (with the app closed)
+    import sys
+    if "--restore" in sys.argv:
+        restore_snapshot(Path(sys.argv[sys.argv.index("--restore") + 1]))
+        print("Restored")
+    else:
+        print(snapshot_database(compress="--no-compress" not in sys.argv))
@@ -1,56 +1,236 @@
 import json
 import os
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 
 # Use absolute path to ensure file is found regardless of CWD
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Go up one level from 'storage' to 'app', then up to root
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-CHAT_HISTORY_FILE = os.path.join(ROOT_DIR, "chat_history.json")
+# Append-only log, one JSON message per line
+CHAT_HISTORY_FILE = os.path.join(ROOT_DIR, "chat_history.jsonl")
+# Whole-file JSON array used by older versions; migrated on first load
+LEGACY_HISTORY_FILE = os.path.join(ROOT_DIR, "chat_history.json")
+
+# Messages kept in memory, and in the log when it is compacted
+MAX_MESSAGES = 100
+# Compact once the log holds this many lines, so rewrites are rare
+COMPACT_AT = 2 * MAX_MESSAGES
+# Messages loaded at startup and per "load older" page
+PAGE_SIZE = 30
+
+_READ_BLOCK = 64 * 1024
+
 
 class ChatHistory:
-    """Manage persistent chat message history."""
-    
-    def __init__(self):
-        self.messages = self.load_history()
-    
+    """
+    Manage persistent chat message history.
+
+    Messages are appended to a JSON Lines log, so saving one costs one
+    small write. Only the newest PAGE_SIZE messages are parsed at startup;
+    older pages are read backwards from the file on demand. New messages
+    push the oldest loaded ones out past MAX_MESSAGES (they stay on disk
+    and can be paged back in). When the log grows past COMPACT_AT lines
+    it is rewritten to the newest MAX_MESSAGES.
+    """
+
+    def __init__(self, path: str = CHAT_HISTORY_FILE, page_size: int = PAGE_SIZE):
+        self.path = path
+        self.page_size = page_size
+        self._migrate_legacy()
+        self._terminate_last_line()
+        self._line_count = self._count_lines()
+        # Byte offset where the oldest loaded message starts
+        self._head_offset = 0
+        self.messages: List[Dict] = []
+        self.load_history()
+
     def load_history(self) -> List[Dict]:
-        """Load chat history from file."""
-        if os.path.exists(CHAT_HISTORY_FILE):
-            try:
-                with open(CHAT_HISTORY_FILE, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Error loading chat history: {e}")
-        return []
-    
-    def save_history(self):
-        """Save chat history to file."""
-        try:
-            # Keep only last 100 messages
-            if len(self.messages) > 100:
-                self.messages = self.messages[-100:]
-            
-            with open(CHAT_HISTORY_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.messages, f, indent=2, ensure_ascii=False)
+        """Load the newest page of chat history."""
+        self.messages = []
+        self._head_offset = self._file_size()
+        return self.load_older()
+
+    def load_older(self, count: Optional[int] = None) -> List[Dict]:
+        """
+        Load up to `count` messages preceding those already loaded.
+
+        Returns the new messages oldest first; they are also prepended to
+        `messages`.
+        """
+        try:
+            older, self._head_offset = self._read_before(self._head_offset, count or self.page_size)
         except Exception as e:
-            print(f"Error saving chat history: {e}")
-    
-    def add_message(self, text: str, sender: str):
-        """Add a message to history."""
-        self.messages.append({
+            print(f"Error loading chat history: {e}")
+            return []
+        self.messages = older + self.messages
+        return older
+
+    def has_older(self) -> bool:
+        """True if the log holds messages older than those loaded."""
+        return self._head_offset > 0
+
+    def add_message(self, text: str, sender: str) -> int:
+        """
+        Add a message to history.
+
+        Returns how many of the oldest loaded messages were unloaded to
+        keep `messages` at MAX_MESSAGES; load_older() brings them back.
+        """
+        message = {
             "text": text,
             "sender": sender,
             "timestamp": datetime.now().isoformat()
-        })
-        self.save_history()
-    
+        }
+        self.messages.append(message)
+        try:
+            with open(self.path, 'ab') as f:
+                f.write(_encode(message))
+            self._line_count += 1
+            if self._line_count >= COMPACT_AT:
+                self.compact()
+        except Exception as e:
+            print(f"Error saving chat history: {e}")
+        return self._unload_oldest()
+
+    def compact(self):
+        """Rewrite the log to its newest MAX_MESSAGES lines."""
+        try:
+            size = self._file_size()
+            _, cut = self._read_before(size, MAX_MESSAGES, parse=False)
+            if cut == 0:
+                return
+            tmp_path = self.path + ".tmp"
+            with open(self.path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                src.seek(cut)
+                while True:
+                    block = src.read(_READ_BLOCK)
+                    if not block:
+                        break
+                    dst.write(block)
+            os.replace(tmp_path, self.path)
+            self._line_count = self._count_lines()
+            self._head_offset = max(0, self._head_offset - cut)
+        except Exception as e:
+            print(f"Error compacting chat history: {e}")
+
     def clear_history(self):
         """Clear all chat history."""
         self.messages = []
-        self.save_history()
-    
+        try:
+            open(self.path, 'wb').close()
+        except Exception as e:
+            print(f"Error saving chat history: {e}")
+        self._line_count = 0
+        self._head_offset = 0
+
     def get_messages(self) -> List[Dict]:
-        """Get all messages."""
+        """Get loaded messages, oldest first."""
         return self.messages
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+    def _file_size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def _unload_oldest(self) -> int:
+        """Drop loaded messages beyond MAX_MESSAGES, oldest first."""
+        excess = len(self.messages) - MAX_MESSAGES
+        if excess <= 0:
+            return 0
+        try:
+            # Loaded messages are the newest lines of the log; the new head
+            # is where its last MAX_MESSAGES lines start
+            _, head = self._read_before(self._file_size(), MAX_MESSAGES, parse=False)
+        except Exception as e:
+            print(f"Error paging chat history: {e}")
+            return 0
+        del self.messages[:excess]
+        self._head_offset = head
+        return excess
+
+    def _terminate_last_line(self):
+        """End a torn final write with a newline so the next append starts clean."""
+        size = self._file_size()
+        if size == 0:
+            return
+        try:
+            with open(self.path, 'rb+') as f:
+                f.seek(size - 1)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+        except OSError as e:
+            print(f"Error repairing chat history: {e}")
+
+    def _count_lines(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        count = 0
+        with open(self.path, 'rb') as f:
+            for block in iter(lambda: f.read(_READ_BLOCK), b""):
+                count += block.count(b"\n")
+        return count
+
+    def _read_before(self, offset: int, count: int, parse: bool = True) -> Tuple[List[Dict], int]:
+        """
+        Read up to `count` lines ending at byte `offset`, scanning backwards
+        in blocks. Returns (messages oldest first, offset of the first line
+        read). Lines that fail to parse (e.g. a torn final write) are skipped.
+        """
+        if offset <= 0 or count <= 0:
+            return [], max(offset, 0)
+
+        buf = b""
+        pos = offset
+        with open(self.path, 'rb') as f:
+            # count + 1 newlines locate the start of the count-th line from the end
+            while pos > 0 and buf.count(b"\n") <= count:
+                step = min(_READ_BLOCK, pos)
+                pos -= step
+                f.seek(pos)
+                buf = f.read(step) + buf
+
+        lines = buf.split(b"\n")
+        if lines and lines[-1] == b"":
+            lines.pop()  # buf ends with the newline of the last message
+        if len(lines) > count:
+            head = lines[:len(lines) - count]
+            lines = lines[len(lines) - count:]
+            start = pos + sum(len(line) + 1 for line in head)
+        else:
+            start = pos
+
+        messages = []
+        if parse:
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    messages.append(json.loads(line))
+                except ValueError:
+                    continue
+        return messages, start
+
+    def _migrate_legacy(self):
+        """Convert chat_history.json to the JSON Lines log, once."""
+        if self.path != CHAT_HISTORY_FILE or os.path.exists(self.path):
+            return
+        if not os.path.exists(LEGACY_HISTORY_FILE):
+            return
+        try:
+            with open(LEGACY_HISTORY_FILE, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
+            with open(self.path, 'wb') as f:
+                for message in legacy[-MAX_MESSAGES:]:
+                    f.write(_encode(message))
+            os.replace(LEGACY_HISTORY_FILE, LEGACY_HISTORY_FILE + ".bak")
+        except Exception as e:
+            print(f"Error migrating chat history: {e}")
+
+
+def _encode(message: Dict) -> bytes:
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode('utf-8')
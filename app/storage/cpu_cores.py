@@ -0,0 +1,52 @@
+# app/storage/cpu_cores.py
+
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.storage.database import read_connection, epoch_ms
+
+# Per-core percentages are stored as one fixed-width array per tick
+CORE_DTYPE = np.dtype("<f4")
+
+INSERT_CPU_CORES_SQL = """
+    INSERT OR REPLACE INTO cpu_cores (ts, n_cores, percents) VALUES (?, ?, ?)
+"""
+
+
+def cpu_cores_row(ts: int, percents: Sequence[float]) -> Tuple[int, int, bytes]:
+    """Parameters for INSERT_CPU_CORES_SQL: 4 bytes per core."""
+    packed = np.asarray(percents, dtype=CORE_DTYPE)
+    return ts, len(packed), packed.tobytes()
+
+
+def read_cpu_cores(start: int, end: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Per-core utilization in [start, end).
+
+    Returns {"ts": int64 (n,), "cores": float32 (n, max cores)}; if the
+    core count changed within the range, missing cores are NaN.
+    """
+    if end is None:
+        end = epoch_ms() + 1
+    with read_connection() as conn:
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute(
+            "SELECT ts, n_cores, percents FROM cpu_cores WHERE ts >= ? AND ts < ? ORDER BY ts",
+            (start, end)
+        )
+        rows = cur.fetchall()
+
+    if not rows:
+        return {"ts": np.empty(0, dtype=np.int64), "cores": np.empty((0, 0), dtype=CORE_DTYPE)}
+    ts = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    width = max(r[1] for r in rows)
+    if all(r[1] == width for r in rows):
+        # Common case: one buffer, one reshape
+        cores = np.frombuffer(b"".join(r[2] for r in rows), dtype=CORE_DTYPE).reshape(len(rows), width)
+    else:
+        cores = np.full((len(rows), width), np.nan, dtype=CORE_DTYPE)
+        for i, r in enumerate(rows):
+            cores[i, :r[1]] = np.frombuffer(r[2], dtype=CORE_DTYPE)
+    return {"ts": ts, "cores": cores}
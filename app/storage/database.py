@@ -1,7 +1,13 @@
 # app/storage/database.py
 
+import queue
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
+from typing import Iterator, Optional
 
 import os
 
@@ -9,7 +15,85 @@ import os
 app_data = Path(os.getenv("APPDATA")) / "SENTINEL"
 DB_PATH = app_data / "data" / "sys_sentinel.db"
 
+# Numeric columns of the `metrics` table, in storage order.
+METRIC_COLUMNS = (
+    "cpu_percent",
+    "memory_used_mb",
+    "memory_percent",
+    "disk_percent",
+    "read_mb",
+    "write_mb",
+    "upload_kb",
+    "download_kb",
+    "gpu_percent",
+    # CPU time split (% of all cores) and the busiest core's utilization
+    "cpu_user",
+    "cpu_system",
+    "cpu_iowait",
+    "cpu_steal",
+    "cpu_irq",
+    "cpu_max_core",
+)
+
+# Existing files up to this size switch to incremental auto-vacuum at
+# startup; larger ones only on request (enable_incremental_vacuum).
+INLINE_VACUUM_MAX_BYTES = 64 * 1024 * 1024
+
+# PRAGMA user_version of the current schema.
+#   1: read_mb / write_mb / upload_kb / download_kb hold per-second rates
+#      (older rows held cumulative counters)
+SCHEMA_VERSION = 1
+IO_RATE_COLUMNS = ("read_mb", "write_mb", "upload_kb", "download_kb")
+
+# Rollup tiers: name -> bucket width in ms. Each tier has its own
+# metrics_rollup_<name> table with one row per (bucket, metric).
+ROLLUP_TIERS = {
+    "1m": 60_000,
+    "15m": 900_000,
+    "1h": 3_600_000,
+}
+
+# History tables keyed by an integer epoch-millisecond `ts` column.
+TIMESTAMPED_TABLES = (
+    "metrics",
+    "anomaly_history",
+    "alert_history",
+    "overload_predictions",
+    "system_stress_history",
+    "anomalies",
+)
+
+# Legacy tables whose text timestamps were written as naive UTC
+# (datetime.utcnow()); the others used datetime.now(), i.e. local time.
+UTC_TIMESTAMP_TABLES = ("metrics",)
+
+
+def epoch_ms() -> int:
+    """Current UTC time as integer epoch milliseconds."""
+    return time.time_ns() // 1_000_000
+
+
+def ms_to_iso(ts: int) -> str:
+    """Render epoch milliseconds as a UTC ISO-8601 string."""
+    return datetime.fromtimestamp(ts / 1000, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+
+# Applied to every connection when it is opened. WAL itself is a property
+# of the file and is switched on once by initialize_database().
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous = NORMAL",      # Safe under WAL, no fsync per commit
+    "PRAGMA mmap_size = 268435456",     # 256 MB memory-mapped reads
+    "PRAGMA cache_size = -16000",       # 16 MB page cache per connection
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+)
+
+
 def get_connection() -> sqlite3.Connection:
+    """
+    Open a new tuned connection. Long-lived code should borrow one from
+    `connections` instead of paying the open cost per call.
+    """
     DB_PATH.parent.mkdir(parents=True, exist_ok=True)
 
     conn = sqlite3.connect(
@@ -17,6 +101,9 @@ def get_connection() -> sqlite3.Connection:
         check_same_thread=False
     )
     conn.row_factory = sqlite3.Row
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    _register_functions(conn)
     # Log connection
     try:
         from app.core.logger import logger
@@ -25,9 +112,110 @@ def get_connection() -> sqlite3.Connection:
     return conn
 
 
+def _register_functions(conn: sqlite3.Connection) -> None:
+    """SQL functions used by the rollup tables' sketch column."""
+    from app.storage.sketch import sketch_merge, SketchUnion
+    conn.create_function("sketch_merge", 2, sketch_merge, deterministic=True)
+    conn.create_aggregate("sketch_union", 1, SketchUnion)
+
+
+class ConnectionManager:
+    """
+    Process-wide owner of SQLite connections.
+
+    One writer connection, shared behind a lock so writes are serialized
+    in-process, and a small pool of read-only connections handed out per
+    call. Connections are opened lazily, once, and reused; under WAL the
+    readers never block the writer (or each other). Borrowed connections
+    must not be closed by callers.
+    """
+
+    def __init__(self, max_readers: int = 4):
+        """
+        Args:
+            max_readers: Upper bound on open reader connections; extra
+                concurrent readers wait for one to be returned
+        """
+        self.max_readers = max(1, max_readers)
+        self._writer = None
+        self._write_lock = threading.RLock()
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        """Exclusive use of the writer connection for one unit of work."""
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = get_connection()
+            yield self._writer
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a read-only connection from the pool."""
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            open_new = self._opened < self.max_readers
+            if open_new:
+                self._opened += 1
+        if not open_new:
+            return self._idle.get()
+        try:
+            conn = get_connection()
+            conn.execute("PRAGMA query_only = ON")
+            return conn
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+            raise
+
+    def close_all(self) -> None:
+        """Close idle readers and the writer (e.g. before restoring a backup)."""
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+# Process-wide connection manager
+connections = ConnectionManager()
+
+
+def read_connection():
+    """Shorthand for `connections.reader()`."""
+    return connections.reader()
+
+
+def write_connection():
+    """Shorthand for `connections.writer()`."""
+    return connections.writer()
+
+
 SCHEMA_SQL = """
 CREATE TABLE IF NOT EXISTS metrics (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
     timestamp TEXT NOT NULL,
     cpu_percent REAL,
     memory_used_mb REAL,
@@ -37,11 +225,18 @@ CREATE TABLE IF NOT EXISTS metrics (
     write_mb REAL,
     upload_kb REAL,
     download_kb REAL,
-    gpu_percent REAL
+    gpu_percent REAL,
+    cpu_user REAL,
+    cpu_system REAL,
+    cpu_iowait REAL,
+    cpu_steal REAL,
+    cpu_irq REAL,
+    cpu_max_core REAL
 );
 
 CREATE TABLE IF NOT EXISTS anomaly_history (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
     timestamp TEXT NOT NULL,
     anomaly_type TEXT NOT NULL,
     severity TEXT NOT NULL,
@@ -52,6 +247,7 @@ CREATE TABLE IF NOT EXISTS anomaly_history (
 
 CREATE TABLE IF NOT EXISTS alert_history (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
     timestamp TEXT NOT NULL,
     alert_type TEXT NOT NULL,
     title TEXT,
@@ -61,6 +257,7 @@ CREATE TABLE IF NOT EXISTS alert_history (
 
 CREATE TABLE IF NOT EXISTS overload_predictions (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
     timestamp TEXT NOT NULL,
     risk_level TEXT NOT NULL,
     confidence REAL,
@@ -73,6 +270,7 @@ CREATE TABLE IF NOT EXISTS overload_predictions (
 
 CREATE TABLE IF NOT EXISTS system_stress_history (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts INTEGER NOT NULL,
     timestamp TEXT NOT NULL,
     stress_index REAL,
     cpu_stress REAL,
@@ -83,30 +281,227 @@ CREATE TABLE IF NOT EXISTS system_stress_history (
 );
 
 CREATE TABLE IF NOT EXISTS anomalies (
+    ts INTEGER NOT NULL,
     timestamp TEXT NOT NULL,
     resource TEXT,
     score INTEGER,
     severity TEXT,
     details TEXT
 );
+
+-- Long-format series: one registry row per (name, labels), samples
+-- clustered by series so a per-series range read is one PK range scan.
+CREATE TABLE IF NOT EXISTS series (
+    series_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    unit TEXT,
+    labels TEXT NOT NULL DEFAULT '{}',
+    UNIQUE (name, labels)
+);
+
+CREATE TABLE IF NOT EXISTS samples (
+    series_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (series_id, ts)
+) WITHOUT ROWID;
+
+-- Per-core CPU utilization: one packed little-endian float32 array per tick
+CREATE TABLE IF NOT EXISTS cpu_cores (
+    ts INTEGER PRIMARY KEY,
+    n_cores INTEGER NOT NULL,
+    percents BLOB NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS rollup_state (
+    name TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_metrics_ts ON metrics(ts);
+CREATE INDEX IF NOT EXISTS idx_anomaly_history_ts ON anomaly_history(ts);
+CREATE INDEX IF NOT EXISTS idx_alert_history_ts ON alert_history(ts);
+CREATE INDEX IF NOT EXISTS idx_overload_predictions_ts ON overload_predictions(ts);
+CREATE INDEX IF NOT EXISTS idx_system_stress_history_ts ON system_stress_history(ts);
+CREATE INDEX IF NOT EXISTS idx_anomalies_ts ON anomalies(ts);
 """
 
+ROLLUP_SCHEMA_SQL = "".join(f"""
+CREATE TABLE IF NOT EXISTS metrics_rollup_{tier} (
+    bucket_ts INTEGER NOT NULL,
+    metric TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    sum REAL NOT NULL,
+    min REAL,
+    max REAL,
+    last REAL,
+    last_ts INTEGER,
+    sketch BLOB,
+    PRIMARY KEY (bucket_ts, metric)
+) WITHOUT ROWID;
+""" for tier in ROLLUP_TIERS)
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> set:
+    """Column names of `table` (empty if the table does not exist yet)."""
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """Bring tables created by older versions up to the current schema."""
+    # Metric columns added since a table was created; partitions are
+    # included because they are created with the columns of their day
+    partitions = [r[0] for r in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'metrics_p%'"
+    )]
+    for table in ["metrics"] + partitions:
+        cols = _table_columns(conn, table)
+        added = [c for c in METRIC_COLUMNS if cols and c not in cols]
+        for col in added:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {col} REAL")
+        if added:
+            print(f"Migrated database: added {', '.join(added)} to {table}")
+
+    # Text ISO timestamps (mixed 'T'/space separators) -> indexed epoch ms
+    conn.create_function("legacy_ms", 2, _legacy_ms, deterministic=True)
+    for table in TIMESTAMPED_TABLES:
+        cols = _table_columns(conn, table)
+        if cols and "ts" not in cols:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN ts INTEGER")
+            conn.execute(
+                f"UPDATE {table} SET ts = legacy_ms(timestamp, ?)",
+                (table not in UTC_TIMESTAMP_TABLES,)
+            )
+            print(f"Migrated database: added ts column to {table}")
+
+    # I/O columns used to store cumulative counters under rate names. Those
+    # values would read as enormous rates in rollups, anomaly features and
+    # exports, so rows (and rollups) written before the switch lose them
+    if conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+        for table in ["metrics"] + partitions:
+            if _table_columns(conn, table):
+                conn.execute(f"UPDATE {table} SET {', '.join(c + ' = NULL' for c in IO_RATE_COLUMNS)}")
+        for tier in ROLLUP_TIERS:
+            if _table_columns(conn, f"metrics_rollup_{tier}"):
+                conn.execute(
+                    f"DELETE FROM metrics_rollup_{tier} WHERE metric IN ({', '.join('?' for _ in IO_RATE_COLUMNS)})",
+                    IO_RATE_COLUMNS
+                )
+        if _table_columns(conn, "metrics"):
+            print("Migrated database: cleared pre-rate I/O counter values")
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    # Quantile sketches alongside rollup buckets (older buckets keep NULL)
+    for tier in ROLLUP_TIERS:
+        cols = _table_columns(conn, f"metrics_rollup_{tier}")
+        if cols and "sketch" not in cols:
+            conn.execute(f"ALTER TABLE metrics_rollup_{tier} ADD COLUMN sketch BLOB")
+            print(f"Migrated database: added sketch column to metrics_rollup_{tier}")
+
+
+def _legacy_ms(text: Optional[str], local: bool) -> int:
+    """
+    Epoch ms of a timestamp written before the `ts` column existed.
+    Naive values are read as local time if `local`, else as UTC (see
+    UTC_TIMESTAMP_TABLES); an explicit offset is honoured. Unparseable
+    values map to 0.
+    """
+    try:
+        parsed = datetime.fromisoformat(str(text).strip())
+    except ValueError:
+        return 0
+    if parsed.tzinfo is None and not local:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return round(parsed.astimezone().timestamp() * 1000)
+
+
+def _enable_incremental_vacuum(conn: sqlite3.Connection, max_bytes: Optional[int]) -> bool:
+    """
+    Switch the file to auto_vacuum=INCREMENTAL so retention can free pages.
+
+    A new file takes the setting directly. An existing one needs a full
+    VACUUM rebuild, which blocks writes for as long as it runs, so here it
+    only runs when the file is at most `max_bytes` (None: any size);
+    larger files wait for the explicit enable_incremental_vacuum()
+    action. Returns True once the file is in incremental mode.
+    """
+    from app.core.logger import logger
+
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return True
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+    if page_count == 0:
+        return True  # Empty file: applies as the schema is created
+    size = page_count * conn.execute("PRAGMA page_size").fetchone()[0]
+    size_mb = size / (1024 * 1024)
+    if max_bytes is not None and size > max_bytes:
+        logger.info(
+            f"Incremental vacuum not enabled for {size_mb:.0f} MB database; run "
+            "'python -m app.storage.database --enable-incremental-vacuum' or use Settings to rebuild it"
+        )
+        return False
+    logger.info(f"Rebuilding {size_mb:.1f} MB database to enable incremental vacuum; writes wait until it finishes")
+    started = time.monotonic()
+    try:
+        conn.execute("VACUUM")
+    except sqlite3.Error as e:
+        logger.error(f"Incremental vacuum rebuild failed after {time.monotonic() - started:.1f}s: {e}")
+        raise
+    logger.info(f"Migrated database: enabled incremental vacuum ({size_mb:.1f} MB rebuilt in {time.monotonic() - started:.1f}s)")
+    return True
+
+
+_vacuum_rebuild_lock = threading.Lock()
+_vacuum_rebuild_attempted = False
+
+
+def incremental_vacuum_enabled() -> bool:
+    """Whether retention can return freed pages to the OS."""
+    # Asked on the writer: pooled readers keep the value they opened with
+    with write_connection() as conn:
+        return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+def enable_incremental_vacuum() -> bool:
+    """
+    One-shot maintenance action for files too large to switch at startup:
+    rebuild the database into incremental auto-vacuum mode, whatever its
+    size. Writes wait for the whole rebuild, so this only runs when asked
+    (Settings, or `python -m app.storage.database --enable-incremental-vacuum`),
+    never on a schedule, and at most once per process.
+
+    Returns True once the file is in incremental mode.
+    """
+    global _vacuum_rebuild_attempted
+    from app.core.logger import logger
+
+    with _vacuum_rebuild_lock:
+        if _vacuum_rebuild_attempted:
+            logger.info("Incremental vacuum rebuild already attempted in this session")
+            return incremental_vacuum_enabled()
+        _vacuum_rebuild_attempted = True
+        with write_connection() as conn:
+            return _enable_incremental_vacuum(conn, max_bytes=None)
+
+
 def initialize_database() -> None:
     conn = get_connection()
     try:
-        # Check if gpu_percent column exists, if not add it
-        try:
-            cur = conn.cursor()
-            cur.execute("SELECT gpu_percent FROM metrics LIMIT 1")
-        except sqlite3.OperationalError:
-            # Column missing, add it
-            try:
-                conn.execute("ALTER TABLE metrics ADD COLUMN gpu_percent REAL")
-                print("Migrated database: added gpu_percent column")
-            except:
-                pass # Table might not exist yet, createscript will handle it
-
+        _enable_incremental_vacuum(conn, INLINE_VACUUM_MAX_BYTES)
+        # Persistent: concurrent readers no longer block the writer
+        conn.execute("PRAGMA journal_mode = WAL")
+        _migrate(conn)
         conn.executescript(SCHEMA_SQL)
+        conn.executescript(ROLLUP_SCHEMA_SQL)
         conn.commit()
     finally:
         conn.close()
+
+
+if __name__ == "__main__":
+    # python -m app.storage.database --enable-incremental-vacuum
+    import sys
+    if "--enable-incremental-vacuum" in sys.argv:
+        initialize_database()
+        print("Incremental vacuum enabled" if enable_incremental_vacuum() else "Incremental vacuum not enabled")
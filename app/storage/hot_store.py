@@ -0,0 +1,173 @@
+# app/storage/hot_store.py
+
+import threading
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.storage.database import METRIC_COLUMNS, epoch_ms
+from app.collectors.schema import MetricSample
+
+
+class HotMetricStore:
+    """
+    In-memory hot tier for the most recent metric samples.
+
+    Fixed-capacity ring buffers, preallocated once: an int64 array of
+    epoch-ms timestamps plus a (capacity, columns) float64 array holding
+    one packed row per sample (NaN = missing).
+    Recent-window reads are answered from here as NumPy arrays; SQLite
+    only serves history older than the buffer.
+    """
+
+    def __init__(self, capacity: int = 1800, columns: Sequence[str] = METRIC_COLUMNS):
+        """
+        Args:
+            capacity: Samples kept (1800 = 1 hour at the 2s collection rate)
+            columns: Metric names stored per sample
+        """
+        self.capacity = capacity
+        self.columns = tuple(columns)
+        self._ts = np.zeros(capacity, dtype=np.int64)
+        self._index = {col: j for j, col in enumerate(self.columns)}
+        self._rows = np.full((capacity, len(self.columns)), np.nan)
+        self._count = 0  # Total samples ever appended; next slot is _count % capacity
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return min(self._count, self.capacity)
+
+    def append(self, ts: int, data: Dict[str, Optional[float]]) -> None:
+        """Store one sample. Values missing from `data` are stored as NaN."""
+        with self._lock:
+            i = self._count % self.capacity
+            self._ts[i] = ts
+            # None -> NaN in the float64 row
+            self._rows[i] = [data.get(col) for col in self.columns]
+            self._count += 1
+
+    def append_sample(self, sample: MetricSample) -> None:
+        """Store one MetricSample as a packed row, without building a dict."""
+        if self.columns != METRIC_COLUMNS:
+            self.append(sample.ts, sample._asdict())
+            return
+        with self._lock:
+            i = self._count % self.capacity
+            self._ts[i] = sample.ts
+            self._rows[i] = sample.values
+            self._count += 1
+
+    def extend(self, ts: np.ndarray, columns: Dict[str, np.ndarray]) -> None:
+        """Bulk-load samples in ascending time order (e.g. warm-up from SQLite)."""
+        n = len(ts)
+        if n == 0:
+            return
+        if n > self.capacity:
+            ts = ts[-self.capacity:]
+            columns = {col: arr[-self.capacity:] for col, arr in columns.items()}
+            n = self.capacity
+        with self._lock:
+            idx = (self._count + np.arange(n)) % self.capacity
+            self._ts[idx] = ts
+            for col, j in self._index.items():
+                src = columns.get(col)
+                self._rows[idx, j] = np.nan if src is None else src
+            self._count += n
+
+    def latest(self) -> Dict[str, Optional[float]]:
+        """Most recent sample as a flat dict (None for missing values)."""
+        with self._lock:
+            if self._count == 0:
+                return {}
+            i = (self._count - 1) % self.capacity
+            sample = {"ts": int(self._ts[i])}
+            for col, value in zip(self.columns, self._rows[i].tolist()):
+                sample[col] = None if value != value else value  # NaN -> None
+            return sample
+
+    def last_n(self, n: int, columns: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Last `n` samples in ascending time order.
+
+        Returns {"ts": int64 array, <metric>: float64 array, ...}; arrays are
+        copies and safe to keep after further appends.
+        """
+        cols = self.columns if columns is None else tuple(columns)
+        with self._lock:
+            n = max(0, min(n, len(self)))
+            out = {"ts": self._ordered(self._ts, n)}
+            for col in cols:
+                out[col] = self._ordered(self._column(col), n)
+        return out
+
+    def last_seconds(self, seconds: float, columns: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+        """Samples from the last `seconds` of wall-clock time, ascending."""
+        cutoff = epoch_ms() - int(seconds * 1000)
+        cols = self.columns if columns is None else tuple(columns)
+        with self._lock:
+            size = len(self)
+            ts = self._ordered(self._ts, size)
+            start = int(np.searchsorted(ts, cutoff, side="left"))
+            n = size - start
+            out = {"ts": ts[start:]}
+            for col in cols:
+                out[col] = self._ordered(self._column(col), n)
+        return out
+
+    @property
+    def cursor(self) -> int:
+        """Monotonic position after the newest sample; pass to read_since()."""
+        return self._count
+
+    def read_since(
+        self,
+        cursor: int,
+        columns: Optional[Iterable[str]] = None
+    ) -> Tuple[int, Dict[str, np.ndarray]]:
+        """
+        Samples appended after `cursor`, oldest first, plus the new cursor.
+
+        Lets pollers update their own windows in O(new samples). If the
+        cursor fell more than `capacity` samples behind, only the samples
+        still buffered are returned.
+        """
+        cols = self.columns if columns is None else tuple(columns)
+        with self._lock:
+            n = max(0, min(self._count - cursor, len(self)))
+            out = {"ts": self._ordered(self._ts, n)}
+            for col in cols:
+                out[col] = self._ordered(self._column(col), n)
+            return self._count, out
+
+    def _column(self, col: str) -> np.ndarray:
+        """Strided view of one metric across all slots."""
+        return self._rows[:, self._index[col]]
+
+    def _ordered(self, arr: np.ndarray, n: int) -> np.ndarray:
+        """Copy of the newest `n` slots of a ring array, oldest first."""
+        if n == 0:
+            return arr[:0].copy()
+        end = self._count % self.capacity
+        start = (end - n) % self.capacity
+        if start < end:
+            return arr[start:end].copy()
+        return np.concatenate((arr[start:], arr[:end]))
+
+
+# Process-wide hot tier, fed by the collection loop
+hot_store = HotMetricStore()
+
+
+def warm_hot_store(minutes: int = 60) -> int:
+    """
+    Fill the hot tier from SQLite at startup so recent-window readers
+    see history collected before this process started.
+
+    Returns the number of samples loaded.
+    """
+    from app.storage.reader import read_metrics_columns
+
+    columns = read_metrics_columns(epoch_ms() - minutes * 60_000, columns=hot_store.columns)
+    ts = columns.pop("ts")
+    hot_store.extend(ts, columns)
+    return len(ts)
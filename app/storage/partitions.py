@@ -0,0 +1,215 @@
+# app/storage/partitions.py
+
+import re
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence, Tuple
+
+from app.core.settings import settings
+from app.storage.database import read_connection, write_connection, METRIC_COLUMNS
+
+# Opt-in partitioned storage for raw metrics, set by the "partition_mode"
+# setting: unset keeps every row in the single `metrics` table; "day" or
+# "hour" routes new rows into one metrics_p<YYYYMMDD[HH]> table per period,
+# so old raw rows are removed by dropping tables instead of deleting rows.
+# Whoever removes old raw rows does the dropping: with the archive enabled
+# that is sealing (SEAL_AFTER_DAYS), which drops a day's partitions once the
+# day is in a segment; otherwise it is retention (RETENTION_DAYS["metrics"]).
+PARTITION_MODE_SETTING = "partition_mode"
+
+# Column order shared by `metrics` and every partition (ALTER-added
+# columns make the legacy table's physical order differ, so selects
+# always name columns explicitly).
+METRICS_TABLE_COLUMNS = ("id", "ts", "timestamp") + METRIC_COLUMNS
+
+_PERIOD_MS = {"day": 86_400_000, "hour": 3_600_000}
+_NAME_RE = re.compile(r"^metrics_p(\d{8}|\d{10})$")
+
+_partitions: List[Tuple[int, int, str]] = []  # (start, end, name), ascending
+_schema_version: Optional[int] = None
+_lock = threading.Lock()
+
+
+def partition_mode() -> Optional[str]:
+    """Configured partition mode, "day" or "hour"; None (unpartitioned) otherwise."""
+    mode = settings.get(PARTITION_MODE_SETTING)
+    return mode if mode in _PERIOD_MS else None
+
+
+def partition_name(ts: int, mode: str) -> str:
+    """Partition holding epoch-ms `ts` under `mode` ("day" or "hour")."""
+    fmt = "%Y%m%d" if mode == "day" else "%Y%m%d%H"
+    return "metrics_p" + datetime.fromtimestamp(ts / 1000, tz=timezone.utc).strftime(fmt)
+
+
+def partition_bounds(name: str) -> Tuple[int, int]:
+    """[start, end) epoch-ms range covered by partition `name`."""
+    stamp = _NAME_RE.match(name).group(1)
+    fmt, period = ("%Y%m%d", "day") if len(stamp) == 8 else ("%Y%m%d%H", "hour")
+    start = int(datetime.strptime(stamp, fmt).replace(tzinfo=timezone.utc).timestamp() * 1000)
+    return start, start + _PERIOD_MS[period]
+
+
+def list_partitions() -> List[Tuple[int, int, str]]:
+    """
+    Existing partitions as (start, end, name), oldest first.
+
+    Cached against SQLite's schema_version, which every committed CREATE
+    or DROP bumps, so the list is re-read only after DDL.
+    """
+    global _partitions, _schema_version
+    with read_connection() as conn:
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        with _lock:
+            if version != _schema_version:
+                names = [r[0] for r in conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'metrics_p%'"
+                )]
+                _partitions = sorted(
+                    partition_bounds(n) + (n,) for n in names if _NAME_RE.match(n)
+                )
+                _schema_version = version
+            return list(_partitions)
+
+
+def metrics_source(start: Optional[int] = None, end: Optional[int] = None) -> str:
+    """
+    FROM-clause expression covering raw metrics in [start, end).
+
+    Just `metrics` until a partition exists; otherwise a UNION ALL of the
+    legacy table and only the partitions overlapping the range. SQLite
+    pushes outer WHERE terms into each arm, so every arm keeps its own
+    ts/id index.
+    """
+    parts = [
+        name for p_start, p_end, name in list_partitions()
+        if (start is None or p_end > start) and (end is None or p_start < end)
+    ]
+    if not parts:
+        return "metrics"
+    select = "SELECT " + ", ".join(METRICS_TABLE_COLUMNS) + " FROM "
+    return "(" + " UNION ALL ".join(select + t for t in ["metrics"] + parts) + ")"
+
+
+# -------------------------------------------------
+# Writes (called with the writer connection)
+# -------------------------------------------------
+def _insert_sql(table: str) -> str:
+    cols = METRICS_TABLE_COLUMNS[1:]
+    return f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})"
+
+
+def insert_metric_rows(conn: sqlite3.Connection, rows: Sequence[Tuple]) -> None:
+    """
+    Insert (ts, timestamp, *METRIC_COLUMNS) rows, routed by partition_mode().
+
+    Partition ids continue the global sequence: before a partition takes
+    rows its AUTOINCREMENT counter is raised to the high-water mark, which
+    is mirrored on `metrics` so it survives partitions being dropped.
+    Rollup watermarks and since-cursors therefore stay valid across
+    partitions.
+    """
+    if not rows:
+        return
+    mode = partition_mode()
+    if mode is None:
+        conn.executemany(_insert_sql("metrics"), rows)
+        return
+
+    groups = {}
+    for row in rows:
+        groups.setdefault(partition_name(row[0], mode), []).append(row)
+
+    for name, group in groups.items():
+        _ensure_partition(conn, name)
+        _bump_sequence(conn, name, _high_water(conn))
+        conn.executemany(_insert_sql(name), group)
+    _bump_sequence(conn, "metrics", _high_water(conn))
+
+
+def _ensure_partition(conn: sqlite3.Connection, name: str) -> None:
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone()
+    if exists:
+        return
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {name} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts INTEGER NOT NULL,
+            timestamp TEXT NOT NULL,
+            {", ".join(f"{c} REAL" for c in METRIC_COLUMNS)}
+        )
+    """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_ts ON {name}(ts)")
+
+
+def _high_water(conn: sqlite3.Connection) -> int:
+    return conn.execute(
+        "SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence "
+        "WHERE name = 'metrics' OR name LIKE 'metrics_p%'"
+    ).fetchone()[0]
+
+
+def _bump_sequence(conn: sqlite3.Connection, table: str, seq: int) -> None:
+    """Raise `table`'s AUTOINCREMENT counter to at least `seq`."""
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    if row is None:
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, seq))
+    elif row[0] < seq:
+        conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (seq, table))
+
+
+# -------------------------------------------------
+# Retention
+# -------------------------------------------------
+def drop_partitions(before: int, max_id: Optional[int] = None) -> int:
+    """
+    Drop every partition that ends at or before `before` (epoch ms) and,
+    if `max_id` is given, holds no id above it. Returns partitions dropped.
+    """
+    dropped = 0
+    for p_start, p_end, name in list_partitions():
+        if p_end > before:
+            break
+        with write_connection() as conn, conn:
+            if max_id is not None:
+                top = conn.execute(f"SELECT MAX(id) FROM {name}").fetchone()[0]
+                if top is not None and top > max_id:
+                    break
+            conn.execute(f"DROP TABLE {name}")
+        dropped += 1
+    return dropped
+
+
+def delete_metrics_range(start: int, end: int, batch_size: int = 2000) -> int:
+    """
+    Remove raw rows in [start, end): whole partitions inside the range are
+    dropped, the legacy table and partially covered partitions are
+    deleted from in small batches. Returns rows removed from batched
+    deletes (dropped partitions are not counted row by row).
+    """
+    removed = 0
+    tables = ["metrics"]
+    for p_start, p_end, name in list_partitions():
+        if p_end <= start or p_start >= end:
+            continue
+        if p_start >= start and p_end <= end:
+            with write_connection() as conn, conn:
+                conn.execute(f"DROP TABLE {name}")
+        else:
+            tables.append(name)
+
+    for table in tables:
+        while True:
+            with write_connection() as conn, conn:
+                n = conn.execute(f"""
+                    DELETE FROM {table} WHERE id IN (
+                        SELECT id FROM {table} WHERE ts >= ? AND ts < ? LIMIT ?
+                    )
+                """, (start, end, batch_size)).rowcount
+            removed += n
+            if n < batch_size:
+                break
+    return removed
@@ -1,37 +1,190 @@
 # app/storage/reader.py
 
-from typing import List, Dict
-from app.storage.database import get_connection
+from typing import List, Dict, Iterable, Iterator, Optional
+import numpy as np
+from app.storage.database import read_connection, epoch_ms, METRIC_COLUMNS
+from app.storage.partitions import metrics_source, METRICS_TABLE_COLUMNS
 
 def read_recent_metrics(minutes: int) -> List[Dict]:
-    conn = get_connection()
-    cur = conn.cursor()
+    start = epoch_ms() - minutes * 60_000
+    source = metrics_source(start)
+    with read_connection() as conn:
+        # Index range scan on metrics(ts)
+        cur = conn.execute(f"""
+            SELECT {", ".join(METRICS_TABLE_COLUMNS)}
+            FROM {source}
+            WHERE ts >= ?
+            ORDER BY ts ASC
+        """, (start,))
+        return [dict(row) for row in cur.fetchall()]
 
-    cur.execute("""
-        SELECT *
-        FROM metrics
-        WHERE timestamp >= datetime('now', ?)
-        ORDER BY timestamp ASC
-    """, (f"-{minutes} minutes",))
+def read_metrics_columns(
+    start: int,
+    end: Optional[int] = None,
+    columns: Optional[Iterable[str]] = None,
+    include_archive: bool = True
+) -> Dict[str, np.ndarray]:
+    """
+    Read a time range of metrics as columnar NumPy arrays.
+
+    Args:
+        start: Inclusive range start (epoch ms)
+        end: Exclusive range end (epoch ms), defaults to now
+        columns: Metric columns to read, defaults to all of METRIC_COLUMNS
+        include_archive: Also read sealed days from the segment archive
+
+    Returns:
+        {"ts": int64 array, <column>: contiguous float64 array, ...}
+        in ascending time order, NaN where a value is missing.
+    """
+    cols = _check_columns(columns)
+    if end is None:
+        end = epoch_ms() + 1
+
+    if include_archive:
+        from app.storage.archive import read_archive_columns, sealed_through
+
+        # Days before sealed_through live in segment files, the rest in SQLite
+        sealed = sealed_through()
+        if start < sealed:
+            cold = read_archive_columns(start, min(end, sealed), cols)
+            if end <= sealed:
+                return cold
+            warm = _query_columns(
+                "ts >= ? AND ts < ? ORDER BY ts ASC", (sealed, end), cols,
+                start=sealed, end=end
+            )
+            return {key: np.concatenate((cold[key], warm[key])) for key in cold}
+
+    return _query_columns(
+        "ts >= ? AND ts < ? ORDER BY ts ASC", (start, end), cols,
+        start=start, end=end
+    )
+
+
+def iter_metrics_chunks(
+    start: int,
+    end: Optional[int] = None,
+    columns: Optional[Iterable[str]] = None,
+    chunk_rows: int = 10_000,
+    include_archive: bool = True
+) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    Stream a time range as successive columnar chunks, oldest first.
+
+    Sealed days are decoded block by block from the archive; the rest is
+    read through one SQLite cursor with fetchmany(chunk_rows), so memory
+    stays bounded by the chunk size whatever the range. Chunks have the
+    same layout as read_metrics_columns.
+    """
+    cols = _check_columns(columns)
+    if end is None:
+        end = epoch_ms() + 1
+
+    if include_archive:
+        from app.storage.archive import iter_archive_columns, sealed_through
+
+        sealed = sealed_through()
+        if start < sealed:
+            for chunk in iter_archive_columns(start, min(end, sealed), cols):
+                if len(chunk["ts"]):
+                    yield chunk
+            start = max(start, sealed)
+            if start >= end:
+                return
+
+    select = "ts" + "".join(", " + c for c in cols)
+    source = metrics_source(start, end)
+    with read_connection() as conn:
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute(
+            f"SELECT {select} FROM {source} WHERE ts >= ? AND ts < ? ORDER BY ts ASC",
+            (start, end)
+        )
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            yield _rows_to_columns(rows, cols)
+        cur.close()
+
+
+def read_metrics_since(
+    last_id: int,
+    columns: Optional[Iterable[str]] = None,
+    limit: Optional[int] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Read only rows appended after the `last_id` cursor (rowid range scan).
+
+    Returns the same columnar layout as read_metrics_columns plus an
+    "id" int64 array; pass its last element back as the next cursor.
+    """
+    cols = _check_columns(columns)
+    where = "id > ? ORDER BY id ASC"
+    params: tuple = (last_id,)
+    if limit is not None:
+        where += " LIMIT ?"
+        params += (limit,)
+    return _query_columns(where, params, cols, with_id=True)
+
+
+def _check_columns(columns: Optional[Iterable[str]]) -> tuple:
+    cols = tuple(METRIC_COLUMNS if columns is None else columns)
+    unknown = [c for c in cols if c not in METRIC_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown metric columns: {unknown}")
+    return cols
+
+
+def _query_columns(
+    where: str,
+    params: tuple,
+    cols: tuple,
+    with_id: bool = False,
+    start: Optional[int] = None,
+    end: Optional[int] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Run a metrics SELECT and return columnar arrays. `start`/`end` bound
+    the partitions consulted when partitioned storage is in use.
+    """
+    select = ("id, " if with_id else "") + "ts" + "".join(", " + c for c in cols)
+    source = metrics_source(start, end)
+    with read_connection() as conn:
+        cur = conn.cursor()
+        cur.row_factory = None  # Plain tuples, no per-row Row/dict objects
+        cur.execute(f"SELECT {select} FROM {source} WHERE {where}", params)
+        rows = cur.fetchall()
+    return _rows_to_columns(rows, cols, with_id=with_id)
+
+
+def _rows_to_columns(rows: List[tuple], cols: tuple, with_id: bool = False) -> Dict[str, np.ndarray]:
+    """Transpose ([id,] ts, *values) tuples into per-column arrays (None -> NaN)."""
+    keys = (("id",) if with_id else ()) + ("ts",)
+    if not rows:
+        out = {k: np.empty(0, dtype=np.int64) for k in keys}
+        out.update({c: np.empty(0, dtype=np.float64) for c in cols})
+        return out
+
+    # Ids and epoch ms fit exactly in float64, so one 2-D conversion handles all columns
+    data = np.array(rows, dtype=np.float64)
+    out = {k: data[:, i].astype(np.int64) for i, k in enumerate(keys)}
+    for i, col in enumerate(cols, start=len(keys)):
+        out[col] = np.ascontiguousarray(data[:, i])
+    return out
 
-    rows = [dict(row) for row in cur.fetchall()]
-    conn.close()
-    return rows
 
 def read_latest_overload_prediction() -> Dict:
-    conn = get_connection()
-    cur = conn.cursor()
-    
-    cur.execute("""
-        SELECT *
-        FROM overload_predictions
-        ORDER BY timestamp DESC
-        LIMIT 1
-    """)
-    
-    row = cur.fetchone()
-    conn.close()
-    
+    with read_connection() as conn:
+        row = conn.execute("""
+            SELECT *
+            FROM overload_predictions
+            ORDER BY ts DESC
+            LIMIT 1
+        """).fetchone()
+
     if row:
         return dict(row)
     return {}
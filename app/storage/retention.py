@@ -1,20 +1,148 @@
 # app/storage/retention.py
 
-from app.storage.database import get_connection
+import time
+from typing import Dict
 
-def prune_old_data(days: int = 10) -> None:
-    conn = get_connection()
-    cur = conn.cursor()
+from app.storage.database import read_connection, write_connection, epoch_ms, ROLLUP_TIERS
 
-    cur.execute("""
-        DELETE FROM metrics
-        WHERE timestamp < datetime('now', ?)
-    """, (f"-{days} days",))
+# Days of history kept per table. Raw samples only need to outlive the
+# rollup job; long-range reads come from the coarser tiers.
+RETENTION_DAYS = {
+    "metrics": 2,
+    "metrics_rollup_1m": 30,
+    "metrics_rollup_15m": 180,
+    "metrics_rollup_1h": 365,
+    "anomaly_history": 90,
+    "alert_history": 90,
+    "overload_predictions": 30,
+    "system_stress_history": 30,
+    "anomalies": 10,
+    "samples": 30,
+    "cpu_cores": 7,
+}
 
-    cur.execute("""
-        DELETE FROM anomalies
-        WHERE timestamp < datetime('now', ?)
-    """, (f"-{days} days",))
+# Column holding each table's epoch-ms time (default "ts") and the indexed
+# key used to address a batch of old rows (default "id").
+_TIME_COLUMN = {f"metrics_rollup_{tier}": "bucket_ts" for tier in ROLLUP_TIERS}
+_KEY_COLUMN = {
+    "anomalies": "rowid",
+    "cpu_cores": "ts",
+    **{f"metrics_rollup_{tier}": "bucket_ts" for tier in ROLLUP_TIERS},
+}
 
-    conn.commit()
-    conn.close()
+# Extra condition per table: never drop raw rows the rollup job has not
+# folded in yet.
+_GUARD = {
+    "metrics": "id <= COALESCE((SELECT last_id FROM rollup_state WHERE name = 'metrics'), 0)",
+}
+
+def tier_retention_days(tier: str) -> int:
+    return RETENTION_DAYS[f"metrics_rollup_{tier}"]
+
+def prune_old_data(
+    batch_size: int = 500,
+    pause_seconds: float = 0.05,
+    vacuum_pages: int = 2000
+) -> Dict[str, int]:
+    """
+    Apply every table's retention policy in small batches.
+
+    Each batch is its own short transaction on an indexed range, with a
+    pause between batches, so the metrics writer never waits behind one
+    long delete. Freed pages are then returned to the OS with an
+    incremental vacuum (a no-op on a large pre-existing file until
+    enable_incremental_vacuum() has been run on it).
+
+    Partitioned raw metrics are expired by dropping whole partitions
+    (reported under "metrics_partitions") instead of deleting rows.
+
+    Returns rows deleted per table.
+    """
+    from app.storage.archive import ARCHIVE_ENABLED, sealed_through
+    from app.storage.partitions import drop_partitions
+
+    now = epoch_ms()
+    deleted = {}
+    for table, days in RETENTION_DAYS.items():
+        cutoff = now - days * 86_400_000
+        if table == "metrics" and ARCHIVE_ENABLED:
+            # Raw rows leave SQLite through the archive; only drop what is sealed
+            cutoff = min(cutoff, sealed_through())
+        if table == "samples":
+            deleted[table] = _prune_samples(cutoff, batch_size, pause_seconds)
+        else:
+            deleted[table] = _prune_table(table, cutoff, batch_size, pause_seconds)
+        if table == "metrics":
+            deleted["metrics_partitions"] = drop_partitions(cutoff, max_id=_rollup_watermark())
+    with write_connection() as conn:
+        # executescript runs the pragma to completion; a plain execute()
+        # only steps it once and frees a single page
+        conn.executescript(f"PRAGMA incremental_vacuum({int(vacuum_pages)});")
+    return deleted
+
+def _prune_table(
+    table: str,
+    cutoff: int,
+    batch_size: int,
+    pause_seconds: float
+) -> int:
+    time_col = _TIME_COLUMN.get(table, "ts")
+    key_col = _KEY_COLUMN.get(table, "id")
+    where = f"{time_col} < ?"
+    if table in _GUARD:
+        where += f" AND {_GUARD[table]}"
+
+    sql = f"""
+        DELETE FROM {table}
+        WHERE {key_col} IN (
+            SELECT {key_col} FROM {table}
+            WHERE {where}
+            ORDER BY {time_col}
+            LIMIT ?
+        )
+    """
+    total = 0
+    while True:
+        # Writer is held per batch only, so queued metric flushes interleave
+        with write_connection() as conn, conn:
+            n = conn.execute(sql, (cutoff, batch_size)).rowcount
+        total += n
+        if n < batch_size:
+            return total
+        time.sleep(pause_seconds)  # Let the writer in between batches
+
+def _prune_samples(cutoff: int, batch_size: int, pause_seconds: float) -> int:
+    """
+    Series-by-series variant for the WITHOUT ROWID samples table: every
+    batch is a (series_id, ts) primary-key range, so no ts index is needed.
+    """
+    with read_connection() as conn:
+        series_ids = [r[0] for r in conn.execute("SELECT series_id FROM series")]
+
+    sql = """
+        DELETE FROM samples
+        WHERE series_id = ? AND ts < ? AND ts <= (
+            SELECT MAX(ts) FROM (
+                SELECT ts FROM samples
+                WHERE series_id = ? AND ts < ?
+                ORDER BY ts
+                LIMIT ?
+            )
+        )
+    """
+    total = 0
+    for sid in series_ids:
+        while True:
+            with write_connection() as conn, conn:
+                n = conn.execute(sql, (sid, cutoff, sid, cutoff, batch_size)).rowcount
+            total += n
+            if n < batch_size:
+                break
+            time.sleep(pause_seconds)
+    return total
+
+
+def _rollup_watermark() -> int:
+    with read_connection() as conn:
+        row = conn.execute("SELECT last_id FROM rollup_state WHERE name = 'metrics'").fetchone()
+    return row[0] if row else 0
@@ -0,0 +1,202 @@
+# app/storage/rollup.py
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.storage.database import read_connection, write_connection, epoch_ms, METRIC_COLUMNS, ROLLUP_TIERS
+from app.storage.reader import read_metrics_since
+from app.storage.sketch import DDSketch
+
+ROLLUP_STATE_NAME = "metrics"
+
+ROLLUP_STATS = ("avg", "min", "max", "last", "count")
+
+# One rollup pass at a time in this process (scheduler job, archive, tests)
+_rollup_lock = threading.Lock()
+
+_UPSERT_SQL = """
+    INSERT INTO metrics_rollup_{tier} (bucket_ts, metric, count, sum, min, max, last, last_ts, sketch)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(bucket_ts, metric) DO UPDATE SET
+        count = count + excluded.count,
+        sum = sum + excluded.sum,
+        min = MIN(min, excluded.min),
+        max = MAX(max, excluded.max),
+        last = CASE WHEN excluded.last_ts >= last_ts THEN excluded.last ELSE last END,
+        last_ts = MAX(last_ts, excluded.last_ts),
+        sketch = sketch_merge(sketch, excluded.sketch)
+"""
+
+
+def rollup_watermark() -> int:
+    """Id of the last raw metrics row folded into the rollup tiers."""
+    with read_connection() as conn:
+        return _read_watermark(conn)
+
+
+def _read_watermark(conn) -> int:
+    row = conn.execute(
+        "SELECT last_id FROM rollup_state WHERE name = ?", (ROLLUP_STATE_NAME,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def run_rollups(batch_size: int = 5000) -> int:
+    """
+    Fold raw metrics appended since the last run into every rollup tier.
+
+    Work is incremental: only rows past the stored watermark are read,
+    aggregated per bucket in NumPy and merged into existing buckets with
+    an upsert. Returns the number of raw rows processed.
+
+    Concurrent calls are safe: passes are serialized, and a batch is only
+    committed if the watermark it was read against is still current
+    inside the write transaction, so no row is ever counted twice.
+    """
+    processed = 0
+    with _rollup_lock:
+        last_id = rollup_watermark()
+        while True:
+            raw = read_metrics_since(last_id, limit=batch_size)
+            n = len(raw["id"])
+            if n == 0:
+                break
+
+            # Aggregate before taking the writer so the lock covers only the upserts
+            aggregates = {tier: _aggregate(raw, width) for tier, width in ROLLUP_TIERS.items()}
+            with write_connection() as conn, conn:
+                conn.execute("BEGIN IMMEDIATE")
+                current = _read_watermark(conn)
+                if current != last_id:
+                    # Another process folded rows in meanwhile; resume after it
+                    last_id = current
+                    continue
+                for tier, rows in aggregates.items():
+                    conn.executemany(_UPSERT_SQL.format(tier=tier), rows)
+                last_id = int(raw["id"][-1])
+                conn.execute(
+                    """INSERT INTO rollup_state (name, last_id) VALUES (?, ?)
+                       ON CONFLICT(name) DO UPDATE SET last_id = excluded.last_id""",
+                    (ROLLUP_STATE_NAME, last_id)
+                )
+
+            processed += n
+            if n < batch_size:
+                break
+    return processed
+
+
+def _aggregate(raw: Dict[str, np.ndarray], width: int) -> List[Tuple]:
+    """
+    Per-bucket count/sum/min/max/last plus a quantile sketch for every
+    metric column of `raw`.
+
+    Rows arrive in id order, so each bucket is a contiguous run and the
+    reductions are single reduceat passes per column.
+    """
+    ts = raw["ts"]
+    buckets = ts - ts % width
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    bucket_ts = buckets[starts]
+    positions = np.arange(len(ts))
+    bounds = np.append(starts, len(ts))
+
+    rows = []
+    for col in METRIC_COLUMNS:
+        values = raw[col]
+        valid = ~np.isnan(values)
+        if not valid.any():
+            continue
+        counts = np.add.reduceat(valid.astype(np.int64), starts)
+        sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+        mins = np.minimum.reduceat(np.where(valid, values, np.inf), starts)
+        maxs = np.maximum.reduceat(np.where(valid, values, -np.inf), starts)
+        last_idx = np.maximum.reduceat(np.where(valid, positions, -1), starts)
+
+        for b in np.flatnonzero(counts):
+            li = last_idx[b]
+            sketch = DDSketch.from_values(values[bounds[b]:bounds[b + 1]])
+            rows.append((
+                int(bucket_ts[b]), col, int(counts[b]), float(sums[b]),
+                float(mins[b]), float(maxs[b]), float(values[li]), int(ts[li]),
+                sketch.to_bytes()
+            ))
+    return rows
+
+
+def read_rollup(
+    tier: str,
+    start: int,
+    end: Optional[int] = None,
+    columns: Optional[Iterable[str]] = None,
+    stats: Iterable[str] = ("avg",)
+) -> Dict[str, np.ndarray]:
+    """
+    Read pre-aggregated buckets from one rollup tier.
+
+    Args:
+        tier: One of ROLLUP_TIERS ("1m", "15m", "1h")
+        start: Inclusive range start (epoch ms, matched against bucket start)
+        end: Exclusive range end (epoch ms), defaults to now
+        columns: Metric columns, defaults to all of METRIC_COLUMNS
+        stats: Any of ROLLUP_STATS
+
+    Returns:
+        {"ts": int64 bucket starts, "<column>_<stat>": float64 array, ...}
+        with NaN for buckets in which a metric had no samples.
+    """
+    if tier not in ROLLUP_TIERS:
+        raise ValueError(f"Unknown rollup tier: {tier}")
+    cols = tuple(METRIC_COLUMNS if columns is None else columns)
+    unknown = [c for c in cols if c not in METRIC_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown metric columns: {unknown}")
+    stats = tuple(stats)
+    bad = [s for s in stats if s not in ROLLUP_STATS]
+    if bad:
+        raise ValueError(f"Unknown rollup stats: {bad}")
+    if end is None:
+        end = epoch_ms() + 1
+
+    with read_connection() as conn:
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute(f"""
+            SELECT bucket_ts, metric, count, sum, min, max, last
+            FROM metrics_rollup_{tier}
+            WHERE bucket_ts >= ? AND bucket_ts < ?
+              AND metric IN ({", ".join("?" for _ in cols)})
+            ORDER BY bucket_ts
+        """, (start, end) + cols)
+        rows = cur.fetchall()
+
+    if not rows:
+        out = {"ts": np.empty(0, dtype=np.int64)}
+        out.update({f"{c}_{s}": np.empty(0) for c in cols for s in stats})
+        return out
+
+    bucket = np.array([r[0] for r in rows], dtype=np.int64)
+    metric = [r[1] for r in rows]
+    data = np.array([r[2:] for r in rows], dtype=np.float64)  # count, sum, min, max, last
+    ts, pos = np.unique(bucket, return_inverse=True)
+
+    derived = {
+        "avg": data[:, 1] / data[:, 0],
+        "min": data[:, 2],
+        "max": data[:, 3],
+        "last": data[:, 4],
+        "count": data[:, 0],
+    }
+    out = {"ts": ts}
+    col_index = {c: i for i, c in enumerate(cols)}
+    which = np.array([col_index[m] for m in metric])
+    for c, i in col_index.items():
+        mask = which == i
+        for s in stats:
+            arr = np.full(len(ts), np.nan)
+            arr[pos[mask]] = derived[s][mask]
+            out[f"{c}_{s}"] = arr
+    return out
+
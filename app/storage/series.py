@@ -0,0 +1,104 @@
+# app/storage/series.py
+
+import json
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.storage.database import read_connection, write_connection, epoch_ms
+from app.storage.writer import INSERT_SAMPLES_SQL
+
+# (name, canonical labels) -> series_id, filled on first use
+_series_ids: Dict[Tuple[str, str], int] = {}
+_lock = threading.Lock()
+
+
+def _canonical_labels(labels: Optional[Dict[str, str]]) -> str:
+    """Stable JSON spelling of a label set, so equal sets share one series."""
+    labels = {k: str(v) for k, v in (labels or {}).items()}
+    return json.dumps(labels, sort_keys=True, separators=(",", ":"))
+
+
+def series_id(name: str, labels: Optional[Dict[str, str]] = None, unit: Optional[str] = None) -> int:
+    """
+    Id of the series `name` + `labels`, registering it on first use.
+
+    Ids are cached in-process, so the registry is only touched once per
+    series; sample writes then carry a plain integer.
+    """
+    key = (name, _canonical_labels(labels))
+    cached = _series_ids.get(key)
+    if cached is not None:
+        return cached
+    with _lock:
+        if key in _series_ids:
+            return _series_ids[key]
+        with write_connection() as conn, conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO series (name, unit, labels) VALUES (?, ?, ?)",
+                (name, unit, key[1])
+            )
+            sid = conn.execute(
+                "SELECT series_id FROM series WHERE name = ? AND labels = ?", key
+            ).fetchone()[0]
+        _series_ids[key] = sid
+        return sid
+
+
+def find_series(name: Optional[str] = None, **labels: str) -> List[Dict]:
+    """
+    Registered series matching `name` (if given) and every given label.
+
+    Returns dicts with series_id, name, unit and labels (decoded).
+    """
+    sql = "SELECT series_id, name, unit, labels FROM series"
+    params: Tuple = ()
+    if name is not None:
+        sql += " WHERE name = ?"
+        params = (name,)
+    with read_connection() as conn:
+        rows = conn.execute(sql + " ORDER BY series_id", params).fetchall()
+
+    out = []
+    for row in rows:
+        row_labels = json.loads(row["labels"])
+        if all(row_labels.get(k) == str(v) for k, v in labels.items()):
+            out.append({
+                "series_id": row["series_id"],
+                "name": row["name"],
+                "unit": row["unit"],
+                "labels": row_labels,
+            })
+    return out
+
+
+def write_samples(rows: Iterable[Tuple[int, int, float]]) -> None:
+    """
+    Write (series_id, ts, value) rows immediately.
+    Prefer MetricsWriter.submit_samples on the periodic collection path.
+    """
+    with write_connection() as conn, conn:
+        conn.executemany(INSERT_SAMPLES_SQL, list(rows))
+
+
+def read_series(sid: int, start: int, end: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Samples of one series in [start, end) as {"ts": int64, "value": float64}.
+
+    A single range scan on the (series_id, ts) primary key.
+    """
+    if end is None:
+        end = epoch_ms() + 1
+    with read_connection() as conn:
+        cur = conn.cursor()
+        cur.row_factory = None
+        cur.execute(
+            "SELECT ts, value FROM samples WHERE series_id = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (sid, start, end)
+        )
+        rows = cur.fetchall()
+    if not rows:
+        return {"ts": np.empty(0, dtype=np.int64), "value": np.empty(0)}
+    data = np.array(rows, dtype=np.float64)
+    return {"ts": data[:, 0].astype(np.int64), "value": np.ascontiguousarray(data[:, 1])}
@@ -0,0 +1,157 @@
+# app/storage/sketch.py
+
+import math
+import struct
+from typing import Iterable, Optional
+
+import numpy as np
+
+# Relative accuracy of every stored sketch: a reported quantile is within
+# 1% of the true sample value at that rank.
+SKETCH_ACCURACY = 0.01
+
+# Values at or below this are counted in the zero bin. Metrics are
+# non-negative (percentages, MB/s, KB/s), so negatives land there too.
+MIN_INDEXABLE = 1e-6
+
+_GAMMA = (1 + SKETCH_ACCURACY) / (1 - SKETCH_ACCURACY)
+_MULTIPLIER = 1 / math.log(_GAMMA)
+
+_HEADER = struct.Struct("<BII")  # version, zero_count, number of bins
+_VERSION = 1
+
+
+class DDSketch:
+    """
+    Mergeable quantile sketch with relative-error guarantees (DDSketch).
+
+    Each value v > 0 falls in bin ceil(log_gamma(v)); a bin only stores a
+    count, so sketches merge by adding counts and serialize to a few
+    bytes per occupied bin. Percentiles over long ranges come from
+    merging per-bucket sketches instead of sorting raw samples.
+    """
+
+    __slots__ = ("keys", "counts", "zero_count")
+
+    def __init__(
+        self,
+        keys: Optional[np.ndarray] = None,
+        counts: Optional[np.ndarray] = None,
+        zero_count: int = 0
+    ):
+        self.keys = np.empty(0, dtype=np.int16) if keys is None else keys
+        self.counts = np.empty(0, dtype=np.uint32) if counts is None else counts
+        self.zero_count = int(zero_count)
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + int(self.counts.sum())
+
+    @classmethod
+    def from_values(cls, values: np.ndarray) -> "DDSketch":
+        """Sketch of `values`, ignoring NaN."""
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        positive = values[values > MIN_INDEXABLE]
+        keys, counts = np.unique(bin_keys(positive), return_counts=True)
+        return cls(keys.astype(np.int16), counts.astype(np.uint32), len(values) - len(positive))
+
+    @classmethod
+    def merged(cls, sketches: Iterable["DDSketch"]) -> "DDSketch":
+        """One sketch holding the union of `sketches`."""
+        sketches = [s for s in sketches if s is not None]
+        if not sketches:
+            return cls()
+        keys = np.concatenate([s.keys for s in sketches])
+        counts = np.concatenate([s.counts for s in sketches]).astype(np.int64)
+        uniq, pos = np.unique(keys, return_inverse=True)
+        total = np.bincount(pos, weights=counts, minlength=len(uniq))
+        return cls(
+            uniq.astype(np.int16),
+            total.astype(np.uint32),
+            sum(s.zero_count for s in sketches)
+        )
+
+    def quantile(self, q: float) -> float:
+        """Approximate value at quantile `q` (0..1); NaN for an empty sketch."""
+        n = self.count
+        if n == 0:
+            return float("nan")
+        rank = q * (n - 1)
+        if rank < self.zero_count:
+            return 0.0
+        cum = self.zero_count + np.cumsum(self.counts, dtype=np.int64)
+        i = int(np.searchsorted(cum, rank, side="right"))
+        i = min(i, len(self.keys) - 1)
+        return bin_value(int(self.keys[i]))
+
+    def count_above(self, threshold: float) -> int:
+        """Approximate number of values greater than `threshold`."""
+        if threshold < 0:
+            return self.count
+        if threshold <= MIN_INDEXABLE:
+            return int(self.counts.sum())
+        key = int(bin_keys(np.array([threshold]))[0])
+        above = int(self.counts[self.keys > key].sum())
+        # Share of the threshold's own bin above it, assuming log-uniform spread
+        edge = self.counts[self.keys == key]
+        if len(edge):
+            share = key - math.log(threshold) * _MULTIPLIER
+            above += int(round(float(edge[0]) * share))
+        return above
+
+    def to_bytes(self) -> bytes:
+        return (
+            _HEADER.pack(_VERSION, self.zero_count, len(self.keys))
+            + self.keys.astype("<i2").tobytes()
+            + self.counts.astype("<u4").tobytes()
+        )
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "DDSketch":
+        version, zero_count, n = _HEADER.unpack_from(blob)
+        if version != _VERSION:
+            raise ValueError(f"Unsupported sketch version: {version}")
+        offset = _HEADER.size
+        keys = np.frombuffer(blob, dtype="<i2", count=n, offset=offset).astype(np.int16)
+        counts = np.frombuffer(blob, dtype="<u4", count=n, offset=offset + 2 * n).astype(np.uint32)
+        return cls(keys, counts, zero_count)
+
+
+def bin_keys(values: np.ndarray) -> np.ndarray:
+    """Bin index of each positive value."""
+    keys = np.ceil(np.log(values) * _MULTIPLIER)
+    return np.clip(keys, -32768, 32767).astype(np.int16)
+
+
+def bin_value(key: int) -> float:
+    """Representative value of bin `key` (relative error <= SKETCH_ACCURACY)."""
+    return 2 * _GAMMA ** key / (_GAMMA + 1)
+
+
+# -------------------------------------------------
+# SQLite functions (registered on every connection)
+# -------------------------------------------------
+def sketch_merge(a: Optional[bytes], b: Optional[bytes]) -> Optional[bytes]:
+    """Scalar SQL function: union of two sketch blobs (either may be NULL)."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return DDSketch.merged((DDSketch.from_bytes(a), DDSketch.from_bytes(b))).to_bytes()
+
+
+class SketchUnion:
+    """Aggregate SQL function: union of all non-NULL sketch blobs in a group."""
+
+    def __init__(self):
+        self.sketches = []
+
+    def step(self, blob: Optional[bytes]) -> None:
+        if blob is not None:
+            self.sketches.append(DDSketch.from_bytes(blob))
+
+    def finalize(self) -> Optional[bytes]:
+        if not self.sketches:
+            return None
+        return DDSketch.merged(self.sketches).to_bytes()
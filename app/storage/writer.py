@@ -1,37 +1,235 @@
 # app/storage/writer.py
 
-from typing import Dict
-from app.storage.database import get_connection
-
-def write_metrics(timestamp: str, data: Dict[str, float]) -> None:
-    conn = get_connection()
-    cur = conn.cursor()
-
-    cur.execute("""
-        INSERT INTO metrics (
-            timestamp,
-            cpu_percent,
-            memory_used_mb,
-            memory_percent,
-            disk_percent,
-            read_mb,
-            write_mb,
-            upload_kb,
-            download_kb,
-            gpu_percent
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
-        timestamp,
-        data.get("cpu_percent"),
-        data.get("memory_used_mb"),
-        data.get("memory_percent"),
-        data.get("disk_percent"),
-        data.get("read_mb"),
-        data.get("write_mb"),
-        data.get("upload_kb"),
-        data.get("download_kb"),
-        data.get("gpu_percent"),
-    ))
-
-    conn.commit()
-    conn.close()
+import atexit
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.core.logger import logger
+from app.storage.database import write_connection, ms_to_iso, METRIC_COLUMNS
+from app.storage.partitions import insert_metric_rows
+from app.collectors.schema import MetricSample
+
+INSERT_SAMPLES_SQL = """
+    INSERT OR REPLACE INTO samples (series_id, ts, value) VALUES (?, ?, ?)
+"""
+
+
+def _metrics_row(ts: int, data: Dict[str, float]) -> Tuple:
+    return (ts, ms_to_iso(ts)) + tuple(data.get(col) for col in METRIC_COLUMNS)
+
+
+def _sample_row(sample: MetricSample) -> Tuple:
+    # Fields already follow METRIC_COLUMNS order
+    return (sample.ts, ms_to_iso(sample.ts)) + sample.values
+
+
+def write_metrics(ts: int, data: Dict[str, float]) -> None:
+    """
+    Write a single metrics row immediately.
+    Prefer MetricsWriter for the periodic collection path.
+    """
+    with write_connection() as conn, conn:
+        insert_metric_rows(conn, [_metrics_row(ts, data)])
+
+
+_STOP = object()
+
+
+class _Statement(NamedTuple):
+    """Arbitrary write queued for the writer thread."""
+    sql: str
+    params: Tuple
+
+
+class _Batch(NamedTuple):
+    """Many parameter rows for one statement, written with executemany."""
+    sql: str
+    rows: List[Tuple]
+
+
+class MetricsWriter:
+    """
+    Long-lived single-writer storage service.
+
+    Samples are queued from any thread and written by one background
+    thread over the shared writer connection. Buffered rows are committed together
+    with executemany once `batch_size` rows are pending or
+    `flush_interval` seconds have passed, whichever comes first.
+    Other writes (anomalies, alerts, ...) can be queued with execute();
+    they go through the same thread, so there is exactly one writer, but
+    each commits on its own so a failing one cannot block the rest.
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 5.0,
+        batch_size: int = 50,
+        max_pending: int = 5000
+    ):
+        """
+        Args:
+            flush_interval: Max seconds a sample waits before being committed
+            batch_size: Number of pending samples that triggers an early flush
+            max_pending: Cap on buffered rows kept across failed flushes
+        """
+        self.flush_interval = flush_interval
+        self.batch_size = max(1, batch_size)
+        self.max_pending = max(self.batch_size, max_pending)
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the writer thread (no-op if already running)."""
+        with self._lock:
+            if self.running:
+                return
+            self._thread = threading.Thread(
+                target=self._run,
+                name="sentinel-db-writer",
+                daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def submit(self, sample: MetricSample) -> None:
+        """Queue one metrics sample. Never blocks on disk I/O."""
+        self._queue.put(_sample_row(sample))
+
+    def execute(self, sql: str, params: Tuple = ()) -> None:
+        """Queue any other write statement; committed at the next flush."""
+        self._queue.put(_Statement(sql, tuple(params)))
+
+    def submit_samples(self, rows: Iterable[Tuple[int, int, float]]) -> None:
+        """Queue (series_id, ts, value) rows for the long-format samples table."""
+        rows = list(rows)
+        if rows:
+            self._queue.put(_Batch(INSERT_SAMPLES_SQL, rows))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Commit everything queued so far and wait for it.
+
+        Returns True if the flush completed within `timeout`.
+        """
+        if not self.running:
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Flush pending samples and stop the writer thread."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._thread = None
+        if thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+        atexit.unregister(self.stop)
+
+    # -------------------------------------------------
+    # Writer thread
+    # -------------------------------------------------
+    def _run(self) -> None:
+        pending: List[Tuple] = []
+        statements: List = []  # _Statement / _Batch, in submission order
+        deadline = time.monotonic() + self.flush_interval
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    item = None
+
+                if item is _STOP:
+                    break
+
+                if isinstance(item, threading.Event):
+                    self._flush(pending, statements)
+                    deadline = time.monotonic() + self.flush_interval
+                    item.set()
+                    continue
+
+                if isinstance(item, (_Statement, _Batch)):
+                    statements.append(item)
+                elif item is not None:
+                    pending.append(item)
+
+                if (len(pending) + len(statements) >= self.batch_size
+                        or time.monotonic() >= deadline):
+                    self._flush(pending, statements)
+                    deadline = time.monotonic() + self.flush_interval
+        finally:
+            # Drain whatever arrived before the stop request
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif isinstance(item, (_Statement, _Batch)):
+                    statements.append(item)
+                elif item is not _STOP:
+                    pending.append(item)
+            self._flush(pending, statements)
+
+    def _flush(
+        self,
+        pending: List[Tuple],
+        statements: List
+    ) -> None:
+        """
+        Commit metric rows in one transaction, then each queued statement
+        in its own. A write that fails because the database is busy is
+        kept for the next flush; any other failure is logged and dropped,
+        so one bad statement cannot hold back everything queued after it.
+        """
+        if pending:
+            try:
+                with write_connection() as conn, conn:
+                    insert_metric_rows(conn, pending)
+                pending.clear()
+            except sqlite3.Error as e:
+                if _is_transient(e):
+                    logger.warning(f"Metrics flush deferred ({len(pending)} rows pending): {e}")
+                    # Keep rows for the next attempt, but never grow without bound
+                    if len(pending) > self.max_pending:
+                        del pending[:len(pending) - self.max_pending]
+                else:
+                    logger.error(f"Dropped {len(pending)} metrics rows that failed to write: {e}")
+                    pending.clear()
+
+        while statements:
+            stmt = statements[0]
+            try:
+                with write_connection() as conn, conn:
+                    if isinstance(stmt, _Batch):
+                        conn.executemany(stmt.sql, stmt.rows)
+                    else:
+                        conn.execute(stmt.sql, stmt.params)
+            except sqlite3.Error as e:
+                if _is_transient(e):
+                    # Retry this and everything after it, in order, next time
+                    logger.warning(f"Queued writes deferred ({len(statements)} pending): {e}")
+                    if len(statements) > self.max_pending:
+                        del statements[:len(statements) - self.max_pending]
+                    return
+                logger.error(f"Dropped queued write that failed: {e} (SQL: {' '.join(stmt.sql.split())[:200]})")
+            statements.pop(0)
+
+
+def _is_transient(error: sqlite3.Error) -> bool:
+    """Busy/locked errors go away on retry; everything else will fail again."""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ("locked" in message or "busy" in message)
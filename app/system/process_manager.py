@@ -1,6 +1,8 @@
 import psutil
 from typing import Optional
 
+from app.system.process_snapshot import TOP_METRICS, current_snapshot
+
 # Critical Windows processes that should never be terminated
 CRITICAL_PROCESSES = {
     "system", "csrss.exe", "smss.exe", "lsass.exe", "services.exe",
@@ -56,6 +58,17 @@ class ProcessManager:
     @staticmethod
     def get_process_info(pid: int) -> Optional[dict]:
         """Get detailed process information."""
+        record = current_snapshot().get(pid)
+        if record is not None:
+            return {
+                "pid": pid,
+                "name": record.name,
+                "cpu_percent": record.cpu_percent,
+                "memory_mb": record.memory_mb,
+                "status": record.status,
+                "num_threads": record.num_threads,
+            }
+        # Not in the snapshot yet (just started): ask the process directly
         try:
             process = psutil.Process(pid)
             return {
@@ -72,39 +85,24 @@ class ProcessManager:
     @staticmethod
     def get_top_processes(limit: int = 5) -> dict:
         """
-        Get lists of top processes by CPU and Memory.
+        Get lists of top processes by CPU, Memory, disk I/O and threads.
         
         Returns:
             {
-                "cpu": [{"name": str, "pid": int, "value": float}, ...],
-                "memory": [{"name": str, "pid": int, "value": float}, ...]
+                "cpu": [{"name": str, "pid": int, "value": float}, ...],      # %
+                "memory": [{"name": str, "pid": int, "value": float}, ...],   # MB
+                "io": [{"name": str, "pid": int, "value": float}, ...],       # bytes/s
+                "threads": [{"name": str, "pid": int, "value": float}, ...]
             }
         """
-        processes = []
-        for p in psutil.process_iter(['name', 'cpu_percent', 'memory_info', 'pid']):
-            try:
-                # CPU percent needs a tiny interval or it returns 0.0 first time
-                # But calling it on all processes is slow. 
-                # Better approach: use ones with cached values or accept 0 for new ones
-                p_info = p.info
-                p_info['memory_mb'] = p_info['memory_info'].rss / (1024 * 1024)
-                processes.append(p_info)
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                pass
-        
-        # Sort by Memory
-        by_mem = sorted(processes, key=lambda x: x['memory_mb'], reverse=True)[:limit]
-        
-        # Sort by CPU (Note: cpu_percent might be 0 without interval, but good enough for snapshot)
-        by_cpu = sorted(processes, key=lambda x: x['cpu_percent'] or 0, reverse=True)[:limit]
-        
+        # Ranked views are precomputed on the shared snapshot; CPU is measured
+        # over the refresh interval (over PRIME_INTERVAL_S for the very first
+        # snapshot), so it is meaningful even on the first call
+        snapshot = current_snapshot()
         return {
-            "cpu": [
-                {"name": p['name'], "pid": p['pid'], "value": p['cpu_percent']} 
-                for p in by_cpu
-            ],
-            "memory": [
-                {"name": p['name'], "pid": p['pid'], "value": p['memory_mb']} 
-                for p in by_mem
+            metric: [
+                {"name": p.name, "pid": p.pid, "value": getattr(p, field)}
+                for p in snapshot.top(metric, limit)
             ]
+            for metric, field in TOP_METRICS.items()
         }
@@ -0,0 +1,288 @@
+# app/system/process_snapshot.py
+
+import atexit
+import heapq
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional, Tuple
+
+import psutil
+
+from app.collectors.rates import RateTracker
+
+# Seconds between process table refreshes
+REFRESH_INTERVAL_S = 3.0
+# CPU sampling window behind the very first snapshot (psutil reports 0.0
+# from a process handle's first cpu_percent reading)
+PRIME_INTERVAL_S = 0.25
+
+# Ranked views kept on every snapshot: view name -> ProcessRecord field
+TOP_METRICS = {
+    "cpu": "cpu_percent",
+    "memory": "memory_mb",
+    "io": "io_bytes_s",
+    "threads": "num_threads",
+}
+TOP_K = 50  # Length of each precomputed view
+
+# Per-process readings taken inside one oneshot() per refresh;
+# io_counters does not exist on macOS
+_DYNAMIC_ATTRS = ["cpu_percent", "memory_info", "num_threads", "status"]
+if hasattr(psutil.Process, "io_counters"):
+    _DYNAMIC_ATTRS.append("io_counters")
+
+# (pid, create_time): a pid reused by a new process is a different key
+ProcessKey = Tuple[int, float]
+
+
+class ProcessRecord(NamedTuple):
+    """One process as of a snapshot."""
+    pid: int
+    create_time: float
+    name: str
+    username: str
+    cpu_percent: float   # Since the previous refresh; 0.0 on first sight
+    memory_mb: float     # Resident set size
+    num_threads: int
+    io_bytes_s: Optional[float]  # Read + write bytes/s; None if unknown
+    status: str
+
+    @property
+    def key(self) -> ProcessKey:
+        return self.pid, self.create_time
+
+
+def top_processes(
+    records: Iterable[ProcessRecord],
+    metric: str,
+    n: int
+) -> List[ProcessRecord]:
+    """
+    The `n` records with the highest value of TOP_METRICS[metric],
+    highest first; records without a value are skipped. O(N log n).
+    """
+    field = TOP_METRICS[metric]
+    return heapq.nlargest(
+        n,
+        (r for r in records if getattr(r, field) is not None),
+        key=lambda r: getattr(r, field)
+    )
+
+
+class ProcessSnapshot(NamedTuple):
+    """
+    Immutable view of the process table.
+
+    `version` increases with every refresh, so a consumer can skip work
+    when nothing changed since the version it last saw. `started` and
+    `exited` are the processes that appeared / disappeared since the
+    previous snapshot. The indexes and the TOP_K ranked views are built
+    once per refresh and shared by every reader.
+    """
+    version: int
+    ts: int  # epoch ms
+    processes: Tuple[ProcessRecord, ...]
+    started: Tuple[ProcessRecord, ...]
+    exited: Tuple[ProcessRecord, ...]
+    by_pid: Mapping[int, ProcessRecord]
+    by_name: Mapping[str, Tuple[int, ...]]  # lowercased name -> pids
+    ranked: Mapping[str, Tuple[ProcessRecord, ...]]  # TOP_METRICS name -> top TOP_K
+
+    def get(self, pid: int) -> Optional[ProcessRecord]:
+        """The process with this pid, or None."""
+        return self.by_pid.get(pid)
+
+    def pids_named(self, name: str) -> Tuple[int, ...]:
+        """Pids of processes called `name` (case-insensitive)."""
+        return self.by_name.get(name.lower(), ())
+
+    def top(self, metric: str, n: int) -> List[ProcessRecord]:
+        """Top `n` processes by a TOP_METRICS view, highest first."""
+        if n <= TOP_K:
+            return list(self.ranked[metric][:n])
+        return top_processes(self.processes, metric, n)
+
+
+def _build_snapshot(
+    version: int,
+    processes: Tuple[ProcessRecord, ...],
+    started: Tuple[ProcessRecord, ...],
+    exited: Tuple[ProcessRecord, ...]
+) -> ProcessSnapshot:
+    by_name: Dict[str, List[int]] = {}
+    for r in processes:
+        by_name.setdefault(r.name.lower(), []).append(r.pid)
+    return ProcessSnapshot(
+        version=version,
+        ts=int(time.time() * 1000),
+        processes=processes,
+        started=started,
+        exited=exited,
+        by_pid=MappingProxyType({r.pid: r for r in processes}),
+        by_name=MappingProxyType({k: tuple(v) for k, v in by_name.items()}),
+        ranked=MappingProxyType({
+            metric: tuple(top_processes(processes, metric, TOP_K))
+            for metric in TOP_METRICS
+        }),
+    )
+
+
+_EMPTY = _build_snapshot(0, (), (), ())
+
+
+class _Handle:
+    """A live psutil.Process plus the attributes that never change for it."""
+    __slots__ = ("proc", "key", "name", "username")
+
+    def __init__(self, proc: psutil.Process):
+        self.proc = proc
+        self.key = (proc.pid, proc.create_time())
+        info = proc.as_dict(["name", "username"], ad_value=None)
+        self.name = info["name"] or ""
+        self.username = info["username"] or ""
+
+
+class ProcessSnapshotService:
+    """
+    Shared, incrementally refreshed process table.
+
+    psutil.Process handles are kept across refreshes, keyed by
+    (pid, create_time), so cpu_percent is measured over the refresh
+    interval instead of reading 0 on a freshly created handle, and names
+    and usernames are looked up once per process. Every refresh reads
+    each process inside oneshot() and publishes a new ProcessSnapshot;
+    readers only ever see a complete one.
+    """
+
+    def __init__(self, interval: float = REFRESH_INTERVAL_S):
+        """
+        Args:
+            interval: Seconds between refreshes on the background thread
+        """
+        self.interval = interval
+        self._handles: Dict[int, _Handle] = {}
+        self._records: Dict[ProcessKey, ProcessRecord] = {}
+        self._io = RateTracker()
+        self._snapshot = _EMPTY
+        self._refresh_lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sentinel-processes", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def latest(self) -> ProcessSnapshot:
+        """Most recent snapshot; refreshes synchronously if there is none yet."""
+        snapshot = self._snapshot
+        if snapshot.version == 0:
+            with self._refresh_lock:
+                # The background thread may have published one meanwhile
+                snapshot = self._snapshot if self._snapshot.version else self.refresh()
+        return snapshot
+
+    def refresh(self) -> ProcessSnapshot:
+        """
+        Re-read the process table now and publish a new snapshot.
+        The first refresh primes every handle's CPU counter and waits
+        PRIME_INTERVAL_S, so even the first snapshot has real CPU figures.
+        """
+        with self._refresh_lock:
+            if self._snapshot.version == 0:
+                self._prime()
+            handles: Dict[int, _Handle] = {}
+            records: Dict[ProcessKey, ProcessRecord] = {}
+            io_totals: Dict[ProcessKey, float] = {}
+
+            for pid in psutil.pids():
+                handle = self._handles.get(pid)
+                try:
+                    if handle is None or not handle.proc.is_running():
+                        handle = _Handle(psutil.Process(pid))
+                    with handle.proc.oneshot():
+                        info = handle.proc.as_dict(_DYNAMIC_ATTRS, ad_value=None)
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue  # Exited meanwhile, or not inspectable at all
+
+                io = info.get("io_counters")
+                if io is not None:
+                    io_totals[handle.key] = io.read_bytes + io.write_bytes
+                mem = info["memory_info"]
+                handles[pid] = handle
+                records[handle.key] = ProcessRecord(
+                    pid=pid,
+                    create_time=handle.key[1],
+                    name=handle.name,
+                    username=handle.username,
+                    cpu_percent=info["cpu_percent"] or 0.0,
+                    memory_mb=mem.rss / (1024 * 1024) if mem else 0.0,
+                    num_threads=info["num_threads"] or 0,
+                    io_bytes_s=None,
+                    status=info["status"] or "",
+                )
+
+            # Per-process I/O rates; new and exited processes drop out of the tracker
+            for key, rate in self._io.update(io_totals).items():
+                if rate is not None:
+                    records[key] = records[key]._replace(io_bytes_s=rate)
+
+            previous = self._records
+            started = tuple(r for k, r in records.items() if k not in previous)
+            exited = tuple(r for k, r in previous.items() if k not in records)
+            self._handles = handles
+            self._records = records
+            self._snapshot = _build_snapshot(
+                self._snapshot.version + 1,
+                tuple(records.values()),
+                started,
+                exited,
+            )
+            return self._snapshot
+
+    def _prime(self) -> None:
+        for pid in psutil.pids():
+            try:
+                handle = _Handle(psutil.Process(pid))
+                handle.proc.cpu_percent(None)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            self._handles[pid] = handle
+        time.sleep(PRIME_INTERVAL_S)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Process snapshot error: {e}")
+            self._stop.wait(self.interval)
+
+
+# Shared service, started on the first current_snapshot() call
+process_snapshots = ProcessSnapshotService()
+atexit.register(process_snapshots.stop)
+
+
+def current_snapshot() -> ProcessSnapshot:
+    """
+    The latest shared process snapshot.
+    Starts the background refresher on first use; never enumerates
+    processes itself once a snapshot exists.
+    """
+    if not process_snapshots.running:
+        process_snapshots.start()
+    return process_snapshots.latest()
@@ -1,4 +1,5 @@
 import asyncio
+import numpy as np
 import psutil
 import flet as ft
 
@@ -9,9 +10,10 @@ from app.ui.components.overload_indicator import OverloadIndicator
 
 from app.ui.pages import dashboard, performance, analytics, ai_chat, settings
 
-from app.storage.reader import read_recent_metrics
+from app.storage.hot_store import hot_store
+from app.storage.async_storage import storage
 
-from app.ml.features import batch_features, FEATURE_ORDER
+from app.ml.features import column_features, FEATURE_ORDER
 from app.ml.normalizer import FeatureNormalizer
 from app.ml.anomaly import AnomalyDetector
 from app.ml.forecast import ResourceForecaster
@@ -22,18 +24,23 @@ from app.intelligence.health_state import compute_health_state
 
 from app.alerts.alert_manager import AlertManager
 from app.automation.process_automation import ProcessAutomation
-import json
+from app.system.process_snapshot import current_snapshot, top_processes
+from app.core.settings import settings as app_settings
 
 def run_ui(page: ft.Page):
     # Initialize Managers
     alert_manager = AlertManager()
     automation = ProcessAutomation()
     
-    # helper to load config for thresholds
-    def get_config():
-        try:
-           with open("config.json", "r") as f: return json.load(f)
-        except: return {}
+    # Settings page changes to automation limits apply immediately
+    def apply_automation_settings(changes):
+        if changes.get("restart_delay") is not None:
+            automation.config["restart_delay_seconds"] = changes["restart_delay"]
+        if changes.get("max_retries") is not None:
+            automation.config["max_restart_attempts"] = changes["max_retries"]
+
+    apply_automation_settings({k: app_settings.get(k) for k in ("restart_delay", "max_retries")})
+    app_settings.subscribe(apply_automation_settings)
 
     # --------------------------------------------------
     # Window & theme
@@ -195,38 +202,50 @@ def run_ui(page: ft.Page):
     async def refresh_metrics_and_health():
         await asyncio.sleep(1)
         from app.core.logger import logger
+        cursor = 0
         while True:
             try:
-                rows = read_recent_metrics(minutes=10)
-                if rows:
-                    latest = rows[-1]
+                # Only samples appended since the last pass; skip work when nothing is new
+                cursor, new = hot_store.read_since(cursor, columns=("cpu_percent", "memory_percent"))
+                if len(new["ts"]):
+                    window = hot_store.last_seconds(600)
+                    latest = hot_store.latest()
                     logger.debug(f"UI Read Metric: CPU={latest.get('cpu_percent')}")
                     cpu_val = latest.get('cpu_percent', 0)
-                    cpu_card.update_value(f"{cpu_val:.1f}%")
+                    max_core = latest.get('cpu_max_core')
+                    iowait = latest.get('cpu_iowait')
+                    cpu_detail = " · ".join(
+                        text for text in (
+                            f"max core {max_core:.0f}%" if max_core is not None else None,
+                            f"iowait {iowait:.1f}%" if iowait is not None else None,
+                        ) if text
+                    )
+                    cpu_card.update_value(f"{cpu_val:.1f}%", cpu_detail or None)
                     mem_val = latest.get('memory_percent', 0)
                     mem_card.update_value(f"{mem_val:.1f}%")
                     disk_val = latest.get('disk_percent', 0)
                     disk_usage = psutil.disk_usage('/')
                     disk_card.update_value(f"{disk_val:.1f}% ({disk_usage.used // (1024**3)}/{disk_usage.total // (1024**3)} GB)")
-                    net_card.update_value(f"↑{latest.get('upload_kb',0)/1024:.1f} ↓{latest.get('download_kb',0)/1024:.1f} Mbps")
+                    # upload_kb / download_kb are KB/s rates
+                    net_card.update_value(f"↑{(latest.get('upload_kb') or 0)/1024:.1f} ↓{(latest.get('download_kb') or 0)/1024:.1f} MB/s")
                     gpu = latest.get("gpu_percent")
                     if gpu is not None: 
                         gpu_card.update_value(f"{gpu:.1f}%")
                     else:
                         gpu_card.update_value("N/A")
                     
-                    # Update charts
-                    chart_data.pop(0)
-                    chart_data.append(float(mem_val))
+                    # Update charts with every new sample, keeping the last 30
+                    chart_data.extend(np.nan_to_num(new["memory_percent"]).tolist())
+                    del chart_data[:-30]
                     main_chart.update_chart(chart_data)
-                    cpu_chart_data.pop(0)
-                    cpu_chart_data.append(float(cpu_val))
+                    cpu_chart_data.extend(np.nan_to_num(new["cpu_percent"]).tolist())
+                    del cpu_chart_data[:-30]
                     cpu_chart.update_chart(cpu_chart_data)
 
                     # ---------------------------
                     # Alerts & Automation
                     # ---------------------------
-                    config = get_config()
+                    config = app_settings  # Served from memory; no file I/O per tick
                     
                     if config.get("alerts_enabled", True):
                         # CPU Alert
@@ -253,10 +272,10 @@ def run_ui(page: ft.Page):
                                 alert_manager.trigger_alert(f"restart_{proc}", "Process Restarted", f"Successfully restarted {proc}", "info")
                     
                     # ML Anomaly Detection
-                    if len(rows) >= 5:
+                    if len(window["ts"]) >= 5:
                         try:
                             # Build feature matrix
-                            X = batch_features(rows)
+                            X = column_features(window)
                             Xn = normalizer.fit_transform(X)
                             
                             # Fit detector if not fitted
@@ -273,8 +292,7 @@ def run_ui(page: ft.Page):
                             # Save detected anomalies to database
                             for anomaly in anomalies:
                                 if anomaly.get("score", 0) >= 70:  # Only save significant anomalies
-                                    from app.ml.anomaly import AnomalyDetector as AD
-                                    AD.save_anomaly(
+                                    storage.save_anomaly(
                                         anomaly_type=anomaly.get("feature", "unknown"),
                                         severity="critical" if anomaly.get("score", 0) >= 90 else "warning",
                                         score=anomaly.get("score", 0),
@@ -287,7 +305,8 @@ def run_ui(page: ft.Page):
                                     )
                             
                             # Forecasting
-                            mem_series = [r["memory_percent"] for r in rows if r.get("memory_percent")]
+                            mem = window["memory_percent"]
+                            mem_series = mem[np.nan_to_num(mem) > 0]
                             forecast_raw = forecaster.predict(mem_series)
                             forecast = interpret_forecast("memory", forecast_raw, 95.0)
                             
@@ -304,14 +323,12 @@ def run_ui(page: ft.Page):
                             health_badge.set_status(health["overall_status"])
 
                     # Update Overload Indicator
-                    from app.storage.reader import read_latest_overload_prediction
-                    overload_data = read_latest_overload_prediction()
+                    overload_data = await storage.read_latest_overload_prediction()
                     overload_indicator.update_overload_status(overload_data)
                         
-                else:
-                    logger.warning("UI Read: No metrics found in last 10 minutes")
-                        
-                page.update()
+                    page.update()
+                elif len(hot_store) == 0:
+                    logger.warning("UI Read: No metrics collected yet")
             except Exception as e:
                 logger.error(f"UI Loop Error: {e}", exc_info=True)
             await asyncio.sleep(2)
@@ -322,61 +339,62 @@ def run_ui(page: ft.Page):
     async def refresh_processes():
         await asyncio.sleep(1)
         import os
+        from app.system.process_manager import CRITICAL_PROCESSES
         current_user = os.getlogin().lower()
+        seen_version = 0
         
         while True:
             try:
-                app_rows = []
-                service_rows = []
+                # First call may enumerate synchronously; keep it off the loop
+                snapshot = await asyncio.to_thread(current_snapshot)
+                if snapshot.version == seen_version:
+                    await asyncio.sleep(1)
+                    continue
+                seen_version = snapshot.version
+
+                app_procs = []
+                service_procs = []
                 
-                # Fetch username to distinguish apps
-                for p in psutil.process_iter(["pid", "name", "cpu_percent", "memory_info", "username"]):
-                    try:
-                        cpu = p.info["cpu_percent"] or 0.0
-                        mem_info = p.info["memory_info"]
-                        mem = mem_info.rss / (1024 * 1024) if mem_info else 0.0
-                        username = (p.info.get("username") or "").lower()
-                        name = p.info["name"] or ""
-
-                        # Heuristic: Apps are usually run by the current user and not one of the critical system processes
-                        # Services/System are usually SYSTEM, NETWORK SERVICE, or critical processes
-                        from app.system.process_manager import CRITICAL_PROCESSES
-                        is_system = name.lower() in CRITICAL_PROCESSES or "service" in username or "system" in username
-                        
-                        # Further refinement: If user matches current login, it's likely an App, unless it's a known background task
-                        is_app = current_user in username and not is_system
-                        
-                        # Highlight resource hogs
-                        is_hog = cpu > 50 or mem > 500
-                        
-                        row = ft.DataRow(
-                            cells=[
-                                ft.DataCell(ft.Text(str(p.info["pid"]))),
-                                ft.DataCell(ft.Text(name, weight=ft.FontWeight.BOLD if is_hog else None)),
-                                ft.DataCell(ft.Text(f"{cpu:.1f}")),
-                                ft.DataCell(ft.Text(f"{mem:.0f}")),
-                                ft.DataCell(
-                                    create_process_menu(
-                                        p.info["pid"],
-                                        name,
-                                        cpu,
-                                        mem,
-                                    )
-                                ),
-                            ],
-                        )
-                        
-                        if is_app:
-                            app_rows.append(row)
-                        else:
-                            service_rows.append(row)
+                # Username distinguishes apps
+                for p in snapshot.processes:
+                    username = p.username.lower()
 
-                    except (psutil.NoSuchProcess, psutil.AccessDenied):
-                        continue
+                    # Heuristic: Apps are usually run by the current user and not one of the critical system processes
+                    # Services/System are usually SYSTEM, NETWORK SERVICE, or critical processes
+                    is_system = p.name.lower() in CRITICAL_PROCESSES or "service" in username or "system" in username
+                    
+                    # Further refinement: If user matches current login, it's likely an App, unless it's a known background task
+                    is_app = current_user in username and not is_system
+                    
+                    if is_app:
+                        app_procs.append(p)
+                    else:
+                        service_procs.append(p)
 
-                # Sort by memory usage
-                apps_table.rows = app_rows[:50] 
-                services_table.rows = service_rows[:50]
+                def build_row(p):
+                    # Highlight resource hogs
+                    is_hog = p.cpu_percent > 50 or p.memory_mb > 500
+                    
+                    return ft.DataRow(
+                        cells=[
+                            ft.DataCell(ft.Text(str(p.pid))),
+                            ft.DataCell(ft.Text(p.name, weight=ft.FontWeight.BOLD if is_hog else None)),
+                            ft.DataCell(ft.Text(f"{p.cpu_percent:.1f}")),
+                            ft.DataCell(ft.Text(f"{p.memory_mb:.0f}")),
+                            ft.DataCell(
+                                create_process_menu(
+                                    p.pid,
+                                    p.name,
+                                    p.cpu_percent,
+                                    p.memory_mb,
+                                )
+                            ),
+                        ],
+                    )
+
+                # Top 50 by memory usage; rows are built only for those
+                apps_table.rows = [build_row(p) for p in top_processes(app_procs, "memory", 50)]
+                services_table.rows = [build_row(p) for p in top_processes(service_procs, "memory", 50)]
                 
                 if page.control: 
                      page.update()
@@ -3,23 +3,14 @@ import flet as ft
 from app.intelligence.local_ai import LocalAIEngine
 from app.intelligence.cloud_ai import CloudAIEngine
 from app.ai.model_manager import ModelManager
-import json
-import os
+from app.core.settings import settings
 
-CONFIG_FILE = "config.json"
-
-def load_config():
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, 'r') as f:
-                return json.load(f)
-        except:
-            pass
-    return {"ai_mode": "rag", "api_key": ""}  # Default to RAG
+# Used when config.json has no ai_mode
+DEFAULT_CONFIG = {"ai_mode": "rag", "api_key": ""}
 
 
 def view(ai_context=None):
-    config = load_config()
+    config = settings.as_dict(DEFAULT_CONFIG)
     
     # Initialize all engines
     from app.intelligence.rag_engine import RAGEngine
@@ -56,7 +47,27 @@ def view(ai_context=None):
         on_submit=None,  # Will be set after send_message is defined
     )
 
-    def add_message(text, sender="user", save_to_history=True):
+    def add_message(text, sender="user", save_to_history=True, note=False):
+        row = build_message(text, sender)
+        row.data = "note" if note else "history"  # Notes are never saved
+        messages.controls.append(row)
+        
+        # Save to persistent storage if new message
+        if save_to_history:
+            unloaded = chat_history.add_message(text, sender)
+            if unloaded:
+                # Mirror the capped history: drop the oldest history rows
+                # (and notes above them); they can be paged back in.
+                # Index 0 is the "load older" row.
+                end = 1
+                while unloaded and end < len(messages.controls):
+                    if messages.controls[end].data == "history":
+                        unloaded -= 1
+                    end += 1
+                del messages.controls[1:end]
+                load_older_button.visible = True
+
+    def build_message(text, sender):
         # User: Blue tint, AI: Purple tint
         bg_color = ft.Colors.BLUE_900 if sender == "user" else ft.Colors.PURPLE_900
         align = ft.MainAxisAlignment.END if sender == "user" else ft.MainAxisAlignment.START
@@ -85,9 +96,9 @@ def view(ai_context=None):
                 import subprocess
                 try:
                     subprocess.run(cmd, shell=True, check=True)
-                    add_message(f"✅ Executed: `{cmd}`", sender="ai", save_to_history=False)
+                    add_message(f"✅ Executed: `{cmd}`", sender="ai", save_to_history=False, note=True)
                 except Exception as e:
-                    add_message(f"❌ Failed: {e}", sender="ai", save_to_history=False)
+                    add_message(f"❌ Failed: {e}", sender="ai", save_to_history=False, note=True)
                 messages.update()
 
             msg_content.controls.append(
@@ -103,27 +114,40 @@ def view(ai_context=None):
                 )
             )
 
-        messages.controls.append(
-            ft.Row(
-                [
-                    ft.Container(
-                        content=msg_content,
-                        padding=15,
-                        border_radius=15,
-                        bgcolor=bg_color,
-                        opacity=0.9,
-                        width=600,
-                    )
-                ],
-                alignment=align,
-            )
+        return ft.Row(
+            [
+                ft.Container(
+                    content=msg_content,
+                    padding=15,
+                    border_radius=15,
+                    bgcolor=bg_color,
+                    opacity=0.9,
+                    width=600,
+                )
+            ],
+            alignment=align,
         )
-        
-        # Save to persistent storage if new message
-        if save_to_history:
-            chat_history.add_message(text, sender)
+
+    def load_older(e):
+        """Prepend the previous page of history above the loaded messages."""
+        older = chat_history.load_older()
+        # Index 0 is the "load older" row
+        rows = [build_message(m["text"], m["sender"]) for m in older]
+        for row in rows:
+            row.data = "history"
+        messages.controls[1:1] = rows
+        load_older_button.visible = chat_history.has_older()
+        messages.update()
+
+    load_older_button = ft.TextButton(
+        "Load older messages",
+        icon=ft.Icons.HISTORY,
+        on_click=load_older,
+        visible=chat_history.has_older(),
+    )
+    messages.controls.append(ft.Row([load_older_button], alignment=ft.MainAxisAlignment.CENTER))
             
-    # Load previous messages from history
+    # Load the newest page of history; older pages load on demand
     for msg in chat_history.get_messages():
         add_message(msg["text"], msg["sender"], save_to_history=False)
 
@@ -147,7 +171,8 @@ def view(ai_context=None):
         add_message(
             f"✓ Process context loaded for **{ai_context['payload']['name']}**. I can answer specific questions about its resource usage.",
             sender="ai",
-            save_to_history=False
+            save_to_history=False,
+            note=True
         )
 
     async def send_message(e):
@@ -202,8 +227,8 @@ Answer using the data above. If user asks for a command, provide it used specifi
 
         # Define the AI generation task
         def generate_response():
-             # Reload config to get current mode
-            current_config = load_config()
+            # Cached; reflects changes made since the page was built
+            current_config = settings.as_dict(DEFAULT_CONFIG)
             current_mode = current_config.get('ai_mode', 'rag')
             used_mode = {"rag": "RAG", "local": "Local", "cloud": "Cloud"}.get(current_mode, "RAG")
             
@@ -254,8 +279,9 @@ Answer using the data above. If user asks for a command, provide it used specifi
     
     def clear_chat(e):
         """Clear all chat messages."""
-        messages.controls.clear()
+        del messages.controls[1:]  # Keep the "load older" row
         chat_history.clear_history()
+        load_older_button.visible = False
         messages.update()
 
     # Set the on_submit handler after send_message is defined
@@ -1,35 +1,80 @@
 import flet as ft
-from app.storage.reader import read_recent_metrics
+from app.storage.hot_store import hot_store
+from app.storage.database import epoch_ms
+from app.storage.aggregate import aggregate_metrics, count_over
 from app.ui.components.charts import NeonChart
 from app.ui.theme import Palette
 from app.ml.forecast import ResourceForecaster
 from app.ml.anomaly import AnomalyDetector
-import statistics
+import numpy as np
+from datetime import datetime
 
 def view():
-    def export_data(e, hours):
-        """Handle CSV export."""
+    # Export controls (the export itself runs on a worker thread)
+    export_format = ft.Dropdown(
+        value="csv",
+        width=120,
+        options=[ft.dropdown.Option(f) for f in ("csv", "csv.gz", "parquet", "arrow")],
+    )
+    export_range = ft.Dropdown(
+        value="24",
+        width=150,
+        options=[
+            ft.dropdown.Option("24", "Last 24h"),
+            ft.dropdown.Option("168", "Last 7 days"),
+            ft.dropdown.Option("all", "All retained"),
+        ],
+    )
+    export_predictions = ft.Checkbox(label="Predictions", value=False)
+    export_progress = ft.ProgressBar(width=200, value=0, visible=False)
+    export_status = ft.Text("", size=12, color=ft.Colors.GREY_400)
+
+    def export_data(e):
+        """Handle metrics export without blocking the UI."""
         from app.export.csv_exporter import CSVExporter
-        
-        success, result = CSVExporter.export_metrics(hours=hours)
-        
-        if success:
-            e.page.snack_bar = ft.SnackBar(
-                ft.Text(f"✓ Exported to: {result}"),
-                open=True,
-                bgcolor=ft.Colors.GREEN_700
-            )
-        else:
-            e.page.snack_bar = ft.SnackBar(
-                ft.Text(f"❌ {result}"),
-                open=True,
-                bgcolor=ft.Colors.RED_700
-            )
-        e.page.update()
+
+        page = e.page
+        button = e.control
+        hours = None if export_range.value == "all" else int(export_range.value)
+
+        def on_progress(fraction, rows):
+            export_progress.value = fraction
+            export_status.value = f"{rows:,} rows"
+            page.update()
+
+        def on_done(success, result):
+            button.disabled = False
+            export_progress.visible = False
+            export_status.value = ""
+            if success:
+                page.snack_bar = ft.SnackBar(
+                    ft.Text(f"✓ Exported to: {result}"),
+                    open=True,
+                    bgcolor=ft.Colors.GREEN_700
+                )
+            else:
+                page.snack_bar = ft.SnackBar(
+                    ft.Text(f"❌ {result}"),
+                    open=True,
+                    bgcolor=ft.Colors.RED_700
+                )
+            page.update()
+
+        button.disabled = True
+        export_progress.value = 0
+        export_progress.visible = True
+        page.update()
+        CSVExporter.export_in_background(
+            on_done,
+            hours=hours,
+            fmt=export_format.value,
+            include_predictions=export_predictions.value,
+            progress=on_progress,
+        )
     
-    metrics = read_recent_metrics(minutes=30)
+    metrics = hot_store.last_seconds(1800, columns=("cpu_percent", "memory_percent", "disk_percent"))
 
-    if not metrics or len(metrics) < 5:
+    if len(metrics["ts"]) < 5:
         return ft.Column(
             [
                 ft.Text("Analytics", size=28, weight=ft.FontWeight.BOLD),
@@ -40,16 +85,59 @@ def view():
         )
 
     # Extract data
-    cpu_vals = [m["cpu_percent"] for m in metrics if m.get("cpu_percent") is not None]
-    mem_vals = [m["memory_percent"] for m in metrics if m.get("memory_percent") is not None]
-    disk_vals = [m["disk_percent"] for m in metrics if m.get("disk_percent") is not None]
+    cpu_vals = metrics["cpu_percent"][~np.isnan(metrics["cpu_percent"])]
+    mem_vals = metrics["memory_percent"][~np.isnan(metrics["memory_percent"])]
+    disk_vals = metrics["disk_percent"][~np.isnan(metrics["disk_percent"])]
 
     # Compute statistics
-    avg_cpu = statistics.mean(cpu_vals) if cpu_vals else 0
-    peak_mem = max(mem_vals) if mem_vals else 0
-    avg_mem = statistics.mean(mem_vals) if mem_vals else 0
-    anomaly_count = sum(1 for v in mem_vals if v > 85)
+    avg_cpu = float(cpu_vals.mean()) if len(cpu_vals) else 0
+    peak_mem = float(mem_vals.max()) if len(mem_vals) else 0
+    avg_mem = float(mem_vals.mean()) if len(mem_vals) else 0
+    anomaly_count = int(np.count_nonzero(mem_vals > 85))
     
+    # Long-range summary, bucketed and aggregated in the storage layer;
+    # a locked or damaged database leaves the 24h figures blank ("—")
+    # instead of failing the whole page
+    try:
+        day = aggregate_metrics(
+            epoch_ms() - 86_400_000,
+            funcs=("avg", "max", "p50", "p95", "p99", count_over(85)),
+            columns=("cpu_percent", "memory_percent", "read_mb", "write_mb")
+        )
+    except Exception as e:
+        print(f"Error reading 24h summary: {e}")
+        day = {"ts": np.empty(0, dtype=np.int64)}
+
+    def day_stat(key):
+        if not len(day["ts"]) or np.isnan(day[key][0]):
+            return None
+        return float(day[key][0])
+
+    def fmt_day(value, suffix="%"):
+        return "—" if value is None else f"{value:.1f}{suffix}"
+
+    day_cpu_avg = day_stat("cpu_percent_avg")
+    day_cpu_peak = day_stat("cpu_percent_max")
+    day_mem_avg = day_stat("memory_percent_avg")
+    day_mem_high = day_stat("memory_percent_count_over_85")  # Samples, one per 2s tick
+
+    # Percentile table rows: (label, column, unit)
+    percentile_rows = [
+        ft.Row([
+            ft.Text(label, width=140, color=ft.Colors.GREY_400),
+            *[
+                ft.Text(fmt_day(day_stat(f"{col}_{p}"), unit), width=110, weight=ft.FontWeight.BOLD)
+                for p in ("p50", "p95", "p99")
+            ],
+        ])
+        for label, col, unit in (
+            ("CPU", "cpu_percent", "%"),
+            ("Memory", "memory_percent", "%"),
+            ("Disk Read", "read_mb", " MB/s"),
+            ("Disk Write", "write_mb", " MB/s"),
+        )
+    ]
+
     # Forecast all resources
     forecaster = ResourceForecaster()
     
@@ -70,9 +158,9 @@ def view():
     # Disk Prediction
     try:
         disk_forecast = forecaster.predict_disk(disk_vals[-30:] if len(disk_vals) >= 30 else disk_vals)
-        disk_prediction = float(disk_forecast.get("predicted_value", disk_vals[-1] if disk_vals else 0))
+        disk_prediction = float(disk_forecast.get("predicted_value", disk_vals[-1] if len(disk_vals) else 0))
     except Exception:
-        disk_prediction = disk_vals[-1] if disk_vals else 0
+        disk_prediction = disk_vals[-1] if len(disk_vals) else 0
     
     # Get recent anomalies from database
     recent_anomalies = AnomalyDetector.get_recent_anomalies(limit=10)
@@ -147,15 +235,15 @@ def view():
     
     # Determine trend
     if len(mem_vals) >= 10:
-        recent_avg = statistics.mean(mem_vals[-5:])
-        older_avg = statistics.mean(mem_vals[-10:-5])
+        recent_avg = float(np.mean(mem_vals[-5:]))
+        older_avg = float(np.mean(mem_vals[-10:-5]))
         trend = "↑ Increasing" if recent_avg > older_avg else "↓ Decreasing" if recent_avg < older_avg else "→ Stable"
     else:
         trend = "→ Stable"
     
     # Create charts
-    cpu_chart = NeonChart(cpu_vals[-30:] if len(cpu_vals) >= 30 else cpu_vals, color=Palette.NEON_BLUE)
-    mem_chart = NeonChart(mem_vals[-30:] if len(mem_vals) >= 30 else mem_vals, color=Palette.NEON_PURPLE)
+    cpu_chart = NeonChart(cpu_vals[-30:].tolist(), color=Palette.NEON_BLUE)
+    mem_chart = NeonChart(mem_vals[-30:].tolist(), color=Palette.NEON_PURPLE)
     
     # Anomaly History Section
     def build_anomaly_row(anomaly):
@@ -163,7 +251,11 @@ def view():
         severity_color = ft.Colors.RED_400 if severity == "critical" else ft.Colors.ORANGE_400 if severity == "warning" else ft.Colors.BLUE_400
         severity_icon = ft.Icons.ERROR if severity == "critical" else ft.Icons.WARNING if severity == "warning" else ft.Icons.INFO
         
-        timestamp = anomaly.get("timestamp", "")[:16].replace("T", " ")  # Truncate and format
+        ts = anomaly.get("ts")
+        if ts:
+            timestamp = datetime.fromtimestamp(ts / 1000).strftime("%Y-%m-%d %H:%M")  # Local time
+        else:
+            timestamp = anomaly.get("timestamp", "")[:16].replace("T", " ")  # Truncate and format
         
         return ft.Container(
             content=ft.Row([
@@ -223,6 +315,45 @@ def view():
                 ]
             ),
             
+            # 24h Summary Row
+            ft.Text("Last 24 Hours", size=18, weight=ft.FontWeight.BOLD),
+            ft.Row(
+                [
+                    ft.Container(
+                        content=ft.Column([
+                            ft.Text(label, color=ft.Colors.GREY_400),
+                            ft.Text(value, size=20, weight=ft.FontWeight.BOLD),
+                        ]),
+                        padding=15,
+                        bgcolor=ft.Colors.BLUE_GREY_900,
+                        border_radius=10,
+                        expand=True,
+                    )
+                    for label, value in (
+                        ("Avg CPU", fmt_day(day_cpu_avg)),
+                        ("Peak CPU", fmt_day(day_cpu_peak)),
+                        ("Avg Memory", fmt_day(day_mem_avg)),
+                        ("Memory >85% (min)", "—" if day_mem_high is None else f"{day_mem_high * 2 / 60:.0f}"),
+                    )
+                ]
+            ),
+
+            ft.Container(
+                content=ft.Column(
+                    [
+                        ft.Row([
+                            ft.Text("Percentiles (24h)", width=140, weight=ft.FontWeight.BOLD),
+                            *[ft.Text(p, width=110, color=ft.Colors.GREY_400) for p in ("p50", "p95", "p99")],
+                        ]),
+                        *percentile_rows,
+                    ],
+                    spacing=6,
+                ),
+                padding=15,
+                bgcolor=ft.Colors.BLUE_GREY_900,
+                border_radius=10,
+            ),
+
             # Prediction Cards (All Resources)
             ft.Text("Resource Predictions", size=18, weight=ft.FontWeight.BOLD),
             prediction_cards,
@@ -244,10 +375,15 @@ def view():
             ft.Row([
                 ft.Text("Export Data", size=16, weight=ft.FontWeight.BOLD),
                 ft.Container(expand=True),
+                export_status,
+                export_progress,
+                export_range,
+                export_format,
+                export_predictions,
                 ft.ElevatedButton(
-                    "Export Last 24h to CSV",
+                    "Export",
                     icon=ft.Icons.DOWNLOAD,
-                    on_click=lambda e: export_data(e, 24),
+                    on_click=export_data,
                 ),
             ]),
             
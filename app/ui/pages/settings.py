@@ -1,59 +1,19 @@
 import flet as ft
-import json
-import os
 import threading
 import time
 from app.ai.model_manager import ModelManager
+from app.core.settings import settings
 
-CONFIG_FILE = "config.json"
-
-import keyring
+# Used for keys config.json does not set
+DEFAULT_CONFIG = {"ai_mode": "local", "api_key": ""}
 
 def load_config():
-    """Load configuration from file and system keyring."""
-    cfg = {"ai_mode": "local", "api_key": ""}
-    
-    # Load file config
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, 'r') as f:
-                file_cfg = json.load(f)
-                cfg.update(file_cfg)
-        except:
-            pass
-            
-    # Load secure API key
-    try:
-        secure_key = keyring.get_password("SENTINEL", "api_key")
-        if secure_key:
-            cfg["api_key"] = secure_key
-    except Exception as e:
-        print(f"Keyring load error: {e}")
-        
-    return cfg
+    """Current configuration (cached by the settings service, secrets included)."""
+    return settings.as_dict(DEFAULT_CONFIG)
 
 def save_config(config):
-    """Save configuration to file, excluding sensitive data."""
-    try:
-        # Create a copy to modify for saving
-        to_save = config.copy()
-        
-        # Handle API Key securely
-        api_key = to_save.get("api_key")
-        if api_key:
-            try:
-                keyring.set_password("SENTINEL", "api_key", api_key)
-            except Exception as e:
-                print(f"Keyring save error: {e}")
-        
-        # Remove from file payload
-        if "api_key" in to_save:
-            del to_save["api_key"]
-            
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(to_save, f, indent=2)
-    except Exception as e:
-        print(f"Error saving config: {e}")
+    """Save configuration; the API key goes to the system keyring, not the file."""
+    settings.save(config)
 
 def view(on_toggle_theme=None, on_ai_mode_change=None):
     config = load_config()
@@ -223,6 +183,66 @@ def view(on_toggle_theme=None, on_ai_mode_change=None):
     )
     
 
+    # Database snapshot (online backup on a worker thread)
+    backup_progress = ft.ProgressBar(width=200, value=0, visible=False)
+    backup_status = ft.Text("", size=12, color=ft.Colors.GREY_400)
+
+    def create_backup(e):
+        from app.storage.backup import snapshot_in_background
+
+        page = e.page
+        button = e.control
+
+        def on_progress(copied, total):
+            backup_progress.value = copied / total if total else 1.0
+            page.update()
+
+        def on_done(success, result):
+            button.disabled = False
+            backup_progress.visible = False
+            backup_status.value = result if success else ""
+            page.snack_bar = ft.SnackBar(
+                ft.Text(f"✓ Snapshot saved: {result}" if success else f"❌ {result}"),
+                open=True,
+                bgcolor=ft.Colors.GREEN_700 if success else ft.Colors.RED_700
+            )
+            page.update()
+
+        button.disabled = True
+        backup_progress.value = 0
+        backup_progress.visible = True
+        page.update()
+        snapshot_in_background(
+            on_done,
+            compress=config.get("backup_compress", True),
+            progress=on_progress,
+        )
+
+    # One-time rebuild so retention can return freed space to the OS
+    def rebuild_for_vacuum(e):
+        from app.storage.database import enable_incremental_vacuum
+
+        page = e.page
+        button = e.control
+
+        def run():
+            try:
+                ok = enable_incremental_vacuum()
+                message = "✓ Space reclaiming enabled" if ok else "❌ Space reclaiming not enabled"
+            except Exception as ex:
+                ok, message = False, f"❌ Rebuild failed: {ex}"
+            button.disabled = ok
+            page.snack_bar = ft.SnackBar(
+                ft.Text(message),
+                open=True,
+                bgcolor=ft.Colors.GREEN_700 if ok else ft.Colors.RED_700
+            )
+            page.update()
+
+        button.disabled = True
+        page.update()
+        threading.Thread(target=run, name="sentinel-vacuum-rebuild", daemon=True).start()
+
     # Custom Metrics logic
     from app.metrics.custom_metrics import CustomMetricsManager
     metrics_manager = CustomMetricsManager()
@@ -488,6 +508,31 @@ def view(on_toggle_theme=None, on_ai_mode_change=None):
                 on_click=lambda e: save_alert_config(e)
             ),
             
+            ft.Divider(),
+
+            # Backup Section
+            ft.Text("Database Backup", size=16, weight=ft.FontWeight.BOLD),
+            ft.Text("Snapshots the live database and its archive without pausing collection; the newest 7 are kept.", size=12, color=ft.Colors.GREY_400),
+            ft.Row([
+                ft.Switch(label="Compress (gzip)", value=config.get("backup_compress", True), on_change=lambda e: save_single_setting("backup_compress", e.control.value)),
+                ft.ElevatedButton("Create Snapshot", icon=ft.Icons.BACKUP, on_click=create_backup),
+                backup_progress,
+                backup_status,
+            ]),
+            ft.Text("Raw metrics partitions: old raw rows are dropped a whole table at a time, when their day is archived (or at retention if archiving is off). Applies to new rows.", size=12, color=ft.Colors.GREY_400),
+            ft.Dropdown(
+                value=config.get("partition_mode") or "off",
+                width=150,
+                options=[
+                    ft.dropdown.Option("off", "Off"),
+                    ft.dropdown.Option("day", "Daily"),
+                    ft.dropdown.Option("hour", "Hourly"),
+                ],
+                on_change=lambda e: save_single_setting("partition_mode", None if e.control.value == "off" else e.control.value),
+            ),
+            ft.Text("Databases created by older versions cannot return deleted space to the disk until rebuilt once. The rebuild pauses metric writes until it finishes.", size=12, color=ft.Colors.GREY_400),
+            ft.ElevatedButton("Enable Space Reclaiming", icon=ft.Icons.CLEANING_SERVICES, on_click=rebuild_for_vacuum),
+
             ft.Divider(),
             
             # AI Comparison Info
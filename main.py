@@ -1,5 +1,6 @@
 import asyncio
-from datetime import datetime
+
+import numpy as np
 
 import flet as ft
 from app.ui.tray import start_tray
@@ -13,12 +14,19 @@ from app.collectors.memory import collect_memory
 from app.collectors.disk import collect_disk
 from app.collectors.network import collect_network
 from app.collectors.gpu import collect_gpu
+from app.collectors.schema import MetricSample
+from app.collectors.rates import device_series_rows
 
-from app.storage.writer import write_metrics
+from app.storage.database import epoch_ms
+from app.storage.async_storage import AsyncStorage, storage
 from app.storage.retention import prune_old_data
-from app.storage.reader import read_recent_metrics
+from app.storage.rollup import run_rollups
+from app.storage.archive import run_archive
+from app.storage.hot_store import hot_store, warm_hot_store
+
+from app.metrics.custom_metrics import CustomMetricsManager
 
-from app.ml.features import batch_features, FEATURE_ORDER
+from app.ml.features import column_features, FEATURE_ORDER
 from app.ml.normalizer import FeatureNormalizer
 from app.ml.anomaly import AnomalyDetector
 from app.ml.enhanced_forecaster import EnhancedResourceForecaster
@@ -56,50 +64,72 @@ async def collect_and_publish(event_bus: EventBus) -> None:
             asyncio.to_thread(collect_gpu)
         )
 
-        payload = {}
-        payload.update(cpu)
-        payload.update(mem)
-        payload.update(disk)
-        payload.update(net)
-        payload.update(gpu)
+        # Collectors report schema field names directly
+        sample = MetricSample.from_readings(epoch_ms(), cpu, mem, disk, net, gpu)
+
+        # Hot tier first: recent-window readers never wait on SQLite
+        hot_store.append_sample(sample)
         
         # Log successful collection (debug level)
-        logger.debug(f"Collected metrics: CPU={cpu.get('cpu_percent')}% Mem={mem.get('percent')}%")
+        logger.debug(f"Collected metrics: CPU={sample.cpu_percent}% Mem={sample.memory_percent}%")
 
         await event_bus.publish({
             "type": "metrics",
-            "timestamp": datetime.utcnow().isoformat(),
-            "payload": payload
+            "ts": sample.ts,
+            "payload": sample
         })
+
+        # Per-core utilization: one packed float32 row per tick
+        storage.submit_cpu_cores(sample.ts, cpu["cpu_cores"])
+
+        # Per-disk / per-NIC rates go to the series store (first tick registers ids)
+        rows = await asyncio.to_thread(device_rate_rows, sample.ts, disk, net)
+        storage.submit_samples(rows)
     except Exception as e:
         logger.error(f"Error in collect_and_publish: {e}", exc_info=True)
         print(f"Error in collect_and_publish: {e}")
 
 
+def device_rate_rows(ts: int, disk: dict, net: dict) -> list:
+    rows = []
+    for metric, unit, label, source, key in (
+        ("disk.read_mb_s", "MB/s", "device", disk["per_disk"], "read_mb_s"),
+        ("disk.write_mb_s", "MB/s", "device", disk["per_disk"], "write_mb_s"),
+        ("net.upload_kb_s", "KB/s", "nic", net["per_nic"], "upload_kb_s"),
+        ("net.download_kb_s", "KB/s", "nic", net["per_nic"], "download_kb_s"),
+    ):
+        rates = {name: r[key] for name, r in source.items()}
+        rows += device_series_rows(ts, metric, unit, label, rates)
+    return rows
+
+
 # -------------------------------------------------
 # EventBus → Storage
 # -------------------------------------------------
-async def storage_consumer(event_bus: EventBus) -> None:
+async def storage_consumer(event_bus: EventBus, storage: AsyncStorage) -> None:
     while True:
         event = await event_bus.subscribe()
         if event.get("type") != "metrics":
             continue
 
-        p = event["payload"]
-        write_metrics(
-            timestamp=event["timestamp"],
-            data={
-                "cpu_percent": p.get("cpu_percent"),
-                "memory_used_mb": p.get("used_mb"),
-                "memory_percent": p.get("percent"),
-                "disk_percent": p.get("percent_used"),
-                "read_mb": p.get("read_mb_s"),
-                "write_mb": p.get("write_mb_s"),
-                "upload_kb": p.get("upload_kb"),
-                "download_kb": p.get("download_kb"),
-                "gpu_percent": p.get("gpu_percent"),
-            }
-        )
+        # Queued for the writer thread; commits happen in batches off the loop
+        storage.submit_metrics(event["payload"])
+
+
+# -------------------------------------------------
+# Custom metrics → series store
+# -------------------------------------------------
+async def collect_custom_metrics(manager: CustomMetricsManager, storage: AsyncStorage) -> None:
+    try:
+        def collect():
+            manager.refresh()
+            return manager.collect_due(epoch_ms())
+
+        # Commands may shell out; keep them off the loop
+        rows = await asyncio.to_thread(collect)
+        storage.submit_samples(rows)
+    except Exception as e:
+        logger.error(f"Error in collect_custom_metrics: {e}", exc_info=True)
 
 
 # -------------------------------------------------
@@ -112,11 +142,11 @@ async def decision_pipeline(
     overload_detector: OverloadDetector,
     throttle: NotificationThrottle
 ) -> None:
-    metrics = read_recent_metrics(minutes=10)
-    if len(metrics) < 5:
+    metrics = hot_store.last_seconds(600)
+    if len(metrics["ts"]) < 5:
         return
 
-    X = batch_features(metrics)
+    X = column_features(metrics)
     Xn = normalizer.fit_transform(X)
 
     if not detector.fitted:
@@ -138,11 +168,8 @@ async def decision_pipeline(
     overload_risk = overload_detector.predict_overload_risk(all_forecasts)
 
     # Legacy memory forecast for health state (compat)
-    mem_series = [
-        m["memory_percent"]
-        for m in metrics
-        if m.get("memory_percent") is not None
-    ]
+    mem = metrics["memory_percent"]
+    mem_series = mem[~np.isnan(mem)]
     forecast_raw = forecaster.predict(values=mem_series)
     forecast = interpret_forecast(
         resource="memory",
@@ -180,8 +207,15 @@ async def backend_main():
     except Exception as e:
         logger.error(f"Database init failed: {e}", exc_info=True)
 
+    try:
+        loaded = await asyncio.to_thread(warm_hot_store)
+        logger.info(f"Hot store warmed with {loaded} samples")
+    except Exception as e:
+        logger.error(f"Hot store warm-up failed: {e}", exc_info=True)
+
     event_bus = EventBus()
     scheduler = Scheduler()
+    storage.start()
     app_state = AppState()
 
     detector = AnomalyDetector()
@@ -191,6 +225,10 @@ async def backend_main():
     throttle = NotificationThrottle(cooldown_seconds=300)
 
     scheduler.every(2, lambda: collect_and_publish(event_bus))
+    custom_metrics = CustomMetricsManager()
+    scheduler.every(5, lambda: collect_custom_metrics(custom_metrics, storage))
+    scheduler.every(60, lambda: asyncio.to_thread(run_rollups))
+    scheduler.every(3600, lambda: asyncio.to_thread(run_archive))
     scheduler.every(3600, lambda: asyncio.to_thread(prune_old_data))
     scheduler.every(
         30,
@@ -203,10 +241,14 @@ async def backend_main():
         )
     )
 
-    asyncio.create_task(storage_consumer(event_bus))
+    asyncio.create_task(storage_consumer(event_bus, storage))
 
-    while True:
-        await asyncio.sleep(1)
+    try:
+        while True:
+            await asyncio.sleep(1)
+    finally:
+        scheduler.cancel_all()
+        storage.stop()
 
 
 # -------------------------------------------------
@@ -0,0 +1,43 @@
+# tests/conftest.py
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# The storage layer resolves DB_PATH from APPDATA at import time
+os.environ["APPDATA"] = tempfile.mkdtemp(prefix="sentinel-tests-")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def db():
+    """A fresh, initialized database (and empty archive) per test."""
+    from app.storage import archive, database, partitions
+
+    database.connections.close_all()
+    for suffix in ("", "-wal", "-shm"):
+        Path(str(database.DB_PATH) + suffix).unlink(missing_ok=True)
+    shutil.rmtree(archive.ARCHIVE_DIR, ignore_errors=True)
+    archive._catalogue["mtime"] = None
+    archive._segment_cache.clear()
+    partitions._schema_version = None
+
+    database.initialize_database()
+    yield database
+    database.connections.close_all()
+
+
+def insert_raw(rows):
+    """Insert [(ts, {column: value})] straight into raw metrics storage."""
+    from app.storage.database import METRIC_COLUMNS, ms_to_iso, write_connection
+    from app.storage.partitions import insert_metric_rows
+
+    with write_connection() as conn, conn:
+        insert_metric_rows(conn, [
+            (ts, ms_to_iso(ts)) + tuple(values.get(c) for c in METRIC_COLUMNS)
+            for ts, values in rows
+        ])
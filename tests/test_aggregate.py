@@ -0,0 +1,42 @@
+# tests/test_aggregate.py
+
+import numpy as np
+
+from conftest import insert_raw
+from app.storage import aggregate
+from app.storage.aggregate import _aggregate_numpy, _aggregate_rollup, _aggregate_sql, _parse_func
+from app.storage.rollup import run_rollups
+
+START = 1_699_999_200_000  # An hour boundary
+COLS = ("cpu_percent", "gpu_percent")
+SPECS = [_parse_func(f) for f in ("avg", "min", "max", "count", "count_over:50")]
+
+
+def _assert_same(a, b):
+    assert a.keys() == b.keys()
+    for key in a:
+        assert np.allclose(a[key], b[key], equal_nan=True), key
+
+
+def test_all_null_buckets_agree_across_paths(db):
+    # gpu_percent is never reported: every bucket is all-NULL for it
+    insert_raw((START + i * 1000, {"cpu_percent": 90.0 if i % 2 else 10.0}) for i in range(1800))
+    run_rollups()
+    end = START + 1_800_000
+
+    sql = _aggregate_sql(START, end, 600_000, COLS, SPECS)
+    numpy = _aggregate_numpy(START, end, 600_000, COLS, SPECS)
+    rollup = _aggregate_rollup("1m", START, end, 600_000, COLS, SPECS)
+    _assert_same(sql, numpy)
+    _assert_same(sql, rollup)
+
+    assert np.array_equal(sql["gpu_percent_count"], [0, 0, 0])
+    assert np.array_equal(sql["gpu_percent_count_over_50"], [0, 0, 0])
+    assert np.isnan(sql["gpu_percent_avg"]).all()
+    assert np.array_equal(sql["cpu_percent_count_over_50"], [300, 300, 300])
+
+
+def test_percentiles_use_the_numpy_path(db):
+    insert_raw((START + i * 1000, {"cpu_percent": float(i)}) for i in range(101))
+    out = aggregate.aggregate_metrics(START, START + 101_000, funcs=("p50",), columns=["cpu_percent"])
+    assert out["cpu_percent_p50"].tolist() == [50.0]
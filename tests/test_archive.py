@@ -0,0 +1,86 @@
+# tests/test_archive.py
+
+import numpy as np
+import pytest
+
+from conftest import insert_raw
+
+from app.storage import archive
+from app.storage.database import epoch_ms, read_connection
+from app.storage.reader import read_metrics_columns
+from app.storage.rollup import run_rollups
+
+
+def _same_bits(a, b):
+    return np.array_equal(np.asarray(a, dtype=np.float64).view(np.uint64),
+                          np.asarray(b, dtype=np.float64).view(np.uint64))
+
+
+@pytest.mark.parametrize("ts", [
+    [1_700_000_000_000],
+    [1_700_000_000_000, 1_700_000_002_000],
+    list(1_700_000_000_000 + np.arange(5000) * 2000),
+    [-5, 0, 2 ** 62, -2 ** 62, 7, 7, 7, 2 ** 63 - 1],
+])
+def test_timestamp_round_trip(ts):
+    ts = np.array(ts, dtype=np.int64)
+    assert np.array_equal(archive._decode_timestamps(archive._encode_timestamps(ts), len(ts)), ts)
+
+
+def test_jittered_timestamps_round_trip():
+    rng = np.random.default_rng(1)
+    ts = np.cumsum(rng.integers(1900, 2100, 3000)) + 1_700_000_000_000
+    assert np.array_equal(archive._decode_timestamps(archive._encode_timestamps(ts), len(ts)), ts)
+
+
+@pytest.mark.parametrize("values", [
+    [42.5],
+    [1.0] * 100,
+    [np.nan, np.inf, -np.inf, 0.0, -0.0, 5e-324, 1.7976931348623157e308, np.nan],
+    list(np.random.default_rng(2).normal(0, 1e6, 2000)),
+])
+def test_float_round_trip_is_bit_exact(values):
+    values = np.array(values, dtype=np.float64)
+    assert _same_bits(archive._decode_floats(archive._encode_floats(values), len(values)), values)
+
+
+def test_segment_round_trip_and_range_reads(tmp_path):
+    rng = np.random.default_rng(3)
+    n = archive.BLOCK_ROWS * 3 + 17
+    ts = 1_700_000_000_000 + np.arange(n, dtype=np.int64) * 2000
+    cpu = np.round(rng.uniform(0, 100, n), 1)
+    cpu[10:50] = np.nan
+    path = tmp_path / "metrics-test.seg"
+    archive.write_segment(path, {"ts": ts, "cpu_percent": cpu})
+
+    seg = archive.Segment(path)
+    full = seg.read(0, 2 ** 62, ["cpu_percent", "gpu_percent"])
+    assert np.array_equal(full["ts"], ts)
+    assert _same_bits(full["cpu_percent"], cpu)
+    # Columns the segment does not store read back as NaN
+    assert np.isnan(full["gpu_percent"]).all()
+
+    start, end = int(ts[1500]), int(ts[2600])
+    part = seg.read(start, end, ["cpu_percent"])
+    assert np.array_equal(part["ts"], ts[1500:2600])
+    assert _same_bits(part["cpu_percent"], cpu[1500:2600])
+
+
+def test_seal_waits_for_rollups_and_preserves_rows(db):
+    day = archive._day_start(epoch_ms()) - 3 * archive.DAY_MS
+    rows = [(day + i * 60_000, {"cpu_percent": float(i % 50)}) for i in range(1440)]
+    insert_raw(rows)
+
+    # Nothing rolled up yet: sealing must not touch the raw rows
+    assert archive.seal_closed_days() == 0
+    with read_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM metrics").fetchone()[0] == 1440
+
+    run_rollups()
+    assert archive.seal_closed_days() == 1
+    with read_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM metrics").fetchone()[0] == 0
+
+    out = read_metrics_columns(day, day + archive.DAY_MS, columns=["cpu_percent"])
+    assert np.array_equal(out["ts"], [ts for ts, _ in rows])
+    assert np.array_equal(out["cpu_percent"], [v["cpu_percent"] for _, v in rows])
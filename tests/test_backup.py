@@ -0,0 +1,109 @@
+# tests/test_backup.py
+
+import gzip
+import sqlite3
+
+import pytest
+
+from conftest import insert_raw
+from app.storage import archive
+from app.storage.backup import (
+    archive_dir, list_backups, restore_snapshot, rotate_backups, snapshot_database
+)
+from app.storage.database import epoch_ms, read_connection, write_connection
+from app.storage.rollup import run_rollups
+
+
+def _count(conn):
+    return conn.execute("SELECT COUNT(*) FROM metrics").fetchone()[0]
+
+
+@pytest.fixture
+def sealed_day(db):
+    """One sealed day in the archive plus 10 raw rows still in SQLite."""
+    day = archive._day_start(epoch_ms()) - 3 * archive.DAY_MS
+    insert_raw([(day + i * 60_000, {"cpu_percent": 1.0}) for i in range(1440)])
+    run_rollups()
+    assert archive.seal_closed_days() == 1
+    now = epoch_ms()
+    insert_raw([(now - i * 1000, {"cpu_percent": 2.0}) for i in range(10)])
+    return day
+
+
+@pytest.mark.parametrize("compress", [True, False])
+def test_snapshot_includes_database_and_segments(sealed_day, tmp_path, compress):
+    snap = snapshot_database(tmp_path, compress=compress)
+
+    db_file = tmp_path / "copy.db"
+    if compress:
+        with gzip.open(snap) as src:
+            db_file.write_bytes(src.read())
+    else:
+        db_file = snap
+    conn = sqlite3.connect(db_file)
+    try:
+        assert _count(conn) == 10
+    finally:
+        conn.close()
+
+    segment = archive.segment_path(sealed_day)
+    saved = archive_dir(snap) / segment.name
+    assert saved.read_bytes() == segment.read_bytes()
+
+
+def test_restore_brings_back_rows_and_segments(sealed_day, tmp_path):
+    snap = snapshot_database(tmp_path)
+
+    with write_connection() as conn, conn:
+        conn.execute("DELETE FROM metrics")
+    archive.segment_path(sealed_day).unlink()
+
+    restore_snapshot(snap)
+    with read_connection() as conn:
+        assert _count(conn) == 10
+    assert archive.sealed_through() == sealed_day + archive.DAY_MS
+    out = archive.read_archive_columns(sealed_day, sealed_day + archive.DAY_MS, ["cpu_percent"])
+    assert len(out["ts"]) == 1440
+
+
+def test_restore_rejects_corrupt_snapshot(db, tmp_path):
+    insert_raw([(epoch_ms(), {"cpu_percent": 1.0})])
+    bad = tmp_path / "sys_sentinel_bad.db"
+    bad.write_bytes(b"not a database" * 100)
+
+    with pytest.raises(sqlite3.DatabaseError):
+        restore_snapshot(bad)
+    with read_connection() as conn:
+        assert _count(conn) == 1
+
+
+def test_rotation_removes_saved_segments(sealed_day, tmp_path):
+    snaps = []
+    for stamp in ("20240101_000000", "20240102_000000"):
+        snap = snapshot_database(tmp_path, keep=None)
+        snaps.append(snap.rename(tmp_path / f"sys_sentinel_{stamp}.db.gz"))
+        archive_dir(snap).rename(archive_dir(snaps[-1]))
+
+    assert rotate_backups(tmp_path, keep=1) == 1
+    assert list_backups(tmp_path) == [snaps[1]]
+    assert not archive_dir(snaps[0]).exists()
+    assert archive_dir(snaps[1]).exists()
+
+
+def test_sealing_after_restore_does_not_duplicate_rows(db, tmp_path):
+    from app.storage.reader import read_metrics_columns
+
+    day = archive._day_start(epoch_ms()) - 3 * archive.DAY_MS
+    insert_raw([(day + i * 60_000, {"cpu_percent": float(i)}) for i in range(100)])
+    run_rollups()
+    snap = snapshot_database(tmp_path)
+    assert archive.seal_closed_days() == 1
+
+    restore_snapshot(snap)  # Raw rows are back; the segment stays
+    run_rollups()
+    archive.run_archive()
+
+    out = read_metrics_columns(day, day + archive.DAY_MS, columns=["cpu_percent"])
+    assert out["cpu_percent"].tolist() == [float(i) for i in range(100)]
+    with read_connection() as conn:
+        assert _count(conn) == 0
@@ -0,0 +1,74 @@
+# tests/test_chat_history.py
+
+import json
+
+import pytest
+
+from app.storage import chat_history
+from app.storage.chat_history import MAX_MESSAGES, ChatHistory
+
+
+@pytest.fixture
+def log(tmp_path):
+    return str(tmp_path / "chat.jsonl")
+
+
+def _texts(messages):
+    return [m["text"] for m in messages]
+
+
+def _fill(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"text": f"m{i}", "sender": "user", "timestamp": ""}) + "\n")
+
+
+def test_startup_loads_newest_page_and_pages_backwards(log):
+    _fill(log, 75)
+    history = ChatHistory(log, page_size=30)
+    assert _texts(history.messages) == [f"m{i}" for i in range(45, 75)]
+    assert history.has_older()
+
+    assert _texts(history.load_older()) == [f"m{i}" for i in range(15, 45)]
+    assert _texts(history.load_older()) == [f"m{i}" for i in range(15)]
+    assert not history.has_older()
+    assert _texts(history.messages) == [f"m{i}" for i in range(75)]
+
+
+def test_memory_is_capped_and_unloaded_messages_page_back_in(log, monkeypatch):
+    monkeypatch.setattr(chat_history, "COMPACT_AT", 10_000)  # Keep every line on disk
+    history = ChatHistory(log, page_size=30)
+    unloaded = [history.add_message(f"m{i}", "user") for i in range(MAX_MESSAGES + 25)]
+
+    assert len(history.messages) == MAX_MESSAGES
+    assert sum(unloaded) == 25 and unloaded[-1] == 1
+    assert _texts(history.messages)[0] == "m25"
+    assert history.has_older()
+
+    assert _texts(history.load_older()) == [f"m{i}" for i in range(25)]
+    assert not history.has_older()
+
+
+def test_compaction_keeps_newest_messages(log, monkeypatch):
+    monkeypatch.setattr(chat_history, "COMPACT_AT", MAX_MESSAGES + 10)
+    history = ChatHistory(log)
+    for i in range(MAX_MESSAGES + 10):
+        history.add_message(f"m{i}", "ai")
+
+    with open(log, encoding="utf-8") as f:
+        lines = [json.loads(line)["text"] for line in f]
+    assert lines == [f"m{i}" for i in range(10, MAX_MESSAGES + 10)]
+    assert _texts(history.messages) == lines
+    assert not history.has_older()
+
+    reopened = ChatHistory(log, page_size=MAX_MESSAGES)
+    assert _texts(reopened.messages) == lines
+
+
+def test_torn_final_line_is_skipped(log):
+    _fill(log, 3)
+    with open(log, "a", encoding="utf-8") as f:
+        f.write('{"text": "half')
+    history = ChatHistory(log)
+    history.add_message("after", "user")
+    assert _texts(ChatHistory(log).messages) == ["m0", "m1", "m2", "after"]
@@ -0,0 +1,78 @@
+# tests/test_custom_metrics.py
+
+import sys
+import time
+
+import psutil
+import pytest
+
+from app.metrics import custom_metrics
+from app.metrics.custom_metrics import CustomMetricsManager
+
+NOW = 1_700_000_000_000
+PYTHON = f'"{sys.executable}" -c'
+
+# Starts a child that inherits stdout and writes its pid, then both hang
+SPAWNS_CHILD = (
+    PYTHON + ' "import subprocess, sys, time; '
+    "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']); "
+    "open(sys.argv[1], 'w').write(str(child.pid)); time.sleep(60)\" "
+)
+
+
+@pytest.fixture
+def manager(db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(custom_metrics, "COMMAND_TIMEOUT_S", 1.0)
+    return CustomMetricsManager()
+
+
+def test_command_value_is_collected(manager):
+    manager.add_metric("answer", "gauge", "echo 42")
+    [(_, ts, value)] = manager.collect_due(NOW)
+    assert (ts, value) == (NOW, 42.0)
+
+
+def test_hung_command_times_out_as_failed_sample(manager):
+    manager.add_metric("hung", "gauge", PYTHON + ' "import time; time.sleep(60)"')
+    started = time.monotonic()
+    [(_, ts, value)] = manager.collect_due(NOW)
+    assert time.monotonic() - started < 5
+    assert (ts, value) == (NOW, None)
+
+
+def test_timeout_kills_children_holding_stdout(manager, tmp_path):
+    pid_file = tmp_path / "child.pid"
+    manager.add_metric("spawner", "gauge", SPAWNS_CHILD + str(pid_file))
+    started = time.monotonic()
+    [(_, _, value)] = manager.collect_due(NOW)
+    assert time.monotonic() - started < 10
+    assert value is None
+
+    child = int(pid_file.read_text())
+    deadline = time.monotonic() + 5
+    while psutil.pid_exists(child) and time.monotonic() < deadline:
+        try:
+            if psutil.Process(child).status() == psutil.STATUS_ZOMBIE:
+                break
+        except psutil.NoSuchProcess:
+            break
+        time.sleep(0.05)
+    else:
+        assert not psutil.pid_exists(child)
+
+
+def test_slow_metrics_do_not_delay_each_other(manager):
+    for i in range(4):
+        manager.add_metric(f"hung{i}", "gauge", PYTHON + ' "import time; time.sleep(60)"')
+    manager.add_metric("answer", "gauge", "echo 7")
+    started = time.monotonic()
+    rows = manager.collect_due(NOW)
+    assert time.monotonic() - started < 4  # Not 4 x the timeout
+    assert [value for _, _, value in rows] == [None, None, None, None, 7.0]
+
+
+def test_failing_command_is_recorded_as_failed_sample(manager):
+    manager.add_metric("broken", "gauge", "echo not-a-number")
+    [(_, _, value)] = manager.collect_due(NOW)
+    assert value is None
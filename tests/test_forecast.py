@@ -0,0 +1,43 @@
+# tests/test_forecast.py
+
+import numpy as np
+import pytest
+
+pytest.importorskip("sklearn")
+
+from app.ml.forecast import ResourceForecaster, rolling_linear_forecast
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(7)
+    return 40 + 0.3 * np.arange(200) + rng.normal(0, 4, 200)
+
+
+def test_matches_predict_resource_on_every_window(series):
+    forecaster = ResourceForecaster()
+    got = rolling_linear_forecast(series, window=30, horizon=10)
+    expected = [
+        forecaster._predict_resource(series[max(0, i - 29):i + 1], 10)["predicted_value"]
+        for i in range(len(series))
+    ]
+    assert np.allclose(got, expected, atol=1e-6)
+
+
+def test_clamps_like_predict_resource():
+    rising = np.linspace(80, 99, 30)
+    assert rolling_linear_forecast(rising)[-1] == 100.0
+    assert rolling_linear_forecast(rising, clamp=None)[-1] > 100.0
+
+
+def test_nan_samples_are_left_out_of_the_fit(series):
+    holed = series.copy()
+    holed[50:55] = np.nan
+    got = rolling_linear_forecast(holed, window=30, horizon=10)
+    window = holed[41:71]
+    kept = ~np.isnan(window)
+    # The line through the valid samples at their own positions, evaluated
+    # `horizon` steps past the end of the window
+    slope, intercept = np.polyfit(np.flatnonzero(kept), window[kept], 1)
+    assert got[70] == pytest.approx(intercept + slope * (30 + 10), abs=1e-6)
+    assert np.isnan(rolling_linear_forecast(np.full(5, np.nan))).all()
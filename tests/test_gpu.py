@@ -0,0 +1,110 @@
+# tests/test_gpu.py
+
+import importlib
+import os
+import sys
+import time
+
+import pytest
+
+from app.collectors import gpu
+from app.collectors.gpu import GpuSampler, RETRY_BACKOFF_S
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="stub relies on a #! script")
+
+# Stand-in for nvidia-smi: prints canned `--format=csv,noheader,nounits`
+# lines, then exits. Every run is counted so restarts can be observed.
+STUB = """#!{python}
+import sys, time
+from pathlib import Path
+runs = Path({runs!r})
+n = int(runs.read_text()) + 1 if runs.exists() else 1
+runs.write_text(str(n))
+print("0, 35, 1024, 8192", flush=True)
+print("1, [Not Supported], 512, 4096", flush=True)
+print("garbage line", flush=True)
+time.sleep(0.3)
+"""
+
+
+def _stub(tmp_path):
+    runs = tmp_path / "runs"
+    path = tmp_path / "nvidia-smi"
+    path.write_text(STUB.format(python=sys.executable, runs=str(runs)))
+    path.chmod(0o755)
+    return path, runs
+
+
+def _wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+def test_parses_canned_csv_per_gpu(tmp_path):
+    path, _ = _stub(tmp_path)
+    sampler = GpuSampler(command=[str(path)], interval_ms=100)
+    sampler.start()
+    try:
+        assert _wait_for(lambda: len(sampler.gpus()) == 2)
+        assert sampler.gpus() == [
+            {"utilization": 35.0, "memory_used_mb": 1024.0, "memory_total_mb": 8192.0},
+            {"utilization": None, "memory_used_mb": 512.0, "memory_total_mb": 4096.0},
+        ]
+        assert sampler.latest() == {
+            "gpu_available": True,
+            "gpu_count": 2,
+            "gpu_percent": 35.0,
+            "gpu_memory_used_mb": 1536.0,
+            "gpu_memory_total_mb": 12288.0,
+        }
+    finally:
+        sampler.stop()
+
+
+def test_restarts_when_the_child_exits(tmp_path):
+    path, runs = _stub(tmp_path)
+    sampler = GpuSampler(command=[str(path)], interval_ms=100)
+    sampler.start()
+    try:
+        assert _wait_for(lambda: runs.exists() and int(runs.read_text()) >= 2)
+        assert _wait_for(lambda: sampler.latest()["gpu_available"])
+        # A working child resets the backoff instead of growing it
+        assert sampler.backoff == RETRY_BACKOFF_S
+    finally:
+        sampler.stop()
+
+
+def test_missing_binary_reports_no_gpu(tmp_path):
+    sampler = GpuSampler(command=[str(tmp_path / "missing-nvidia-smi")])
+    sampler.backoff = 0.1
+    sampler.start()
+    try:
+        # Each failed attempt doubles the retry delay; the thread keeps going
+        assert _wait_for(lambda: sampler.backoff >= 0.4)
+        assert sampler.running
+        assert sampler.gpus() == []
+        assert sampler.latest() == gpu._empty_gpu_stats()
+    finally:
+        sampler.stop()
+
+
+def test_environment_override_selects_the_binary(tmp_path, monkeypatch):
+    path, _ = _stub(tmp_path)
+    monkeypatch.setenv("SENTINEL_NVIDIA_SMI", str(path))
+    module = importlib.reload(gpu)
+    try:
+        sampler = module.GpuSampler(interval_ms=100)
+        assert sampler.command == [str(path)]
+        sampler.start()
+        try:
+            assert _wait_for(lambda: sampler.latest()["gpu_count"] == 2)
+        finally:
+            sampler.stop()
+    finally:
+        module.gpu_sampler.stop()
+        monkeypatch.delenv("SENTINEL_NVIDIA_SMI")
+        importlib.reload(gpu)
@@ -0,0 +1,95 @@
+# tests/test_migrate.py
+
+import sqlite3
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(time, "tzset"), reason="needs time.tzset")
+
+
+@pytest.fixture
+def new_york(monkeypatch):
+    monkeypatch.setenv("TZ", "America/New_York")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def _utc_ms(*args):
+    return round(datetime(*args, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _legacy_file(db):
+    """Replace the test database with an empty pre-`ts` file."""
+    db.connections.close_all()
+    for suffix in ("", "-wal", "-shm"):
+        Path(str(db.DB_PATH) + suffix).unlink(missing_ok=True)
+    return sqlite3.connect(db.DB_PATH)
+
+
+def test_legacy_timestamps_are_read_as_local_time(db, new_york):
+    with _legacy_file(db) as conn:
+        conn.execute("""
+            CREATE TABLE alert_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                alert_type TEXT NOT NULL,
+                title TEXT,
+                message TEXT,
+                acknowledged INTEGER DEFAULT 0
+            )
+        """)
+        conn.executemany("INSERT INTO alert_history (timestamp, alert_type) VALUES (?, 'cpu')", [
+            ("2024-01-15T09:30:00.250000",),  # datetime.now().isoformat(), EST
+            ("2024-07-15 09:30:00",),         # space separator, EDT
+            ("2024-07-15T09:30:00+00:00",),   # explicit offset wins
+            ("garbage",),
+        ])
+    conn.close()
+
+    db.initialize_database()
+    with sqlite3.connect(db.DB_PATH) as conn:
+        got = [r[0] for r in conn.execute("SELECT ts FROM alert_history ORDER BY id")]
+    conn.close()
+
+    assert got == [
+        _utc_ms(2024, 1, 15, 14, 30, 0, 250000),
+        _utc_ms(2024, 7, 15, 13, 30),
+        _utc_ms(2024, 7, 15, 9, 30),
+        0,
+    ]
+
+
+def test_legacy_metrics_timestamps_are_read_as_utc(db, new_york):
+    # Raw metrics were stamped with datetime.utcnow().isoformat()
+    with _legacy_file(db) as conn:
+        conn.execute("""
+            CREATE TABLE metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                timestamp TEXT NOT NULL,
+                cpu_percent REAL,
+                memory_used_mb REAL,
+                memory_percent REAL,
+                disk_percent REAL,
+                read_mb REAL,
+                write_mb REAL,
+                upload_kb REAL,
+                download_kb REAL,
+                gpu_percent REAL
+            )
+        """)
+        conn.executemany("INSERT INTO metrics (timestamp, cpu_percent) VALUES (?, 1.0)", [
+            ("2024-01-15T12:00:00.500000",),
+            ("2024-07-15 12:00:00",),
+        ])
+    conn.close()
+
+    db.initialize_database()
+    with sqlite3.connect(db.DB_PATH) as conn:
+        got = [r[0] for r in conn.execute("SELECT ts FROM metrics ORDER BY id")]
+    conn.close()
+    assert got == [_utc_ms(2024, 1, 15, 12, 0, 0, 500000), _utc_ms(2024, 7, 15, 12, 0)]
@@ -0,0 +1,85 @@
+# tests/test_partitions.py
+
+import pytest
+
+from conftest import insert_raw
+from app.core.settings import Settings
+from app.storage import archive, partitions
+from app.storage.database import epoch_ms, read_connection
+from app.storage.partitions import (
+    drop_partitions, list_partitions, metrics_source, partition_mode
+)
+from app.storage.rollup import run_rollups
+
+DAY = 86_400_000
+START = 1_699_920_000_000  # 2023-11-14 00:00 UTC
+
+
+@pytest.fixture
+def mode(tmp_path, monkeypatch):
+    """Set the partition_mode setting for the test."""
+    config = Settings(str(tmp_path / "config.json"))
+    monkeypatch.setattr(partitions, "settings", config)
+
+    def set_mode(value):
+        config.save({"partition_mode": value})
+    return set_mode
+
+
+def _rows(start, count, step=3_600_000):
+    return [(start + i * step, {"cpu_percent": float(i)}) for i in range(count)]
+
+
+def _all_ids():
+    with read_connection() as conn:
+        return [r[0] for r in conn.execute(f"SELECT id FROM {metrics_source()} ORDER BY ts")]
+
+
+def test_mode_comes_from_settings(mode):
+    assert partition_mode() is None
+    mode("hour")
+    assert partition_mode() == "hour"
+    mode("week")  # Unknown values leave partitioning off
+    assert partition_mode() is None
+
+
+def test_rows_routed_by_day_with_continuous_ids(db, mode):
+    insert_raw(_rows(START, 6))
+    mode("day")
+    insert_raw(_rows(START + DAY, 48))
+
+    assert [name for _, _, name in list_partitions()] == ["metrics_p20231115", "metrics_p20231116"]
+    with read_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM metrics").fetchone()[0] == 6
+        assert conn.execute("SELECT COUNT(*) FROM metrics_p20231115").fetchone()[0] == 24
+    assert _all_ids() == list(range(1, 55))
+
+    # Turning partitioning off again keeps ids above every partition
+    mode(None)
+    insert_raw(_rows(START + 3 * DAY, 2))
+    assert _all_ids() == list(range(1, 57))
+
+
+def test_drop_partitions_respects_cutoff_and_max_id(db, mode):
+    mode("day")
+    insert_raw(_rows(START, 72))  # Three day partitions, ids 1..72
+
+    assert drop_partitions(START + DAY, max_id=10) == 0  # Day one not rolled up yet
+    assert drop_partitions(START + 2 * DAY, max_id=30) == 1  # Day two ends too late
+    assert [name for _, _, name in list_partitions()] == ["metrics_p20231115", "metrics_p20231116"]
+    assert drop_partitions(START + 3 * DAY) == 2
+    assert list_partitions() == []
+
+
+def test_sealing_drops_day_partitions(db, mode):
+    mode("hour")
+    day = archive._day_start(epoch_ms()) - 3 * DAY
+    rows = _rows(day, 24 * 60, step=60_000)
+    insert_raw(rows)
+    assert len(list_partitions()) == 24
+
+    run_rollups()
+    assert archive.seal_closed_days() == 1
+    assert list_partitions() == []
+    out = archive.read_archive_columns(day, day + DAY, ["cpu_percent"])
+    assert len(out["ts"]) == len(rows)
@@ -0,0 +1,111 @@
+# tests/test_process_snapshot.py
+
+import contextlib
+from collections import namedtuple
+
+import psutil
+import pytest
+
+from app.system import process_snapshot
+from app.system.process_snapshot import (
+    TOP_K, ProcessRecord, ProcessSnapshotService, _build_snapshot, top_processes
+)
+
+IO = namedtuple("IO", "read_bytes write_bytes")
+MEM = namedtuple("MEM", "rss")
+
+
+def _record(pid, cpu=0.0, io=None):
+    return ProcessRecord(pid, 1.0, f"p{pid}", "user", cpu, 1.0, 1, io, "running")
+
+
+def test_top_processes_highest_first_and_skips_unknown():
+    records = [_record(1, io=5.0), _record(2, io=None), _record(3, io=9.0), _record(4, io=1.0)]
+    assert [r.pid for r in top_processes(records, "io", 2)] == [3, 1]
+    assert [r.pid for r in top_processes(records, "io", 10)] == [3, 1, 4]
+
+
+def test_snapshot_top_matches_full_ranking_within_and_beyond_top_k():
+    records = tuple(_record(pid, cpu=float((pid * 37) % 101)) for pid in range(TOP_K * 3))
+    snapshot = _build_snapshot(1, records, (), ())
+    full = sorted(records, key=lambda r: r.cpu_percent, reverse=True)
+    for n in (1, 10, TOP_K, TOP_K + 20):
+        assert [r.cpu_percent for r in snapshot.top("cpu", n)] == [r.cpu_percent for r in full[:n]]
+
+
+class FakeProcess:
+    """Stands in for psutil.Process over a mutable table of pid -> create_time."""
+    table = {}
+    io = {}
+
+    def __init__(self, pid):
+        if pid not in self.table:
+            raise psutil.NoSuchProcess(pid)
+        self.pid = pid
+        self._created = self.table[pid]
+        self._cpu_reads = 0
+
+    def create_time(self):
+        return self._created
+
+    def is_running(self):
+        return self.table.get(self.pid) == self._created
+
+    def oneshot(self):
+        return contextlib.nullcontext()
+
+    def cpu_percent(self, interval=None):
+        # Like psutil: the first reading on a handle is always 0.0
+        self._cpu_reads += 1
+        return 0.0 if self._cpu_reads == 1 else 25.0
+
+    def as_dict(self, attrs, ad_value=None):
+        values = {
+            "name": f"proc{self.pid}",
+            "username": "user",
+            "memory_info": MEM(1024 * 1024),
+            "num_threads": 2,
+            "status": "running",
+            "io_counters": IO(self.io.get((self.pid, self._created), 0), 0),
+        }
+        return {a: self.cpu_percent() if a == "cpu_percent" else values[a] for a in attrs}
+
+
+@pytest.fixture
+def fake_psutil(monkeypatch):
+    FakeProcess.table = {}
+    FakeProcess.io = {}
+    monkeypatch.setattr(process_snapshot.psutil, "pids", lambda: list(FakeProcess.table))
+    monkeypatch.setattr(process_snapshot.psutil, "Process", FakeProcess)
+    monkeypatch.setattr(process_snapshot, "PRIME_INTERVAL_S", 0)
+    monkeypatch.setattr(process_snapshot, "_DYNAMIC_ATTRS", [
+        "cpu_percent", "memory_info", "num_threads", "status", "io_counters"
+    ])
+    return FakeProcess
+
+
+def test_first_snapshot_has_primed_cpu(fake_psutil):
+    fake_psutil.table = {10: 100.0, 11: 100.0}
+    snapshot = ProcessSnapshotService().latest()
+    assert {r.pid: r.cpu_percent for r in snapshot.processes} == {10: 25.0, 11: 25.0}
+
+
+def test_reused_pid_is_a_new_process(fake_psutil):
+    fake_psutil.table = {10: 100.0}
+    fake_psutil.io = {(10, 100.0): 1_000}
+    service = ProcessSnapshotService()
+    first = service.refresh()
+    assert [r.key for r in first.started] == [(10, 100.0)]
+
+    # pid 10 exits and the OS hands the same pid to a new process
+    fake_psutil.table = {10: 200.0}
+    fake_psutil.io = {(10, 200.0): 5_000_000}
+    second = service.refresh()
+
+    assert [r.key for r in second.started] == [(10, 200.0)]
+    assert [r.key for r in second.exited] == [(10, 100.0)]
+    record = second.get(10)
+    assert record.create_time == 200.0
+    # No I/O rate against the previous owner's counters, and a fresh CPU baseline
+    assert record.io_bytes_s is None
+    assert record.cpu_percent == 0.0
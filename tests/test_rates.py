@@ -0,0 +1,119 @@
+# tests/test_rates.py
+
+import sqlite3
+from collections import namedtuple
+
+import pytest
+
+from app.collectors import disk
+from app.collectors.rates import RateTracker, total_rate, whole_disks
+
+DiskIO = namedtuple("DiskIO", "read_bytes write_bytes")
+DiskUsage = namedtuple("DiskUsage", "percent")
+
+
+def test_first_reading_has_no_rate():
+    assert RateTracker().update({"a": 100}, now=1.0) == {"a": None}
+
+
+def test_rate_uses_elapsed_time():
+    t = RateTracker()
+    t.update({"a": 100}, now=10.0)
+    assert t.update({"a": 400}, now=12.0) == {"a": 150.0}
+
+
+def test_32bit_counter_wrap_is_unwrapped():
+    t = RateTracker()
+    t.update({"a": 2 ** 32 - 100}, now=0.0)
+    assert t.update({"a": 50}, now=1.0) == {"a": 150.0}
+
+
+@pytest.mark.parametrize("prev, value", [
+    (2 ** 40, 10),          # 64-bit counter went backwards: reset, not a wrap
+    (2 ** 32 - 100, 2 ** 31),  # "Wrap" would imply an implausible jump
+])
+def test_reset_yields_no_rate_then_recovers(prev, value):
+    t = RateTracker()
+    t.update({"a": prev}, now=0.0)
+    assert t.update({"a": value}, now=1.0) == {"a": None}
+    assert t.update({"a": value + 10}, now=2.0) == {"a": 10.0}
+
+
+def test_clock_not_advancing_yields_no_rate():
+    t = RateTracker()
+    t.update({"a": 1}, now=5.0)
+    assert t.update({"a": 2}, now=5.0) == {"a": None}
+
+
+def test_vanished_counters_are_forgotten():
+    t = RateTracker()
+    t.update({"a": 1, "b": 1}, now=0.0)
+    t.update({"a": 2}, now=1.0)
+    # "b" came back: treated as new, not as a delta against its old value
+    assert t.update({"a": 3, "b": 1000}, now=2.0) == {"a": 1.0, "b": None}
+
+
+def test_total_rate_ignores_unknown():
+    assert total_rate([None, None]) is None
+    assert total_rate([1.5, None, 2.5]) == 4.0
+
+
+def test_whole_disks_drops_partitions_of_listed_disks():
+    names = ["sda", "sda1", "sda2", "nvme0n1", "nvme0n1p1", "mmcblk0", "mmcblk0p1", "sdb3"]
+    assert whole_disks(names) == ["sda", "nvme0n1", "mmcblk0", "sdb3"]
+
+
+def test_disk_totals_skip_virtual_devices(monkeypatch):
+    mb = 1024 * 1024
+    readings = iter([
+        {name: DiskIO(0, 0) for name in ("sda", "sda1", "loop0", "dm-0", "ram0", "md0")},
+        {
+            "sda": DiskIO(10 * mb, 4 * mb),
+            "sda1": DiskIO(10 * mb, 4 * mb),
+            "loop0": DiskIO(3 * mb, 0),
+            "dm-0": DiskIO(10 * mb, 4 * mb),
+            "ram0": DiskIO(7 * mb, 7 * mb),
+            "md0": DiskIO(10 * mb, 4 * mb),
+        },
+    ])
+    clock = iter([100.0, 102.0])
+    monkeypatch.setattr(disk, "_io_rates", RateTracker())
+    monkeypatch.setattr("app.collectors.rates.time.monotonic", lambda: next(clock))
+    monkeypatch.setattr(disk.psutil, "disk_io_counters", lambda perdisk=True: next(readings))
+    monkeypatch.setattr(disk.psutil, "disk_usage", lambda path: DiskUsage(42.0))
+
+    first = disk.collect_disk()
+    assert first["read_mb"] is None
+    out = disk.collect_disk()
+    assert out["read_mb"] == 5.0
+    assert out["write_mb"] == 2.0
+    assert list(out["per_disk"]) == ["sda"]
+
+
+def test_legacy_io_counters_are_cleared_on_upgrade(db):
+    from app.storage.database import initialize_database, DB_PATH, connections
+
+    with sqlite3.connect(DB_PATH) as conn:
+        conn.execute(
+            "INSERT INTO metrics (ts, timestamp, cpu_percent, read_mb, write_mb, upload_kb, download_kb) "
+            "VALUES (1, 'x', 12.5, 90000, 80000, 7000000, 6000000)"
+        )
+        conn.execute(
+            "INSERT INTO metrics_rollup_1m (bucket_ts, metric, count, sum, min, max, last, last_ts) "
+            "VALUES (0, 'read_mb', 1, 90000, 90000, 90000, 90000, 1)"
+        )
+        conn.execute("PRAGMA user_version = 0")
+    connections.close_all()
+
+    initialize_database()
+    with sqlite3.connect(DB_PATH) as conn:
+        row = conn.execute("SELECT cpu_percent, read_mb, write_mb, upload_kb, download_kb FROM metrics").fetchone()
+        assert row == (12.5, None, None, None, None)
+        assert conn.execute("SELECT COUNT(*) FROM metrics_rollup_1m").fetchone()[0] == 0
+        assert conn.execute("PRAGMA user_version").fetchone()[0] >= 1
+
+        # Runs once: rows written after the upgrade keep their rates
+        conn.execute("UPDATE metrics SET read_mb = 1.5")
+    initialize_database()
+    with sqlite3.connect(DB_PATH) as conn:
+        assert conn.execute("SELECT read_mb FROM metrics").fetchone()[0] == 1.5
@@ -0,0 +1,117 @@
+# tests/test_retention.py
+
+import sqlite3
+from pathlib import Path
+
+from conftest import insert_raw
+
+from app.storage import archive
+from app.storage.database import epoch_ms, read_connection
+from app.storage.retention import RETENTION_DAYS, prune_old_data
+from app.storage.rollup import run_rollups
+
+DAY = 86_400_000
+
+
+def _raw_ts():
+    with read_connection() as conn:
+        return [r[0] for r in conn.execute("SELECT ts FROM metrics ORDER BY id")]
+
+
+def _old(days, n, offset=0):
+    base = epoch_ms() - days * DAY
+    return [(base + (offset + i) * 1000, {"cpu_percent": 1.0}) for i in range(n)]
+
+
+def test_raw_rows_not_rolled_up_are_kept(db, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_ENABLED", False)
+    rows = _old(RETENTION_DAYS["metrics"] + 5, 100)
+    insert_raw(rows)
+
+    prune_old_data(batch_size=7, pause_seconds=0)
+    assert len(_raw_ts()) == 100
+
+
+def test_only_rolled_up_raw_rows_are_pruned(db, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_ENABLED", False)
+    expired = RETENTION_DAYS["metrics"] + 5
+    insert_raw(_old(expired, 50))
+    run_rollups()
+    # Appended after the rollup pass (higher ids) even though just as old
+    late = _old(expired, 30, offset=50)
+    insert_raw(late)
+    recent = _old(0, 10)
+    insert_raw(recent)
+
+    deleted = prune_old_data(batch_size=7, pause_seconds=0)
+    assert deleted["metrics"] == 50
+    assert _raw_ts() == [ts for ts, _ in late + recent]
+
+    run_rollups()
+    prune_old_data(batch_size=7, pause_seconds=0)
+    assert _raw_ts() == [ts for ts, _ in recent]
+
+
+def test_unsealed_rows_are_kept_while_archiving(db):
+    insert_raw(_old(RETENTION_DAYS["metrics"] + 5, 20))
+    run_rollups()
+    # Rolled up but not sealed: with the archive on, raw rows leave only through it
+    assert prune_old_data(pause_seconds=0)["metrics"] == 0
+    assert len(_raw_ts()) == 20
+
+
+def test_rollup_tiers_expire_on_their_own_schedule(db, monkeypatch):
+    monkeypatch.setattr(archive, "ARCHIVE_ENABLED", False)
+    insert_raw(_old(RETENTION_DAYS["metrics_rollup_1m"] + 2, 60))
+    run_rollups()
+    prune_old_data(pause_seconds=0)
+    with read_connection() as conn:
+        counts = {
+            tier: conn.execute(f"SELECT COUNT(*) FROM metrics_rollup_{tier}").fetchone()[0]
+            for tier in ("1m", "15m", "1h")
+        }
+    assert counts["1m"] == 0
+    assert counts["15m"] > 0 and counts["1h"] > 0
+
+
+def test_large_file_switches_to_incremental_vacuum_only_on_request(db, monkeypatch):
+    db.connections.close_all()
+    for suffix in ("", "-wal", "-shm"):
+        Path(str(db.DB_PATH) + suffix).unlink(missing_ok=True)
+    legacy = sqlite3.connect(db.DB_PATH)
+    legacy.execute("CREATE TABLE filler (data BLOB)")
+    legacy.executemany("INSERT INTO filler VALUES (?)", [(b"x" * 4000,) for _ in range(100)])
+    legacy.commit()
+    legacy.close()
+
+    def auto_vacuum():
+        # A fresh connection: pooled readers cache the value they opened with
+        conn = sqlite3.connect(db.DB_PATH)
+        try:
+            return conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        finally:
+            conn.close()
+
+    # Too large to rebuild during startup: left alone, app still starts
+    monkeypatch.setattr(db, "INLINE_VACUUM_MAX_BYTES", 100_000)
+    db.initialize_database()
+    assert auto_vacuum() == 0
+
+    # The hourly job never rebuilds the file (it would stall the writer)
+    prune_old_data(pause_seconds=0)
+    assert auto_vacuum() == 0
+
+    monkeypatch.setattr(db, "_vacuum_rebuild_attempted", False)
+    assert db.enable_incremental_vacuum() is True
+    assert auto_vacuum() == 2
+    assert db.incremental_vacuum_enabled()
+
+
+def test_vacuum_rebuild_is_attempted_once(db, monkeypatch):
+    calls = []
+    monkeypatch.setattr(db, "_vacuum_rebuild_attempted", False)
+    monkeypatch.setattr(db, "_enable_incremental_vacuum", lambda conn, max_bytes: calls.append(max_bytes) or False)
+
+    assert db.enable_incremental_vacuum() is False
+    db.enable_incremental_vacuum()
+    assert calls == [None]
@@ -0,0 +1,61 @@
+# tests/test_rollup.py
+
+import threading
+
+from conftest import insert_raw
+
+from app.storage.database import read_connection
+from app.storage.rollup import read_rollup, run_rollups
+
+START = 1_699_999_200_000  # An hour boundary
+
+
+def _rollup_totals(tier="1m"):
+    with read_connection() as conn:
+        return conn.execute(
+            f"SELECT SUM(count), SUM(sum) FROM metrics_rollup_{tier} WHERE metric = 'cpu_percent'"
+        ).fetchone()[:]
+
+
+def test_rollup_matches_raw_rows(db):
+    insert_raw((START + i * 1000, {"cpu_percent": float(i % 10)}) for i in range(600))
+    assert run_rollups() == 600
+
+    out = read_rollup("1m", START, START + 600_000, columns=["cpu_percent"], stats=("avg", "count"))
+    assert list(out["cpu_percent_count"]) == [60.0] * 10
+    assert list(out["cpu_percent_avg"]) == [4.5] * 10
+
+
+def test_repeated_rollups_are_idempotent(db):
+    insert_raw((START + i * 1000, {"cpu_percent": 1.0}) for i in range(1000))
+    run_rollups(batch_size=300)
+    before = _rollup_totals()
+    assert run_rollups() == 0
+    assert _rollup_totals() == before == (1000, 1000.0)
+
+    # New rows are folded in exactly once on the next pass
+    insert_raw((START + (1000 + i) * 1000, {"cpu_percent": 1.0}) for i in range(10))
+    assert run_rollups() == 10
+    assert _rollup_totals() == (1010, 1010.0)
+
+
+def test_concurrent_rollups_do_not_double_count(db):
+    n = 60_000
+    insert_raw((START + i * 1000, {"cpu_percent": 2.0}) for i in range(n))
+
+    barrier = threading.Barrier(4)
+    processed = []
+
+    def worker():
+        barrier.wait()
+        processed.append(run_rollups(batch_size=5000))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(processed) == n
+    for tier in ("1m", "15m", "1h"):
+        assert _rollup_totals(tier) == (n, 2.0 * n)
@@ -0,0 +1,27 @@
+# tests/test_schema.py
+
+import pytest
+
+from app.collectors.schema import MetricSample
+from app.storage.database import METRIC_COLUMNS
+
+
+def test_readings_fill_fields_in_storage_order():
+    sample = MetricSample.from_readings(
+        1_000,
+        {"cpu_percent": 12.5, "cpu_max_core": 80.0},
+        {"memory_percent": 40.0, "memory_total_mb": 16384.0},  # Not a sample field
+    )
+    assert sample.ts == 1_000
+    assert len(sample.values) == len(METRIC_COLUMNS)
+    assert dict(zip(METRIC_COLUMNS, sample.values)) == {
+        **{c: None for c in METRIC_COLUMNS},
+        "cpu_percent": 12.5,
+        "cpu_max_core": 80.0,
+        "memory_percent": 40.0,
+    }
+
+
+def test_metric_reported_twice_is_rejected():
+    with pytest.raises(ValueError, match="gpu_percent"):
+        MetricSample.from_readings(1_000, {"gpu_percent": 1.0}, {"gpu_percent": 2.0})
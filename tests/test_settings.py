@@ -0,0 +1,88 @@
+# tests/test_settings.py
+
+import json
+import os
+
+import pytest
+
+from app.core import settings as settings_module
+from app.core.settings import Settings
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings_module, "MTIME_CHECK_INTERVAL", 0.0)
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"theme": "dark", "cpu_warning": 80}))
+    return path
+
+
+def _edit(path, data, mtime):
+    """Rewrite config.json as another process would, with a chosen mtime."""
+    path.write_text(json.dumps(data))
+    os.utime(path, (mtime, mtime))
+
+
+def test_reads_are_served_from_cache_until_mtime_changes(config):
+    service = Settings(str(config))
+    assert service.get("theme") == "dark"
+    mtime = os.stat(config).st_mtime
+
+    # Same mtime: the cached copy is still served
+    _edit(config, {"theme": "light", "cpu_warning": 80}, mtime)
+    assert service.get("theme") == "dark"
+
+    # A newer mtime invalidates the cache
+    _edit(config, {"theme": "light", "cpu_warning": 80}, mtime + 5)
+    assert service.get("theme") == "light"
+
+
+def test_mtime_is_checked_at_most_every_interval(config, monkeypatch):
+    monkeypatch.setattr(settings_module, "MTIME_CHECK_INTERVAL", 3600.0)
+    service = Settings(str(config))
+    assert service.get("theme") == "dark"
+    _edit(config, {"theme": "light"}, os.stat(config).st_mtime + 5)
+    assert service.get("theme") == "dark"
+    service.reload()
+    assert service.get("theme") == "light"
+
+
+def test_subscribers_get_only_changed_keys(config):
+    service = Settings(str(config))
+    seen = []
+    unsubscribe = service.subscribe(seen.append)
+    service.get("theme")  # First load
+    seen.clear()
+
+    service.save({"theme": "dark", "cpu_warning": 90, "new_key": True})
+    assert seen == [{"cpu_warning": 90, "new_key": True}]
+    assert json.loads(config.read_text())["cpu_warning"] == 90
+
+    # External edits notify too; removed keys are reported as None
+    _edit(config, {"theme": "light", "cpu_warning": 90}, os.stat(config).st_mtime + 5)
+    service.get("theme")
+    assert seen[-1] == {"theme": "light", "new_key": None}
+
+    unsubscribe()
+    service.save({"theme": "dark"})
+    assert len(seen) == 2
+
+
+def test_failing_listener_does_not_block_others(config):
+    service = Settings(str(config))
+    seen = []
+
+    def broken(changes):
+        raise RuntimeError("boom")
+    service.subscribe(broken)
+    service.subscribe(seen.append)
+    service.save({"theme": "light"})
+    assert seen and seen[0]["theme"] == "light"
+
+
+def test_unreadable_file_keeps_cached_values(config):
+    service = Settings(str(config))
+    assert service.get("cpu_warning") == 80
+    config.write_text("{ half written")
+    os.utime(config, (os.stat(config).st_mtime + 5,) * 2)
+    assert service.get("cpu_warning") == 80
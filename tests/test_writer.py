@@ -0,0 +1,108 @@
+# tests/test_writer.py
+
+import sqlite3
+
+from app.collectors.schema import MetricSample
+from app.storage import writer as writer_module
+from app.storage.database import read_connection
+from app.storage.writer import MetricsWriter, _sample_row, _Statement
+
+TS = 1_700_000_000_000
+ALERT_SQL = "INSERT INTO alert_history (ts, timestamp, alert_type, message) VALUES (?, ?, ?, ?)"
+
+
+def _count(table):
+    with read_connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def _alert(i):
+    return _Statement(ALERT_SQL, (TS + i, "2023-11-14T22:13:20", "test", f"alert {i}"))
+
+
+def test_bad_statement_is_dropped_without_blocking_others(db):
+    w = MetricsWriter()
+    pending = [_sample_row(MetricSample(ts=TS + i, cpu_percent=1.0)) for i in range(3)]
+    statements = [
+        _alert(1),
+        _Statement("INSERT INTO no_such_table VALUES (?)", (1,)),  # OperationalError, not transient
+        _Statement(ALERT_SQL, (1, 2)),                             # Wrong number of bindings
+        _alert(2),
+    ]
+    w._flush(pending, statements)
+
+    assert pending == [] and statements == []
+    assert _count("metrics") == 3
+    assert _count("alert_history") == 2
+
+    # Later flushes are unaffected
+    w._flush([_sample_row(MetricSample(ts=TS + 10, cpu_percent=1.0))], [_alert(3)])
+    assert _count("metrics") == 4
+    assert _count("alert_history") == 3
+
+
+def test_locked_database_keeps_writes_for_retry(db, monkeypatch):
+    w = MetricsWriter(batch_size=2, max_pending=4)
+    real_insert = writer_module.insert_metric_rows
+    locked = {"on": True}
+
+    def insert(conn, rows):
+        if locked["on"]:
+            raise sqlite3.OperationalError("database is locked")
+        real_insert(conn, rows)
+
+    monkeypatch.setattr(writer_module, "insert_metric_rows", insert)
+    pending = [_sample_row(MetricSample(ts=TS + i, cpu_percent=1.0)) for i in range(6)]
+    statements = [_alert(1)]
+    w._flush(pending, statements)
+
+    # Rows kept, capped at max_pending (oldest dropped); statements still ran
+    assert [row[0] for row in pending] == [TS + 2, TS + 3, TS + 4, TS + 5]
+    assert statements == []
+    assert _count("metrics") == 0
+    assert _count("alert_history") == 1
+
+    locked["on"] = False
+    w._flush(pending, statements)
+    assert pending == []
+    assert _count("metrics") == 4
+
+
+def test_locked_statement_is_retried_in_order(db, monkeypatch):
+    w = MetricsWriter()
+    statements = [_alert(1), _alert(2)]
+    real = writer_module.write_connection
+    calls = {"n": 0}
+
+    class Locked:
+        def __enter__(self):
+            raise sqlite3.OperationalError("database is locked")
+
+        def __exit__(self, *exc):
+            return False
+
+    def flaky():
+        calls["n"] += 1
+        return Locked() if calls["n"] == 2 else real()
+
+    monkeypatch.setattr(writer_module, "write_connection", flaky)
+    w._flush([], statements)
+    assert statements == [_alert(2)]
+    assert _count("alert_history") == 1
+
+    w._flush([], statements)
+    assert statements == []
+    assert _count("alert_history") == 2
+
+
+def test_writer_thread_commits_on_flush(db):
+    w = MetricsWriter(flush_interval=60)
+    w.start()
+    try:
+        w.submit(MetricSample(ts=TS, cpu_percent=5.0))
+        w.execute("INSERT INTO no_such_table VALUES (1)")
+        w.submit(MetricSample(ts=TS + 1, cpu_percent=6.0))
+        assert w.flush()
+        assert _count("metrics") == 2
+    finally:
+        w.stop()